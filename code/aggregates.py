@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import time
+import pandas as pd
+from corpus import DEFAULT_CSV, load_corpus, source_signature
+from labelcache import DEFAULT_LABEL_DIR, label_texts, labeler_version
+from regionamount import extract_region_amounts, extraction_version
+from instrument import traced
+
+# 分析脚本算出、画图脚本直接使用的汇总表（以前map.py、cat.py里是手抄的数组）
+REGION_AMOUNT_CSV = './result/地域彩礼金额统计.csv'
+REGION_FORM_CSV = './result/各地区彩礼形式偏好.csv'
+
+
+# ====================== 汇总表的计算（category.py / shengfentongji.py） ======================
+# 彩礼形式总体提及次数，以及各地区（不含"其他"）的彩礼形式分布
+# 每篇的彩礼形式和地域走标签缓存（labelcache.py），label_cache=None时不读写缓存
+@traced()
+def betrothal_form_stats(df, label_cache=DEFAULT_LABEL_DIR):
+    forms = pd.Series(label_texts('forms', df['分析文本'], cache=label_cache), index=df.index)
+
+    # 统计各形式的出现次数（含多形式并存的情况）
+    form_count = {}
+    for post_forms in forms:
+        for form in post_forms:
+            form_count[form] = form_count.get(form, 0) + 1
+    form_df = pd.DataFrame(list(form_count.items()), columns=['彩礼形式', '提及次数'])
+    form_df = form_df.sort_values('提及次数', ascending=False).reset_index(drop=True)
+
+    # 展开列表形式为单独行（便于分组统计）
+    regions = pd.Series(label_texts('region', df['分析文本'], cache=label_cache), index=df.index)
+    expanded = pd.DataFrame({'地域': regions, '彩礼形式': forms}).explode('彩礼形式')
+    region_form_stats = expanded.groupby(['地域', '彩礼形式']).size().unstack(fill_value=0)
+
+    # 过滤掉"其他"地域和"未提及具体形式"，只保留主要数据
+    region_form_stats = region_form_stats[region_form_stats.index != '其他']
+    if '未提及具体形式' in region_form_stats.columns:
+        region_form_stats = region_form_stats.drop(columns=['未提及具体形式'])
+    return form_df, region_form_stats
+
+
+# 各地区彩礼金额（万元）的均值、中位数、样本数，以及虚量描述分布
+@traced()
+def summarize_region_amounts(region_df):
+    # 过滤掉平均金额为空的数据
+    valid_amount_df = region_df.dropna(subset=['平均金额'])
+
+    if not valid_amount_df.empty:
+        # 重新组织统计结果，使用单层列名
+        stats = valid_amount_df.groupby('地域').agg({
+            '平均金额': ['mean', 'median', 'count']
+        }).round(2)
+
+        # 展平列名
+        stats.columns = ['平均金额_元', '中位数_元', '样本数']
+
+        # 转换为万元
+        stats['平均金额_万元'] = (stats['平均金额_元'] / 10000).round(2)
+        stats['中位数_万元'] = (stats['中位数_元'] / 10000).round(2)
+
+        # 重新排列列顺序
+        stats = stats[['平均金额_万元', '中位数_万元', '样本数']]
+    else:
+        stats = pd.DataFrame(columns=['平均金额_万元', '中位数_万元', '样本数'])
+
+    # 虚量描述统计
+    virtual_stats = region_df.dropna(subset=['虚量描述']).groupby(['地域', '虚量描述']).size().unstack(fill_value=0)
+    return stats, virtual_stats
+
+
+# 汇总表用到的分类/提取逻辑的版本：改了词典或金额语法时，即使语料没变，已保存的汇总表也作废
+def region_form_version():
+    return {'forms': labeler_version('forms'), 'region': labeler_version('region')}
+
+
+def region_amount_version():
+    return {'region_amount': extraction_version()}
+
+
+# ====================== 结果CSV的缓存 ======================
+# 每个结果CSV记下生成它时语料的指纹和逻辑版本（在语料缓存目录的tables.json里），两者都没变时直接读CSV
+def _tables_meta_path(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.cache', 'tables.json')
+
+
+def _load_tables_meta(csv_path):
+    path = _tables_meta_path(csv_path)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _table_signature(csv_path, version):
+    return {'source': os.path.abspath(csv_path), **source_signature(csv_path), 'logic': version or {}}
+
+
+# 分析脚本保存结果CSV后调用，记下它对应的语料版本和逻辑版本（region_form_version()等）
+def record_table(csv_path, out_path, version=None):
+    path = _tables_meta_path(csv_path)
+    meta = _load_tables_meta(csv_path)
+    meta[os.path.abspath(out_path)] = _table_signature(csv_path, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(csv_path, out_path, version=None):
+    recorded = _load_tables_meta(csv_path).get(os.path.abspath(out_path))
+    return (os.path.exists(out_path) and recorded is not None
+            and recorded == _table_signature(csv_path, version))
+
+
+# 读取由语料算出的汇总表：结果CSV是由当前语料和当前逻辑生成的就直接读，否则用compute(语料)重新计算并保存
+def cached_table(csv_path, out_path, compute, rebuild=False, version=None):
+    if not rebuild and is_fresh(csv_path, out_path, version):
+        return pd.read_csv(out_path, index_col=0, encoding='utf-8-sig')
+    table = compute(load_corpus(csv_path))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    table.to_csv(out_path, encoding='utf-8-sig')
+    record_table(csv_path, out_path, version)
+    return table
+
+
+def load_region_amount_stats(csv_path=DEFAULT_CSV, out_path=REGION_AMOUNT_CSV, rebuild=False):
+    return cached_table(csv_path, out_path,
+                        lambda df: summarize_region_amounts(extract_region_amounts(df['分析文本']))[0], rebuild,
+                        region_amount_version())
+
+
+def load_region_form_stats(csv_path=DEFAULT_CSV, out_path=REGION_FORM_CSV, rebuild=False):
+    return cached_table(csv_path, out_path, lambda df: betrothal_form_stats(df)[1], rebuild, region_form_version())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='地区金额/彩礼形式汇总表：语料没变时直接读取上次的结果')
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='语料CSV')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有结果，重新计算')
+    args = parser.parse_args()
+
+    for name, load in (('地区金额', load_region_amount_stats), ('地区彩礼形式', load_region_form_stats)):
+        start = time.perf_counter()
+        table = load(args.csv, rebuild=args.rebuild)
+        print(f"{name}：{table.shape[0]}个地区，用时{time.perf_counter() - start:.3f}s")
@@ -1,98 +1,26 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import re
+from charts import figure, panel, render_charts
+from corpus import load_corpus
+from labelcache import tone_features
+from instrument import phase
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
-
-# 加载数据
+phase('attitude:读取数据')
+# 加载数据（缺失值填充和性别映射gender_mapped由corpus缓存提供）
 file_path = './result/彩礼.csv'
-df = pd.read_csv(file_path)
-df = df.fillna({'text': '', 'title': '', 'gender': 0})
-
-# 性别映射
-gender_mapping = {0: '未知', 1: '男性', 2: '女性'}
-df['gender_mapped'] = df['gender'].map(gender_mapping)
-
-# ====================== 修复正则表达式 ======================
-# 感性特征：感叹号、问号（连续/单个）
-emotional_punctuations = r'!{1,}|！{1,}|\?{1,}|？{1,}'  # 修复重复匹配问题
-emotional_words = ['啊', '呀', '哇', '哦', '呢', '嘛', '吧', '咯', '唉', '哼', '天哪', '卧槽', '气死', '哭', '笑', '烦']
-
-# 理性特征：句号、分号、引号（修复正则语法）
-rational_punctuations = r'\。{1,}|;{1,}|；{1,}|"{1,}|"{2,}|\'{1,}|\'{2,}'  # 修复""+问题
-rational_words = ['数据', '统计', '根据', '研究', '分析', '客观', '理性', '事实', '依据', '具体', '举例']
-
-
-# ====================== 语气特征提取函数（增加异常处理） ======================
-def analyze_emotional_features(text):
-    try:
-        text = str(text).strip()
-        features = {
-            'emotional_punc_count': 0,
-            'rational_punc_count': 0,
-            'emotional_word_count': 0,
-            'rational_word_count': 0,
-            'text_length': max(len(text), 1),  # 避免除以0
-            'emotional_score': 0,
-            'rational_score': 0,
-            'tendency': '中性'
-        }
-
-        # 匹配感性标点
-        if text:
-            features['emotional_punc_count'] = len(re.findall(emotional_punctuations, text))
-
-        # 匹配理性标点
-        if text:
-            features['rational_punc_count'] = len(re.findall(rational_punctuations, text))
-
-        # 匹配感性词汇
-        features['emotional_word_count'] = sum(1 for word in emotional_words if word in text)
-
-        # 匹配理性词汇
-        features['rational_word_count'] = sum(1 for word in rational_words if word in text)
-
-        # 计算得分（归一化）
-        features['emotional_score'] = (features['emotional_punc_count'] * 2 + features['emotional_word_count']) / \
-                                      features['text_length'] * 100
-        features['rational_score'] = (features['rational_punc_count'] * 2 + features['rational_word_count']) / features[
-            'text_length'] * 100
-
-        # 判断倾向
-        if features['emotional_score'] > features['rational_score'] + 0.5:
-            features['tendency'] = '感性'
-        elif features['rational_score'] > features['emotional_score'] + 0.5:
-            features['tendency'] = '理性'
-
-        return features
-
-    except Exception as e:
-        print(f"处理文本时出错: {e}")
-        return {
-            'emotional_punc_count': 0,
-            'rational_punc_count': 0,
-            'emotional_word_count': 0,
-            'rational_word_count': 0,
-            'text_length': 1,
-            'emotional_score': 0,
-            'rational_score': 0,
-            'tendency': '中性'
-        }
-
+df = load_corpus(file_path)
 
 # 合并标题和内容分析
-df['full_text'] = df['title'].astype(str) + ' ' + df['text'].astype(str)
+df['full_text'] = df['分析文本']
 
-# 提取语气特征
-feature_results = df['full_text'].apply(analyze_emotional_features)
-feature_df = pd.DataFrame(feature_results.tolist())
+phase('attitude:语气特征')
+# 提取语气特征（标点和词表见tonefeatures.py，每篇只扫描一次，文本多时用多进程；计数按文本缓存，见labelcache.py）
+feature_df = tone_features(df['full_text'])
 
 # 合并到原数据
 df = pd.concat([df, feature_df], axis=1)
 
 # ====================== 统计分析 ======================
+phase('attitude:统计')
 # 整体语气倾向分布
 tendency_counts = df['tendency'].value_counts()
 tendency_ratio = df['tendency'].value_counts(normalize=True) * 100
@@ -113,67 +41,35 @@ print("\n【不同性别的语气倾向分布（百分比%）】")
 print(gender_tendency_ratio.round(2))
 
 # ====================== 可视化 ======================
-# 1. 整体语气倾向饼图
-plt.figure(figsize=(8, 6))
+phase('attitude:画图')
+# 三张图一起交给charts.py并行画（数据没变时跳过）
 colors = ['#FF69B4', '#4169E1', '#2ca02c']  # 感性-粉色，理性-蓝色，中性-绿色
 # 确保颜色与类别匹配
 pie_labels = tendency_counts.index.tolist()
 pie_colors = [colors[pie_labels.index(t)] if t in pie_labels else '#d3d3d3' for t in ['感性', '理性', '中性']]
 pie_colors = [c for c, t in zip(pie_colors, ['感性', '理性', '中性']) if t in pie_labels]
-
-wedges, texts, autotexts = plt.pie(
-    tendency_counts,
-    labels=tendency_counts.index,
-    autopct='%1.1f%%',
-    colors=pie_colors,
-    startangle=90,
-    explode=(0.05, 0.05, 0)[:len(tendency_counts)]
-)
-for autotext in autotexts:
-    autotext.set_color('white')
-    autotext.set_fontweight('bold')
-plt.title('整体文本语气倾向分布', fontsize=14)
-plt.savefig("./result/整体语气倾向分布.png", dpi=300, bbox_inches='tight')
-
-# 2. 不同性别的语气倾向堆叠柱状图
-plt.figure(figsize=(10, 6))
-gender_tendency_ratio.plot(
-    kind='bar',
-    stacked=True,
-    color=colors[:len(gender_tendency_ratio.columns)],
-    ax=plt.gca()
-)
-plt.title('不同性别的语气倾向分布（%）', fontsize=14)
-plt.xlabel('性别', fontsize=12)
-plt.ylabel('占比（%）', fontsize=12)
-plt.legend(title='语气倾向')
-plt.grid(axis='y', linestyle='--', alpha=0.3)
-
-# 添加百分比标签
-for i, gender in enumerate(gender_tendency_ratio.index):
-    cumulative = 0
-    for j, tendency in enumerate(gender_tendency_ratio.columns):
-        value = gender_tendency_ratio.iloc[i, j]
-        if value > 5:
-            plt.text(i, cumulative + value / 2, f'{value:.1f}%',
-                     ha='center', va='center', fontsize=9, color='white', fontweight='bold')
-        cumulative += value
-
-plt.tight_layout()
-plt.savefig("./result/性别-语气倾向分布.png", dpi=300, bbox_inches='tight')
-
-# 3. 感性/理性得分分布箱线图
-plt.figure(figsize=(10, 6))
-df[['emotional_score', 'rational_score']].plot(
-    kind='box',
-    vert=False,
-    patch_artist=True,
-    boxprops=dict(facecolor='lightblue'),
-    ax=plt.gca()
-)
-plt.title('感性/理性得分分布', fontsize=14)
-plt.xlabel('得分（归一化）', fontsize=12)
-plt.grid(axis='x', linestyle='--', alpha=0.3)
-plt.savefig("./result/感性理性得分分布.png", dpi=300, bbox_inches='tight')
-
-plt.show()
\ No newline at end of file
+labels = {'label_kw': {'fontsize': 12}}
+
+render_charts([
+    # 1. 整体语气倾向饼图
+    figure("./result/整体语气倾向分布.png", panel(
+        'pie', tendency_counts, colors=pie_colors, explode=(0.05, 0.05, 0)[:len(tendency_counts)],
+        autotext={'color': 'white', 'fontweight': 'bold'}, title='整体文本语气倾向分布',
+    ), figsize=(8, 6), tight_layout=False),
+    # 2. 不同性别的语气倾向堆叠柱状图（占比超过5%的段标上百分比）
+    figure("./result/性别-语气倾向分布.png", panel(
+        'frame', gender_tendency_ratio,
+        plot={'kind': 'bar', 'stacked': True, 'color': colors[:len(gender_tendency_ratio.columns)]},
+        title='不同性别的语气倾向分布（%）', xlabel='性别', ylabel='占比（%）', **labels,
+        legend={'title': '语气倾向'}, grid={'axis': 'y', 'linestyle': '--', 'alpha': 0.3},
+        bar_labels={'fmt': '{:.1f}%', 'min': 5, 'position': 'center',
+                    'fontsize': 9, 'color': 'white', 'fontweight': 'bold'},
+    )),
+    # 3. 感性/理性得分分布箱线图
+    figure("./result/感性理性得分分布.png", panel(
+        'frame', df[['emotional_score', 'rational_score']],
+        plot={'kind': 'box', 'vert': False, 'patch_artist': True, 'boxprops': dict(facecolor='lightblue')},
+        title='感性/理性得分分布', xlabel='得分（归一化）', **labels,
+        grid={'axis': 'x', 'linestyle': '--', 'alpha': 0.3},
+    ), tight_layout=False),
+])
@@ -0,0 +1,380 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import corpus
+from aggregates import betrothal_form_stats
+from cleaning import clean_csv
+from keywords import (attitude_fallback_words, attitude_keywords, betrothal_forms, classify_c彩礼_attitude,
+                      region_amount_keywords)
+from regionamount import extract_region_amounts, virtual_amount_words
+from schema import THREAD_SCHEMA, format_local_times
+from tokens import tokenize_texts
+from tonefeatures import emotional_words, extract_tone_features, rational_words
+from topk import stream_top_k
+from wordindex import WordIndex
+
+# 基准测试套件：用固定种子生成与爬虫CSV同列同格式的合成语料（1万~1000万行），
+# 对加载、清洗、热度前K、分类/地域提取、态度、语气、分词、词频逐项测速，结果存成JSON，前后两次可以比较
+DEFAULT_BENCH_DIR = './result/bench'
+GENERATOR_VERSION = 1  # 生成规则有变化时加1，旧的合成语料不再复用
+COLUMNS = list(THREAD_SCHEMA)
+
+# ====================== 合成语料 ======================
+# 各类内容在帖子里出现的比例（按彩礼吧的实际帖子粗略估计）
+PLANT_RATES = {
+    'region': 0.30,    # 提到地区
+    'amount': 0.35,    # 提到具体金额
+    'virtual': 0.15,   # 虚量描述（不少、大概、左右……）
+    'form': 0.45,      # 彩礼形式（现金、三金、房、车……）
+    'attitude': 0.15,  # 明确的态度短语
+    'fallback': 0.10,  # 只有态度倾向词
+    'rational': 0.10,  # 理性词（数据、根据……）
+    'special': 0.05,   # 表情、话题等清洗时要去掉的字符
+}
+DUPLICATE_RATE = 0.02  # 重复爬到的帖子
+MISSING_RATE = 0.005   # 缺少user_name或title
+
+FILLER = ['现在结婚真的太难了', '家里父母一直催', '女方家里要求', '男方家里条件一般', '我们谈了三年',
+          '准备明年结婚', '两家人还在商量', '感觉压力很大', '身边的朋友都是这样', '不知道该怎么办',
+          '大家帮忙出出主意', '说实话我能理解', '这个事情确实不好说', '双方父母见过面了', '工资也就那样',
+          '买房已经掏空了家底', '她说这是习俗', '我妈觉得不合适', '结婚是两个人的事', '最后还是要看感情']
+PUNCTUATION = ['，'] * 10 + ['。'] * 5 + ['！'] * 3 + ['？'] * 2 + ['!!', '？？', '；', '...', ' ', '"']
+SPECIAL = ['😂', '😭', '[图片]', '#彩礼#', '@吧友', '～～', '【求助】', '→', '♥']
+TITLES = ['{region}彩礼{amount}合理吗', '彩礼问题求助', '{region}这边彩礼一般多少', '女方要{amount}彩礼',
+          '关于彩礼的一些看法', '彩礼谈崩了', '{amount}彩礼加{form}', '订婚前想问问大家', '{region}的彩礼行情',
+          '彩礼该不该给']
+REGION_TEMPLATES = ['我们{}这边', '{}的', '在{}', '{}那边', '老家{}']
+FORM_TEMPLATES = ['还要{}', '{}也要有', '加上{}', '{}另算']
+
+
+def _vocabulary():
+    # 各词典的词摊平成列表，关键词多的地区被抽到的机会也多
+    regions = [word for words in region_amount_keywords.values() for word in words]
+    forms = [word for words in betrothal_forms.values() for word in words]
+    attitudes = [word for words in attitude_keywords.values() for word in words]
+    fallbacks = [word for words in attitude_fallback_words.values() for word in words]
+    return regions, forms, attitudes, fallbacks
+
+
+# 金额的几种写法：18万、18w、8千、188,000元、6万8、5000块、纯数字（不足100时按万元计）
+def _amount(rng):
+    wan = max(0.1, round(rng.lognormvariate(2.6, 0.6), 1))
+    style = rng.random()
+    if style < 0.45:
+        return f'{wan:g}万'
+    if style < 0.55:
+        return f'{wan:g}w'
+    if style < 0.65:
+        return f'{int(wan * 10)}千'
+    if style < 0.75:
+        return f'{int(wan * 10000):,}元'
+    if style < 0.85:
+        return f'{int(wan)}万{rng.randint(1, 9)}'
+    if style < 0.93:
+        return f'{int(wan * 10000)}块'
+    return str(int(wan))
+
+
+def _post_text(rng, vocab):
+    regions, forms, attitudes, fallbacks = vocab
+    pieces = rng.sample(FILLER, rng.randint(1, 5))
+    if rng.random() < PLANT_RATES['region']:
+        pieces.insert(rng.randint(0, len(pieces)), rng.choice(REGION_TEMPLATES).format(rng.choice(regions)))
+    if rng.random() < PLANT_RATES['amount']:
+        pieces.append(f'彩礼{_amount(rng)}' if rng.random() < 0.5 else f'要{_amount(rng)}彩礼')
+    if rng.random() < PLANT_RATES['virtual']:
+        pieces.append(f'彩礼{rng.choice(virtual_amount_words)}')
+    if rng.random() < PLANT_RATES['form']:
+        for form in rng.sample(forms, rng.randint(1, 3)):
+            pieces.append(rng.choice(FORM_TEMPLATES).format(form))
+    if rng.random() < PLANT_RATES['attitude']:
+        pieces.append(rng.choice(attitudes))
+    if rng.random() < PLANT_RATES['fallback']:
+        pieces.append(f'我觉得{rng.choice(fallbacks)}')
+    if rng.random() < PLANT_RATES['rational']:
+        pieces.insert(0, f'{rng.choice(rational_words)}来看')
+    text = ''
+    for piece in pieces:
+        if rng.random() < 0.3:
+            piece += rng.choice(emotional_words)
+        text += piece + rng.choice(PUNCTUATION)
+    if rng.random() < PLANT_RATES['special']:
+        text += rng.choice(SPECIAL)
+    return text
+
+
+def _post_title(rng, vocab):
+    regions, forms = vocab[:2]
+    return rng.choice(TITLES).format(region=rng.choice(regions), amount=_amount(rng), form=rng.choice(forms))
+
+
+# 生成一块合成帖子：数值列用numpy按分布抽样，文本逐条拼接
+def synthetic_chunk(rows, start, seed=42, total=None):
+    total = total or rows
+    rng = random.Random(seed * 1000003 + start)
+    nrng = np.random.default_rng([seed, start])
+    vocab = _vocabulary()
+
+    # 发帖人：少数人发很多帖（Zipf分布），人数约为帖子数的1/4
+    users = np.minimum(nrng.zipf(1.3, rows), max(total // 4, 1))
+    gender = nrng.choice(3, rows, p=[0.2, 0.45, 0.35])
+    # 2025年里的发帖时间，最后回复在发帖后几分钟到几天
+    create = 1735660800 + nrng.integers(0, 334 * 86400, rows)
+    last = create + nrng.exponential(6 * 3600, rows).astype(np.int64)
+    df = pd.DataFrame({
+        'user_name': [f'吧友{u}' for u in users],
+        'nick_name': [f'昵称{u}' for u in users],
+        'level': (users % 18 + 1).astype(np.int64),
+        'glevel': (users % 10).astype(np.int64),
+        'gender': gender,
+        'is_vip': nrng.random(rows) < 0.08,
+        'title': [_post_title(rng, vocab) for _ in range(rows)],
+        'text': [_post_text(rng, vocab) for _ in range(rows)],
+        'view': nrng.lognormal(5, 1.5, rows).astype(np.int64),
+        'reply': nrng.geometric(0.08, rows) - 1,
+        'share': nrng.poisson(0.3, rows),
+        'agree': nrng.geometric(0.2, rows) - 1,
+        'disagree': nrng.poisson(0.2, rows),
+        'create_time': format_local_times(create),
+        'last_time': format_local_times(last),
+        'tid': 9000000000 + start + np.arange(rows),
+    }, columns=COLUMNS)
+
+    # 重复爬到的帖子：整行复制同一块里更早的帖子
+    source = np.arange(rows)
+    dup = np.flatnonzero(nrng.random(rows) < DUPLICATE_RATE)
+    dup = dup[dup > 0]
+    source[dup] = nrng.integers(0, dup)
+    df = df.iloc[source].reset_index(drop=True)
+    df.loc[nrng.random(rows) < MISSING_RATE, 'user_name'] = np.nan
+    df.loc[nrng.random(rows) < MISSING_RATE / 2, 'title'] = np.nan
+    return df
+
+
+# 合成语料CSV（与爬虫写出的格式相同：utf-8-sig、\r\n换行），按块生成，内存只与块大小有关
+def synthetic_corpus(path, rows, seed=42, chunk=200000):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        for start in range(0, rows, chunk):
+            df = synthetic_chunk(min(chunk, rows - start), start, seed=seed, total=rows)
+            df.to_csv(f, header=start == 0, index=False, lineterminator='\r\n')
+    os.replace(tmp_path, path)
+    return path
+
+
+# 同样行数和种子的语料只生成一次
+def corpus_path(rows, seed=42, bench_dir=DEFAULT_BENCH_DIR):
+    path = os.path.join(bench_dir, 'corpus', f'corpus_{rows}_s{seed}_v{GENERATOR_VERSION}.csv')
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        start = time.perf_counter()
+        synthetic_corpus(path, rows, seed=seed)
+        print(f"生成{rows}行合成语料：{time.perf_counter() - start:.1f}s，"
+              f"{os.path.getsize(path) / 1024 / 1024:.0f}MB -> {path}")
+    return path
+
+
+# ====================== 各项基准 ======================
+# 每项是一个函数(ctx)：先做不计时的准备，返回要计时的无参函数
+# ctx：{'csv': 语料路径, 'rows': 行数, 'workers': 进程数, 'tmp': 临时目录}，加载过的语料放在ctx['df']
+def _corpus(ctx):
+    if 'df' not in ctx:
+        ctx['df'] = corpus.load_corpus(ctx['csv'])
+    return ctx['df']
+
+
+def bench_load(ctx):
+    return lambda: corpus.load_corpus(ctx['csv'], rebuild=True)
+
+
+def bench_load_cached(ctx):
+    corpus.load_corpus(ctx['csv'])
+
+    def run():
+        corpus._loaded.clear()
+        return corpus.load_corpus(ctx['csv'])
+    return run
+
+
+def bench_clean(ctx):
+    return lambda: clean_csv(ctx['csv'], os.path.join(ctx['tmp'], 'clean.csv'))
+
+
+def bench_heat_topk(ctx):
+    return lambda: stream_top_k([ctx['csv']], k=100)
+
+
+def bench_category(ctx):
+    df = _corpus(ctx)
+    return lambda: betrothal_form_stats(df, label_cache=None)
+
+
+def bench_region_amount(ctx):
+    texts = _corpus(ctx)['分析文本']
+    return lambda: extract_region_amounts(texts)
+
+
+def bench_attitude(ctx):
+    texts = _corpus(ctx)['分析文本']
+    return lambda: texts.apply(classify_c彩礼_attitude)
+
+
+def bench_tone(ctx):
+    texts = _corpus(ctx)['分析文本']
+    return lambda: extract_tone_features(texts, workers=ctx['workers'])
+
+
+def bench_tokenize(ctx):
+    texts = _corpus(ctx)['text'].tolist()
+    return lambda: tokenize_texts(texts, cache=None, workers=ctx['workers'])
+
+
+# 词频：分词结果先进缓存（不计时），只测建词频索引和合计
+def bench_word_count(ctx):
+    df = _corpus(ctx)
+    tokenize_texts(df['text'], workers=ctx['workers'])
+
+    def run():
+        index = WordIndex(index_dir=None)
+        index.update(df, 'bench')
+        return index.counts().most_common(100)
+    return run
+
+
+BENCHMARKS = {
+    'load': bench_load,                    # 解析CSV、派生列、写语料缓存
+    'load_cached': bench_load_cached,      # 读语料缓存
+    'clean': bench_clean,                  # 分块清洗去重
+    'heat_topk': bench_heat_topk,          # 流式热度前100
+    'category': bench_category,            # 彩礼形式 + 地区分类
+    'region_amount': bench_region_amount,  # 地域金额提取
+    'attitude': bench_attitude,            # 态度分类
+    'tone': bench_tone,                    # 语气特征
+    'tokenize': bench_tokenize,            # jieba分词（不用缓存）
+    'word_count': bench_word_count,        # 词频统计
+}
+
+
+# 在rows行的合成语料上跑选中的基准，每项重复repeat次取最快
+# 在bench_dir里运行，各脚本默认写到./result/.cache的缓存都落在测速目录里，不影响真实数据的缓存
+def run_suite(sizes, names=None, repeat=1, workers=None, seed=42, bench_dir=DEFAULT_BENCH_DIR):
+    names = names or list(BENCHMARKS)
+    bench_dir = os.path.abspath(bench_dir)
+    results = []
+    for rows in sizes:
+        csv_path = corpus_path(rows, seed=seed, bench_dir=bench_dir)
+        with tempfile.TemporaryDirectory(dir=bench_dir) as tmp_dir, contextlib.chdir(tmp_dir):
+            ctx = {'csv': csv_path, 'rows': rows, 'workers': workers, 'tmp': tmp_dir}
+            for name in names:
+                run = BENCHMARKS[name](ctx)
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start)
+                best = min(times)
+                results.append({'bench': name, 'rows': rows, 'seconds': best, 'rows_per_s': rows / best,
+                                'runs': times})
+                print(f"{rows:>9}行  {name:<14}{best:9.3f}s  {rows / best:12,.0f}行/s")
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results, path=None, seed=42, workers=None, bench_dir=DEFAULT_BENCH_DIR):
+    path = path or os.path.join(bench_dir, 'runs', f'bench_{datetime.now():%Y%m%d_%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': workers,
+        'seed': seed,
+        'generator_version': GENERATOR_VERSION,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+# 对比两次结果（同一项、同一行数），慢了tolerance以上的算退步
+def compare_results(old, new, tolerance=0.1):
+    old_times = {(r['bench'], r['rows']): r['seconds'] for r in old['results']}
+    regressions = []
+    print(f"对比：{old.get('created')}（{old.get('commit')}） -> {new.get('created')}（{new.get('commit')}）")
+    for r in new['results']:
+        key = (r['bench'], r['rows'])
+        if key not in old_times:
+            continue
+        ratio = r['seconds'] / old_times[key]
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  <- 变慢'
+            regressions.append({**r, 'old_seconds': old_times[key], 'ratio': ratio})
+        elif ratio < 1 - tolerance:
+            flag = '  变快'
+        print(f"{r['rows']:>9}行  {r['bench']:<14}{old_times[key]:9.3f}s -> {r['seconds']:9.3f}s  "
+              f"{ratio:5.2f}x{flag}")
+    return regressions
+
+
+def _load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='基准测试套件：在合成语料上测各分析步骤，结果存JSON并可与之前比较')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='语料行数（可以多个，如 10000 100000 1000000 10000000）')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='BENCH',
+                        help=f"只跑这些基准：{', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=1, help='每项重复次数，取最快的一次')
+    parser.add_argument('--workers', type=int, default=None, help='语气特征和分词的进程数（默认CPU核数）')
+    parser.add_argument('--seed', type=int, default=42, help='合成语料的随机种子')
+    parser.add_argument('--bench-dir', default=DEFAULT_BENCH_DIR, help='合成语料、缓存和结果JSON的目录')
+    parser.add_argument('--output', default=None, help='结果JSON路径（默认bench-dir/runs/bench_时间.json）')
+    parser.add_argument('--compare', default=None, metavar='JSON', help='跑完后与这次结果比较')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help='不跑基准，只比较两个结果JSON')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='慢了多少比例算退步（默认10%%）')
+    parser.add_argument('--generate', action='store_true', help='只生成合成语料（--sizes指定行数）')
+    args = parser.parse_args()
+
+    if args.diff:
+        regressions = compare_results(*map(_load_report, args.diff), tolerance=args.tolerance)
+    elif args.generate:
+        for size in args.sizes:
+            corpus_path(size, seed=args.seed, bench_dir=args.bench_dir)
+        regressions = []
+    else:
+        results = run_suite(args.sizes, names=args.only, repeat=args.repeat, workers=args.workers, seed=args.seed,
+                            bench_dir=args.bench_dir)
+        path = save_results(results, args.output, seed=args.seed, workers=args.workers, bench_dir=args.bench_dir)
+        print(f"结果已保存：{path}")
+        regressions = compare_results(_load_report(args.compare), _load_report(path),
+                                      tolerance=args.tolerance) if args.compare else []
+    if regressions:
+        print(f"有{len(regressions)}项变慢超过{args.tolerance:.0%}")
+        sys.exit(1)
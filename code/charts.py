@@ -0,0 +1,307 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# 报告要能无人值守运行：固定使用非交互后端，plt.show()不会阻塞，进程池里也能直接画图
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from instrument import span, traced
+
+DEFAULT_CHART_CACHE = './result/.cache/charts.json'
+CHART_CACHE_VERSION = 1  # 画图代码改变时加1，让所有图重新生成
+# 所有图共用的字体设置（子进程里也要生效，所以放在这里而不是各个脚本里）
+RC_PARAMS = {'font.sans-serif': ['SimHei'], 'axes.unicode_minus': False}
+plt.rcParams.update(RC_PARAMS)
+
+
+# ====================== 图的声明：数据 + 样式 ======================
+# 一张子图：kind是画法，data是要画的Series/DataFrame，其余是样式
+#   pie      Series，index作标签        colors/explode/autopct/startangle/textprops/autotext（百分比文字样式）
+#   bar      Series，index作横轴        color/alpha/width
+#   grouped  DataFrame，行作横轴、列作并排的柱  width/colors（每行的颜色）/alphas（每列的透明度）
+#   line     Series                    color/marker/linewidth/fill（填充透明度）
+#   frame    DataFrame.plot(**plot)    stacked柱状图、箱线图等直接用pandas画
+#   wordcloud 词频dict                 wordcloud（WordCloud参数），整张图就是词云
+# 各种画法共用的样式：title/title_kw/xlabel/ylabel/xticks/xticklabels/xtick_rotation/xtick_ha/
+#   grid/legend/legend_labels/bar_labels（柱上的数值标签）/twin（右侧纵轴上再画一条折线）/axis_off
+def panel(kind, data, **style):
+    return {'kind': kind, 'data': data, **style}
+
+
+# 一张图片：若干子图按layout排列，保存到path
+def figure(path, panels, title=None, title_kw=None, layout=(1, 1), figsize=(10, 6), dpi=300,
+           bbox_inches='tight', tight_layout=True):
+    if isinstance(panels, dict):
+        panels = [panels]
+    return {'path': path, 'panels': panels, 'title': title, 'title_kw': title_kw or {}, 'layout': tuple(layout),
+            'figsize': tuple(figsize), 'dpi': dpi, 'bbox_inches': bbox_inches, 'tight_layout': tight_layout}
+
+
+# ====================== 各种画法 ======================
+def _draw_pie(ax, data, p):
+    _, _, autotexts = ax.pie(
+        data.values,
+        labels=p.get('labels', list(data.index)),
+        colors=p.get('colors'),
+        autopct=p.get('autopct', '%1.1f%%'),
+        startangle=p.get('startangle', 90),
+        explode=p.get('explode'),
+        textprops=p.get('textprops'),
+    )
+    for autotext in autotexts:
+        autotext.set(**p.get('autotext', {}))
+
+
+def _draw_bar(ax, data, p):
+    ax.bar([str(x) for x in data.index], data.values, color=p.get('color'), alpha=p.get('alpha'),
+           width=p.get('width', 0.8))
+
+
+def _draw_grouped(ax, data, p):
+    width = p.get('width', 0.25)
+    alphas = p.get('alphas', [None] * data.shape[1])
+    positions = np.arange(len(data))
+    for j, col in enumerate(data.columns):
+        offset = (j - (data.shape[1] - 1) / 2) * width
+        ax.bar(positions + offset, data[col].values, width, label=str(col), color=p.get('colors'), alpha=alphas[j])
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(x) for x in data.index])
+
+
+def _draw_line(ax, data, p):
+    ax.plot(data.index, data.values, marker=p.get('marker'), linewidth=p.get('linewidth'), color=p.get('color'))
+    if p.get('fill') is not None:
+        ax.fill_between(data.index, data.values, alpha=p['fill'], color=p.get('color'))
+
+
+def _draw_frame(ax, data, p):
+    data.plot(ax=ax, **p.get('plot', {}))
+
+
+DRAW = {'pie': _draw_pie, 'bar': _draw_bar, 'grouped': _draw_grouped, 'line': _draw_line, 'frame': _draw_frame}
+
+
+def _decorate(ax, p):
+    if p.get('title'):
+        ax.set_title(p['title'], **{'fontsize': 14, **p.get('title_kw', {})})
+    if p.get('xlabel') is not None:
+        ax.set_xlabel(p['xlabel'], **p.get('label_kw', {}))
+    if p.get('ylabel') is not None:
+        ax.set_ylabel(p['ylabel'], **p.get('label_kw', {}))
+    if p.get('xticks') is not None:
+        ax.set_xticks(p['xticks'])
+    if p.get('xticklabels') is not None:
+        ax.set_xticklabels(p['xticklabels'])
+    if p.get('xtick_rotation') is not None:
+        plt.setp(ax.get_xticklabels(), rotation=p['xtick_rotation'], ha=p.get('xtick_ha', 'center'))
+    if p.get('grid'):
+        ax.grid(**(p['grid'] if isinstance(p['grid'], dict) else {}))
+    # 柱上的数值标签：fmt是format格式，min以下的不标；position='center'时标在柱子中间（堆叠图）
+    if p.get('bar_labels'):
+        options = dict(p['bar_labels'])
+        fmt, low = options.pop('fmt', '{:.0f}'), options.pop('min', None)
+        position = options.pop('position', 'edge')
+        for container in ax.containers:
+            values = [bar.get_height() for bar in container]
+            labels = [fmt.format(v) if low is None or v > low else '' for v in values]
+            ax.bar_label(container, labels=labels, label_type=position, **options)
+    if p.get('legend'):
+        options = p['legend'] if isinstance(p['legend'], dict) else {}
+        if p.get('legend_labels'):
+            ax.legend(p['legend_labels'], **options)
+        else:
+            ax.legend(**options)
+    if p.get('twin'):
+        twin = dict(p['twin'])
+        series, ylabel = twin.pop('data'), twin.pop('ylabel', None)
+        ax2 = ax.twinx()
+        series.plot(kind='line', ax=ax2, **twin)
+        if ylabel:
+            ax2.set_ylabel(ylabel, fontsize=12, color=twin.get('color'))
+    if p.get('axis_off'):
+        ax.axis('off')
+
+
+def _save_path(path):
+    root, ext = os.path.splitext(path)
+    return f'{root}.tmp{ext}'
+
+
+# 在当前进程里画一张图；先写临时文件再替换，中途退出不会留下半张图
+@traced()
+def render_figure(spec):
+    plt.rcParams.update(RC_PARAMS)
+    path = spec['path']
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = _save_path(path)
+    first = spec['panels'][0]
+    if first['kind'] == 'wordcloud':
+        from wordcloud import WordCloud
+        WordCloud(**first.get('wordcloud', {})).generate_from_frequencies(first['data']).to_file(tmp_path)
+    else:
+        fig, axes = plt.subplots(*spec['layout'], figsize=spec['figsize'], squeeze=False)
+        for ax, p in zip(axes.flat, spec['panels']):
+            DRAW[p['kind']](ax, p['data'], p)
+            _decorate(ax, p)
+        if spec['title']:
+            fig.suptitle(spec['title'], **{'fontsize': 16, 'fontweight': 'bold', **spec['title_kw']})
+        if spec['tight_layout']:
+            fig.tight_layout()
+        with span('charts.savefig', path=os.path.basename(path)):
+            fig.savefig(tmp_path, dpi=spec['dpi'], bbox_inches=spec['bbox_inches'])
+        plt.close(fig)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ====================== 按数据和样式的哈希跳过没变的图 ======================
+def _feed(h, obj):
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        columns = list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name
+        h.update(repr((type(obj).__name__, columns, list(obj.index.names), obj.shape)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for key, value in obj.items():
+            _feed(h, key)
+            _feed(h, value)
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for value in obj:
+            _feed(h, value)
+        h.update(b']')
+    else:
+        h.update(repr(obj).encode())
+        h.update(b'\0')
+
+
+def chart_key(spec):
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, (CHART_CACHE_VERSION, matplotlib.__version__, RC_PARAMS))
+    _feed(h, spec)
+    return h.hexdigest()
+
+
+def _load_manifest(cache_path):
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _update_manifest(cache_path, entries):
+    if not cache_path:
+        return
+    # 其他进程（如pipeline并行的阶段）可能同时写了清单，写之前重新读一次再合并
+    manifest = _load_manifest(cache_path)
+    manifest.update(entries)
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+# 不是用matplotlib画的图（如map.py的pyecharts网页）：data和样式没变、文件也还在时不调用render(path)，返回是否重新生成
+def render_if_changed(path, spec, render, cache_path=DEFAULT_CHART_CACHE):
+    key = chart_key({'path': path, 'spec': spec})
+    if _load_manifest(cache_path).get(os.path.abspath(path)) == key and os.path.exists(path):
+        return False
+    render(path)
+    _update_manifest(cache_path, {os.path.abspath(path): key})
+    return True
+
+
+# 画一批图：数据和样式都没变、图片也还在的跳过，其余交给进程池并行画，返回(新画的, 跳过的)张数
+@traced()
+def render_charts(specs, workers=None, cache_path=DEFAULT_CHART_CACHE, force=False):
+    manifest = _load_manifest(cache_path)
+    keys = {os.path.abspath(spec['path']): chart_key(spec) for spec in specs}
+    todo = [spec for spec in specs
+            if force or manifest.get(os.path.abspath(spec['path'])) != keys[os.path.abspath(spec['path'])]
+            or not os.path.exists(spec['path'])]
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    # 各分析脚本的代码都写在模块顶层，spawn方式的子进程会把整个脚本重新运行一遍，所以只在能fork时用进程池
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            list(pool.map(render_figure, todo))
+    else:
+        for spec in todo:
+            render_figure(spec)
+
+    if todo:
+        _update_manifest(cache_path, {os.path.abspath(spec['path']): keys[os.path.abspath(spec['path'])]
+                                      for spec in todo})
+    return len(todo), len(specs) - len(todo)
+
+
+# ====================== 测速 ======================
+def synthetic_charts(out_dir, figures=24, seed=0):
+    rng = np.random.default_rng(seed)
+    specs = []
+    for i in range(figures):
+        days = pd.Series(rng.integers(0, 200, 30), index=[f'11月{d}日' for d in range(1, 31)])
+        hours = pd.Series(rng.integers(0, 80, 24), index=range(24))
+        share = pd.Series(rng.integers(1, 100, 6), index=[f'类别{j}' for j in range(6)])
+        groups = pd.DataFrame(rng.integers(0, 100, (8, 5)), index=[f'地区{j}' for j in range(8)],
+                              columns=[f'形式{j}' for j in range(5)])
+        specs.append(figure(os.path.join(out_dir, f'chart{i}.png'), [
+            panel('bar', days, color='#1f77b4', title='按日期', xtick_rotation=45, grid={'axis': 'y'}),
+            panel('line', hours, color='#ff7f0e', marker='o', fill=0.3, title='按小时'),
+            panel('pie', share, autotext={'color': 'white'}, title='占比'),
+            panel('frame', groups, plot={'kind': 'bar', 'stacked': True}, legend={'title': '形式'},
+                  bar_labels={'fmt': '{:.0f}', 'min': 30, 'position': 'center', 'fontsize': 7}),
+        ], title=f'测试图{i}', layout=(2, 2), figsize=(16, 12)))
+    return specs
+
+
+def benchmark(figures=24, workers=None):
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as out_dir:
+        specs = synthetic_charts(out_dir, figures)
+        cache_path = os.path.join(out_dir, 'charts.json')
+        print(f"测试图：{figures}张（2x2子图，dpi=300），进程数{workers}")
+
+        start = time.perf_counter()
+        for spec in specs:
+            render_figure(spec)
+        serial = time.perf_counter() - start
+        print(f"主进程逐张画：{serial:.2f}s")
+
+        start = time.perf_counter()
+        rendered, skipped = render_charts(specs, workers=workers, cache_path=cache_path, force=True)
+        pooled = time.perf_counter() - start
+        print(f"进程池画（{rendered}张）：{pooled:.2f}s  加速{serial / pooled:.1f}x")
+
+        start = time.perf_counter()
+        rendered, skipped = render_charts(specs, workers=workers, cache_path=cache_path)
+        cached = time.perf_counter() - start
+        assert rendered == 0 and skipped == figures
+        print(f"数据没变再运行：跳过{skipped}张，用时{cached:.3f}s")
+
+        # 只改一张图的一个数据，只有这一张重新画
+        specs[0]['panels'][0]['data'].iloc[0] += 1
+        rendered, skipped = render_charts(specs, workers=workers, cache_path=cache_path)
+        assert rendered == 1 and skipped == figures - 1
+        print(f"改动一张图的数据：重新画{rendered}张，跳过{skipped}张")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='图表渲染：非交互后端 + 进程池 + 按数据哈希缓存，测速')
+    parser.add_argument('--figures', type=int, default=24, help='测试图数量')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    args = parser.parse_args()
+    benchmark(figures=args.figures, workers=args.workers)
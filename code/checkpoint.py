@@ -0,0 +1,44 @@
+import json
+import os
+import time
+
+
+# 每个贴吧一条断点记录：
+#   last_page          上次爬到的页码
+#   newest_create_time 已见过的最新发帖时间（时间戳）
+#   newest_last_time   已见过的最新回复时间（时间戳）
+#   complete           上次完整爬取是否已经结束（False表示中途退出，需要从last_page之后续爬）
+class CheckpointStore:
+    def __init__(self, path='./result/checkpoint.json'):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def get(self, tb):
+        return self.data.get(tb)
+
+    def update(self, tb, last_page, newest_create_time=0, newest_last_time=0, complete=True):
+        old = self.data.get(tb, {})
+        self.data[tb] = {
+            'last_page': last_page,
+            # 增量爬取只会看到更新的帖子，所以取新旧两者的较大值
+            'newest_create_time': max(newest_create_time, old.get('newest_create_time', 0)),
+            'newest_last_time': max(newest_last_time, old.get('newest_last_time', 0)),
+            'complete': complete,
+            'updated_at': int(time.time())
+        }
+        self.save()
+
+    def reset(self, tb):
+        self.data.pop(tb, None)
+        self.save()
+
+    def save(self):
+        # 先写临时文件再替换，避免中途退出把断点文件写坏
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
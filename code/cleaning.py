@@ -1,30 +1,215 @@
-import pandas as pd
+import argparse
 import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from instrument import phase, traced
+
+KEY_COLUMNS = ['user_name', 'title', 'create_time']  # 去重口径（与dataHelper.row_keys一致）
+REQUIRED_COLUMNS = ['user_name', 'title']              # 关键字段缺失则删除
+# 清理文本：去除特殊字符；不用原始字符串，让\u转义先变成汉字本身（pyarrow字符串列的正则引擎不支持\u）
+TEXT_PATTERN = '[^\u4e00-\u9fa5a-zA-Z0-9\\s]'
+
+
+# 已见过的帖子指纹（64位哈希）：若干段有序的uint64数组，每个帖子只占8字节
+# 新的一段加进来时，和前一段长度相近就合并（像二进制进位），段数保持在log(n)以内
+class FingerprintSet:
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+    # 返回keys中第一次出现（之前没见过、本批里也是第一个）的位置，并把它们记下
+    def add_new(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        unique, first = np.unique(keys, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            new &= run[pos] != unique
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[first[new]] = True
+        if new.any():
+            self._push(unique[new])
+        return mask
+
+    def _push(self, run):
+        self.runs.append(run)
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            merged = np.concatenate([self.runs.pop(), last])
+            merged.sort(kind='stable')  # 两段各自有序，stable排序（timsort）接近线性
+            self.runs.append(merged)
+
+
+# 帖子指纹：(user_name, title, create_time)三元组的Python内置哈希（64位）
+# 字符串哈希每个进程的种子不同，但一个文件只在一个进程里清洗，指纹不跨进程比较；比hash_pandas_object快约4倍
+def key_fingerprints(chunk):
+    columns = [chunk[col].fillna('\0').tolist() for col in KEY_COLUMNS]  # 缺失值彼此相同（与drop_duplicates一致）
+    return np.fromiter(map(hash, zip(*columns)), dtype=np.int64, count=len(chunk)).view(np.uint64)
+
+
+# 逐块清洗一个CSV：删除关键字段缺失的行、按(user_name, title, create_time)跨块去重、清理text中的特殊字符
+# 内存只与块大小和不重复帖子数（每个8字节）有关；所有列按字符串读写，不会改变原来的数字格式
+@traced()
+def clean_csv(in_path, out_path, chunksize=200000):
+    stats = {'file': os.path.basename(in_path), 'rows': 0, 'missing': 0, 'duplicates': 0, 'kept': 0, 'columns': 0}
+    seen = FingerprintSet()
+    tmp_path = out_path + '.tmp'
+    # 整个输出只打开一次，utf-8-sig的BOM只写在文件开头
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        for i, chunk in enumerate(pd.read_csv(in_path, chunksize=chunksize, dtype=str, encoding='utf-8-sig')):
+            stats['rows'] += len(chunk)
+            stats['columns'] = chunk.shape[1]
+            # 1. 删除缺失值
+            present = chunk.dropna(subset=REQUIRED_COLUMNS)
+            stats['missing'] += len(chunk) - len(present)
+            # 2. 去重：和之前所有块里的帖子比较指纹
+            kept = present[seen.add_new(key_fingerprints(present))]
+            stats['duplicates'] += len(present) - len(kept)
+            # 3. 清理文本
+            kept = kept.assign(text=kept['text'].astype(str).str.replace(TEXT_PATTERN, '', regex=True))
+            kept.to_csv(f, header=i == 0, index=False)
+            stats['kept'] += len(kept)
+    os.replace(tmp_path, out_path)
+    stats['fingerprint_mb'] = seen.nbytes / 1024 / 1024
+    return stats
+
+
+def _clean_one(args):
+    return clean_csv(*args)
+
+
+# 多个吧的CSV并行清洗（每个文件各自去重），返回每个文件的统计
+def clean_files(paths, out_paths, chunksize=200000, workers=None):
+    jobs = [(path, out, chunksize) for path, out in zip(paths, out_paths)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [_clean_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_clean_one, jobs))
+
+
+# ====================== 原来的整表清洗（用于核对结果和测速） ======================
+def clean_naive(in_path, out_path):
+    df = pd.read_csv(in_path, encoding='utf-8-sig')
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    df = df.drop_duplicates(subset=KEY_COLUMNS)
+    df['text'] = df['text'].astype(str).str.replace(TEXT_PATTERN, '', regex=True)
+    df.to_csv(out_path, index=False, encoding='utf-8-sig')
+    return len(df)
+
+
+# 生成合成的吧数据：约10%的帖子在后面重复出现（跨块），约1%缺少user_name或title
+def synthetic_forum_csv(path, rows, chunk=200000, seed=42):
+    rng = np.random.default_rng(seed)
+    phrases = ['彩礼给了多少', '！！', '这个价格合理吗？', '😊', '江浙沪20万', '#话题#', 'hello world', '【求助】', '\n']
+    written = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        while written < rows:
+            n = min(chunk, rows - written)
+            ids = np.arange(written, written + n)
+            # 重复的帖子取自之前出现过的编号
+            dup = rng.random(n) < 0.1
+            ids[dup] = rng.integers(0, np.maximum(written + np.flatnonzero(dup), 1))
+            text = [phrases[i % len(phrases)] + phrases[(i * 7) % len(phrases)] + str(i) for i in ids]
+            df = pd.DataFrame({
+                'tid': ids + 10 ** 9,
+                'title': [f'标题{i}' for i in ids],
+                'text': text,
+                'user_name': [f'用户{i % 50000}' for i in ids],
+                'create_time': pd.to_datetime(ids * 37 + 1.7e9, unit='s').astype(str),
+                'view': ids % 1000,
+                'reply': ids % 97,
+                'gender': ids % 3,
+            })
+            missing = rng.random(n) < 0.01
+            df.loc[missing, 'user_name'] = np.nan
+            df.loc[rng.random(n) < 0.005, 'title'] = np.nan
+            df.to_csv(f, header=written == 0, index=False)
+            written += n
+
+
+def _memory_worker(mode, path, out_path, chunksize):
+    import resource
+    start = time.perf_counter()
+    if mode == 'naive':
+        clean_naive(path, out_path)
+    else:
+        clean_csv(path, out_path, chunksize=chunksize)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下单位是KB，macOS下是字节
+    print(elapsed, peak / 1024 / (1024 if sys.platform == 'darwin' else 1))
 
-# 让用户输入要清洗的CSV文件名（如"相亲吧.csv"）
-file_name = input("请输入要清洗的CSV文件名（含后缀，如：相亲吧.csv）：")
-file_path = f"./result/{file_name}"
 
-# 检查文件是否存在
-if os.path.exists(file_path):
-    # 读取数据
-    df = pd.read_csv(file_path, encoding='utf-8-sig')
+# 在合成的大文件上比较整表清洗与分块清洗的耗时和峰值内存（各自在独立的子进程里运行），并核对结果一致
+def benchmark(rows=5000000, chunksize=200000, files=2):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'forum.csv')
+        start = time.perf_counter()
+        synthetic_forum_csv(path, rows)
+        print(f"生成{rows}行合成数据：{time.perf_counter() - start:.1f}s，"
+              f"CSV大小{os.path.getsize(path) / 1024 / 1024:.0f}MB")
+        outputs = {}
+        for mode in ('chunked', 'naive'):
+            outputs[mode] = os.path.join(tmp_dir, f'clean_{mode}.csv')
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--memory-worker', mode, path,
+                                  outputs[mode], '--chunksize', str(chunksize)],
+                                 capture_output=True, text=True, check=True)
+            elapsed, peak = map(float, out.stdout.split())
+            print(f"{'分块清洗' if mode == 'chunked' else '整表清洗'}：{elapsed:.1f}s，峰值内存{peak:.0f}MB")
 
-    # 数据清洗操作示例
-    print("原始数据形状：", df.shape)
+        # 重新读入比较（分块清洗按原样保留数字格式，整表清洗会把含缺失值的整数列写成x.0）
+        chunked, naive = (pd.read_csv(outputs[mode], encoding='utf-8-sig') for mode in ('chunked', 'naive'))
+        pd.testing.assert_frame_equal(chunked, naive, check_dtype=False)
+        print(f"结果一致：保留{len(chunked)}行")
 
-    # 1. 删除缺失值（可选）
-    df = df.dropna(subset=['user_name', 'title'])  # 关键字段缺失则删除
+        # 多个文件并行清洗
+        paths = [path] * files
+        out_paths = [os.path.join(tmp_dir, f'clean_{i}.csv') for i in range(files)]
+        for workers in sorted({1, min(files, os.cpu_count() or 1)}):
+            start = time.perf_counter()
+            clean_files(paths, out_paths, chunksize=chunksize, workers=workers)
+            print(f"{files}个文件，{workers}进程：{time.perf_counter() - start:.1f}s")
 
-    # 2. 去重（可选）
-    df = df.drop_duplicates(subset=['user_name', 'title', 'create_time'])
 
-    # 3. 清理文本（去除特殊字符）
-    df['text'] = df['text'].astype(str).str.replace(r'[^\u4e00-\u9fa5a-zA-Z0-9\s]', '', regex=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='分块清洗吧数据：删除关键字段缺失的行、跨块去重、清理文本')
+    parser.add_argument('files', nargs='*', help='要清洗的CSV（文件名如相亲吧.csv时在--result-dir下查找）')
+    parser.add_argument('--result-dir', default='./result', help='CSV所在目录，清洗结果保存为clean_原文件名')
+    parser.add_argument('--chunksize', type=int, default=200000, help='每块行数')
+    parser.add_argument('--jobs', type=int, default=None, help='并行清洗的文件数（默认CPU核数）')
+    parser.add_argument('--bench', action='store_true', help='在合成数据上比较内存和耗时')
+    parser.add_argument('--rows', type=int, default=5000000, help='测速用的合成数据行数')
+    parser.add_argument('--memory-worker', nargs=3, metavar=('MODE', 'CSV', 'OUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
 
-    # 保存清洗后的数据
-    clean_file_path = f"./result/clean_{file_name}"
-    df.to_csv(clean_file_path, index=False, encoding='utf-8-sig')
-    print(f"清洗完成！已保存至：{clean_file_path}")
-else:
-    print("文件不存在，请检查文件名！")
\ No newline at end of file
+    if args.memory_worker:
+        _memory_worker(*args.memory_worker, args.chunksize)
+    elif args.bench:
+        benchmark(rows=args.rows, chunksize=args.chunksize)
+    elif not args.files:
+        parser.error('请指定要清洗的CSV文件名，如：python cleaning.py 相亲吧.csv')
+    else:
+        paths = [name if os.path.exists(name) else os.path.join(args.result_dir, name) for name in args.files]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            raise SystemExit(f"文件不存在，请检查文件名：{', '.join(missing)}")
+        out_paths = [os.path.join(os.path.dirname(path), f'clean_{os.path.basename(path)}') for path in paths]
+        phase('cleaning:清洗')
+        results = clean_files(paths, out_paths, args.chunksize, args.jobs)
+        phase(None)
+        for stats, out_path in zip(results, out_paths):
+            print(f"{stats['file']} 原始数据形状：({stats['rows']}, {stats['columns']})，"
+                  f"缺失{stats['missing']}行，重复{stats['duplicates']}行")
+            print(f"清洗完成！已保存至：{out_path}")
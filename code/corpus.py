@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+from instrument import span, traced
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # 没有安装pyarrow时每次都直接解析CSV
+    feather = None
+
+# 缓存格式版本：派生列或类型有变化时加1，旧缓存会自动重建
+CACHE_VERSION = 1
+
+DEFAULT_CSV = './result/彩礼.csv'
+gender_mapping = {0: '未知', 1: '男性', 2: '女性'}
+COUNTER_COLUMNS = ['view', 'reply', 'share', 'agree', 'disagree']
+
+
+# 热度计算公式（与hot.py、hotreason.py一致）：各计数列的加权和
+HEAT_WEIGHTS = {'view': 3, 'reply': 5, 'share': 3, 'agree': 1, 'disagree': 1}
+
+
+def heat(df, weights=None):
+    weights = weights or HEAT_WEIGHTS
+    return sum(df[col] * weight for col, weight in weights.items())
+
+
+# 派生列，hot.py等需要原始列时可以去掉它们
+DERIVED_COLUMNS = ['分析文本', 'gender_mapped', 'create_dt', 'last_dt', '热度']
+
+
+# 填充缺失值并压缩类型（不加派生列），hot.py流式取前K条时也用它整理结果
+def clean_columns(df):
+    df = df.fillna({'text': '', 'title': '', 'gender': 0, 'view': 0, 'reply': 0, 'share': 0,
+                    'agree': 0, 'disagree': 0})
+    df['title'] = df['title'].astype(str)
+    df['text'] = df['text'].astype(str)
+
+    # 压缩类型：计数用int64（浏览量可能很大），等级和性别用小整数，用户名用分类类型
+    for col in COUNTER_COLUMNS:
+        df[col] = df[col].astype('int64')
+    for col in ['level', 'glevel']:
+        if col in df.columns:
+            df[col] = df[col].fillna(0).astype('int8')
+    df['gender'] = df['gender'].astype('int8')
+    for col in ['user_name', 'nick_name']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+# 从原始CSV构建带类型和派生列的语料表
+@traced()
+def build_corpus(csv_path=DEFAULT_CSV):
+    with span('corpus.read_csv') as s:
+        df = pd.read_csv(csv_path)
+        s.rows_out = len(df)
+    df = clean_columns(df)
+
+    # 派生列
+    df['分析文本'] = df['title'] + ' ' + df['text']
+    # gender_mapped保持字符串类型，分类类型的value_counts会带出计数为0的类别
+    df['gender_mapped'] = df['gender'].map(gender_mapping)
+    df['create_dt'] = pd.to_datetime(df['create_time'], errors='coerce')
+    if 'last_time' in df.columns:
+        df['last_dt'] = pd.to_datetime(df['last_time'], errors='coerce')
+    df['热度'] = heat(df)
+    return df
+
+
+def cache_path(csv_path, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.cache')
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f'{stem}.feather')
+
+
+# 源文件的指纹：文件大小 + 修改时间 + 缓存版本，任一变化都会重建缓存
+def source_signature(csv_path):
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'version': CACHE_VERSION}
+
+
+def _read_signature(path):
+    meta_path = path + '.json'
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# 同一进程内已加载的语料（pipeline.py在一个进程里依次运行多个分析脚本时复用）
+_loaded = {}
+# pandas 3起总是写时复制：浅副本上增删列、改值都不会改到缓存里的这份，不必整份复制
+# （pipeline.py fork出的每个子进程也就不会各复制一份语料）；更早的版本仍返回深副本
+_SHALLOW_COPY = int(pd.__version__.split('.')[0]) >= 3
+
+
+# 读取语料：第一次解析CSV并写出Feather缓存，之后直接内存映射读取缓存
+# 返回的是副本，调用方可以随意增删列
+@traced()
+def load_corpus(csv_path=DEFAULT_CSV, cache_dir=None, compression='lz4', rebuild=False):
+    key = (os.path.abspath(csv_path), json.dumps(source_signature(csv_path)))
+    if not rebuild and key in _loaded:
+        return _loaded[key].copy(deep=not _SHALLOW_COPY)
+    df = _load_corpus(csv_path, cache_dir, compression, rebuild)
+    _loaded.clear()
+    _loaded[key] = df
+    return df.copy(deep=not _SHALLOW_COPY)
+
+
+def _load_corpus(csv_path, cache_dir, compression, rebuild):
+    if feather is None:
+        return build_corpus(csv_path)
+
+    path = cache_path(csv_path, cache_dir)
+    signature = source_signature(csv_path)
+    if not rebuild and _read_signature(path) == signature:
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas()
+
+    df = build_corpus(csv_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    feather.write_feather(df, tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump(signature, f)
+    return df
+
+
+# 把现有语料复制scale倍，比较冷启动（解析CSV+建缓存）与热启动（读缓存）的耗时
+def benchmark(csv_path=DEFAULT_CSV, scale=20, repeat=3):
+    base = pd.read_csv(csv_path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        big_path = os.path.join(tmp_dir, 'corpus.csv')
+        pd.concat([base] * scale, ignore_index=True).to_csv(big_path, index=False)
+        print(f"测试语料：{len(base) * scale}行，CSV大小{os.path.getsize(big_path) / 1024 / 1024:.1f}MB")
+
+        start = time.perf_counter()
+        pd.read_csv(big_path)
+        print(f"仅read_csv：{time.perf_counter() - start:.3f}s")
+
+        start = time.perf_counter()
+        load_corpus(big_path, rebuild=True)
+        print(f"冷启动（解析+派生列+写缓存）：{time.perf_counter() - start:.3f}s，"
+              f"缓存大小{os.path.getsize(cache_path(big_path)) / 1024 / 1024:.1f}MB")
+
+        for compression in ('lz4', 'uncompressed'):
+            load_corpus(big_path, compression=compression, rebuild=True)
+            times = []
+            for _ in range(repeat):
+                _loaded.clear()
+                start = time.perf_counter()
+                load_corpus(big_path)
+                times.append(time.perf_counter() - start)
+            print(f"热启动（{compression}缓存）：最快{min(times):.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='语料缓存：解析一次CSV，之后直接读取列式缓存')
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CSV)
+    parser.add_argument('--rebuild', action='store_true', help='强制重建缓存')
+    parser.add_argument('--bench', action='store_true', help='比较冷/热启动耗时')
+    parser.add_argument('--scale', type=int, default=20, help='测速时把语料放大的倍数')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.csv, scale=args.scale)
+    else:
+        corpus = load_corpus(args.csv, rebuild=args.rebuild)
+        print(f"已加载{len(corpus)}行，缓存：{cache_path(args.csv)}")
+        print(corpus.dtypes)
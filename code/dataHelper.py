@@ -1,31 +1,473 @@
+import argparse
 import asyncio
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import time
 from datetime import datetime
+from types import SimpleNamespace
 import aiotieba
 import pandas as pd
 from tqdm import tqdm
+from checkpoint import CheckpointStore
+from instrument import span, traced
+from ratelimit import Scheduler
+from schema import THREAD_SCHEMA, RecordBuffer, csv_frame
+from streamwriter import ThreadWriter, parquet_dir, rewrite_parquet_dataset
 
+# 结果CSV的列（与thread_to_record返回的字段一一对应，类型见schema.THREAD_SCHEMA）
+# tid（帖子ID）放在最后，供回复爬取（replies.py）使用
+COLUMNS = list(THREAD_SCHEMA)
 
-async def main():
+
+# 把一个帖子对象转换成一行记录：时间保留为时间戳，写CSV时再整列格式化
+def thread_to_record(thread):
+    return (thread.user.user_name, thread.user.nick_name_new,
+            thread.user.level, thread.user.glevel, thread.user.gender,
+            thread.user.is_vip, thread.title, thread.text,
+            thread.view_num, thread.reply_num, thread.share_num,
+            thread.agree, thread.disagree,
+            thread.create_time, thread.last_time,
+            thread.tid)
+
+
+# 原来的转换：每行一个元组，时间逐个strftime成字符串（测内存时对照用）
+def thread_to_tuple(thread):
+    return (thread.user.user_name, thread.user.nick_name_new,
+            thread.user.level, thread.user.glevel, thread.user.gender,
+            thread.user.is_vip, thread.title, thread.text,
+            thread.view_num, thread.reply_num, thread.share_num,
+            thread.agree, thread.disagree,
+            datetime.fromtimestamp(thread.create_time).strftime('%Y-%m-%d %H:%M:%S'),
+            datetime.fromtimestamp(thread.last_time).strftime('%Y-%m-%d %H:%M:%S'),
+            thread.tid)
+
+
+# 判断一页是否已经全部是旧数据（回复时间都不晚于断点记录）
+def is_known_page(threads, known_last_time):
+    return known_last_time is not None and all(thread.last_time <= known_last_time for thread in threads)
+
+
+# 只保留比断点更新的帖子
+def new_threads(threads, known_last_time):
+    if known_last_time is None:
+        return threads
+    return [thread for thread in threads if thread.last_time > known_last_time]
+
+
+# 原来的顺序爬取：一页一页地等
+async def iter_pages_sequential(client, tb, pages=100, rn=100, start_page=1, scheduler=None, progress=True):
+    for pn in tqdm(range(start_page, start_page + pages), disable=not progress):
+        if scheduler:
+            yield pn, await scheduler.call(client.get_threads, tb, pn=pn, rn=rn)
+        else:
+            yield pn, await client.get_threads(tb, pn=pn, rn=rn)
+
+
+# 并发爬取：用信号量控制同时在途的请求数，结果仍按页码顺序产出
+# 传入scheduler时并发数由它的AIMD控制器动态调整，并带限速和重试
+async def iter_pages_concurrent(client, tb, pages=100, rn=100, start_page=1, concurrency=8, scheduler=None,
+                                progress=True):
+    semaphore = asyncio.Semaphore(concurrency)
+    bar = tqdm(total=pages, disable=not progress)
+
+    async def fetch(pn):
+        if scheduler:
+            threads = await scheduler.call(client.get_threads, tb, pn=pn, rn=rn)
+        else:
+            async with semaphore:
+                threads = await client.get_threads(tb, pn=pn, rn=rn)
+        bar.update(1)
+        return threads
+
+    tasks = [asyncio.ensure_future(fetch(pn)) for pn in range(start_page, start_page + pages)]
+    try:
+        # 按页码顺序取结果，因此输出顺序是确定的
+        for pn, task in zip(range(start_page, start_page + pages), tasks):
+            yield pn, await task
+    finally:
+        # 提前停止时取消后面还没完成的请求
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        bar.close()
+
+
+def iter_pages(client, tb, pages=100, start_page=1, concurrency=1, scheduler=None, progress=True):
+    if concurrency <= 1:
+        return iter_pages_sequential(client, tb, pages=pages, start_page=start_page, scheduler=scheduler,
+                                     progress=progress)
+    return iter_pages_concurrent(client, tb, pages=pages, start_page=start_page, concurrency=concurrency,
+                                 scheduler=scheduler, progress=progress)
+
+
+# 爬取一个吧：传入writer时每页的数据直接交给writer分批落盘，否则收集到按列存放的RecordBuffer里返回
+async def crawl_forum(client, tb, pages=100, concurrency=1, start_page=1, known_last_time=None, on_page=None,
+                      writer=None, scheduler=None, progress=True):
+    records = RecordBuffer(THREAD_SCHEMA)
+    async with contextlib.aclosing(iter_pages(client, tb, pages=pages, start_page=start_page,
+                                              concurrency=concurrency, scheduler=scheduler,
+                                              progress=progress)) as page_iter:
+        async for pn, threads in page_iter:
+            if on_page:
+                on_page(pn, threads)
+            rows = [thread_to_record(thread) for thread in new_threads(threads, known_last_time)]
+            if writer is not None:
+                writer.write_page(pn, rows)
+            else:
+                records.extend(rows)
+            # 帖子按回复时间倒序排列，整页都是旧数据说明后面也不会有新内容了
+            if not threads or is_known_page(threads, known_last_time):
+                break
+    return records
+
+
+def save_forum(tb, records):
+    with ThreadWriter(f"./result/{tb}.csv", COLUMNS, schema=THREAD_SCHEMA) as writer:
+        writer.write_rows(records)
+
+
+# 用(user_name, title, create_time)作为帖子的唯一标识（与cleaning.py去重口径一致）
+def row_keys(df):
+    return df['user_name'].astype(str) + '\x1f' + df['title'].astype(str) + '\x1f' + df['create_time'].astype(str)
+
+
+# 把增量爬到的数据合并进已有的CSV（以及Parquet副本）
+@traced()
+def merge_forum(tb, records):
+    file_path = f"./result/{tb}.csv"
+    if not os.path.exists(file_path):
+        save_forum(tb, records)
+        return len(records), 0
+    if not records:
+        return 0, 0
+
+    new_df = csv_frame(records.to_frame())
+    new_keys = set(row_keys(new_df))
+    old_keys = row_keys(pd.read_csv(file_path, usecols=['user_name', 'title', 'create_time'], dtype=str,
+                                    keep_default_na=False, encoding='utf-8-sig'))
+    updated = int(old_keys.isin(new_keys).sum())
+    old_columns = pd.read_csv(file_path, nrows=0, encoding='utf-8-sig').columns.tolist()
+
+    if updated == 0 and old_columns == COLUMNS:
+        # 全是新帖：直接追加到文件末尾，不重写整个文件
+        with ThreadWriter(file_path, COLUMNS, append=True, schema=THREAD_SCHEMA) as writer:
+            writer.write_rows(records)
+    else:
+        # 有旧帖被更新（新回复、点赞等）或旧文件的列不同（如没有tid列），用新数据替换旧行；先写临时文件再替换
+        old_df = pd.read_csv(file_path, dtype={'user_name': str, 'title': str, 'create_time': str},
+                             keep_default_na=False, encoding='utf-8-sig')
+        old_df = old_df[~old_keys.isin(new_keys).values]
+        merged = pd.concat([new_df, old_df], ignore_index=True)
+        tmp_path = file_path + '.tmp'
+        merged.to_csv(tmp_path, lineterminator="\r\n", index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, file_path)
+        rewrite_parquet_dataset(merged, parquet_dir(file_path), schema=THREAD_SCHEMA)
+    return len(new_df) - updated, updated
+
+
+async def crawl_and_store(client, tb, store, pages=100, concurrency=1, batch_size=1000, scheduler=None,
+                          progress=True):
+    checkpoint = store.get(tb)
+    seen = {'last_page': 0, 'create_time': 0, 'last_time': 0}
+
+    def on_page(pn, threads):
+        seen['last_page'] = pn
+        for thread in threads:
+            seen['create_time'] = max(seen['create_time'], thread.create_time)
+            seen['last_time'] = max(seen['last_time'], thread.last_time)
+
+    if checkpoint and checkpoint.get('complete', True):
+        # 增量爬取：新数据量不大，收集完后合并进已有数据
+        records = await crawl_forum(client, tb, pages=pages, concurrency=concurrency,
+                                    known_last_time=checkpoint['newest_last_time'], on_page=on_page,
+                                    scheduler=scheduler, progress=progress)
+        added, updated = merge_forum(tb, records)
+        print(f"增量爬取：新增{added}条，更新{updated}条，爬到第{seen['last_page']}页")
+        store.update(tb, seen['last_page'], seen['create_time'], seen['last_time'])
+        return
+
+    # 完整爬取（或上次中途退出后的续爬）：边爬边分批写盘，每次落盘后更新断点
+    start_page = checkpoint['last_page'] + 1 if checkpoint else 1
+    if start_page > 1:
+        print(f"从第{start_page}页继续上次未完成的爬取")
+
+    def on_flush(pn):
+        store.update(tb, pn, seen['create_time'], seen['last_time'], complete=False)
+
+    with ThreadWriter(f"./result/{tb}.csv", COLUMNS, batch_size=batch_size, append=start_page > 1,
+                      on_flush=on_flush, schema=THREAD_SCHEMA) as writer:
+        await crawl_forum(client, tb, pages=pages - start_page + 1, concurrency=concurrency,
+                          start_page=start_page, on_page=on_page, writer=writer, scheduler=scheduler,
+                          progress=progress)
+    store.update(tb, max(seen['last_page'], start_page - 1), seen['create_time'], seen['last_time'])
+
+
+async def main(concurrency=1, pages=100, full=False, batch_size=1000, rate=None, max_concurrency=32, retries=5):
     tb_list = input().split()
-    for tb in tb_list:
-        print(f"--------------------{tb} Begin!--------------------")
-        async with aiotieba.Client() as client:
-            it_tuple = []
-            for pn in tqdm(range(100)):
-                threads = await client.get_threads(tb, pn=pn + 1, rn=100)
-                it_tuple += [(thread.user.user_name, thread.user.nick_name_new, \
-                              thread.user.level, thread.user.glevel, thread.user.gender, \
-                              thread.user.is_vip, thread.title, thread.text, \
-                              thread.view_num, thread.reply_num, thread.share_num, \
-                              thread.agree, thread.disagree,
-                              datetime.fromtimestamp(thread.create_time).strftime('%Y-%m-%d %H:%M:%S'), \
-                              datetime.fromtimestamp(thread.last_time).strftime('%Y-%m-%d %H:%M:%S')) for thread in
-                             threads]
-        df = pd.DataFrame(it_tuple, columns=['user_name', 'nick_name', 'level', 'glevel', \
-                                             'gender', 'is_vip', 'title', 'text', 'view', 'reply', \
-                                             'share', 'agree', 'disagree', 'create_time', 'last_time'])
-        df.to_csv(f"./result/{tb}.csv", lineterminator="\r\n", index=False, encoding='utf-8-sig')
+    store = CheckpointStore()
+    # 限速、重试和自适应并发在所有贴吧之间共享
+    scheduler = Scheduler(rate=rate, concurrency=concurrency, max_concurrency=max_concurrency, retries=retries)
+    # 所有贴吧共用同一个Client，避免每个吧都重新建立连接
+    async with aiotieba.Client() as client:
+        for tb in tb_list:
+            print(f"--------------------{tb} Begin!--------------------")
+            if full:
+                store.reset(tb)
+            with span(f'crawl:{tb}', pages=pages):
+                await crawl_and_store(client, tb, store, pages=pages, concurrency=concurrency,
+                                      batch_size=batch_size, scheduler=scheduler)
+            print(scheduler.stats.summary())
     print("爬取完成！")
 
 
-asyncio.run(main())
\ No newline at end of file
+# ====================== 本地假客户端（用于测试和测速） ======================
+class FakeClient:
+    """模拟aiotieba.Client.get_threads，每次请求固定延迟latency秒（可加随机抖动）"""
+
+    def __init__(self, latency=0.05, jitter=0.0, seed=42, total=100000, now=1700000000, text_len=20):
+        self.latency = latency
+        self.text_len = text_len
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.total = total
+        self.now = now
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    # 模拟有n个新帖发布（排到最前面）
+    def add_threads(self, n):
+        self.total += n
+        self.now += n * 60
+
+    # 模拟一次网络往返
+    async def respond(self, tb, pn):
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+    async def get_threads(self, tb, pn=1, rn=100):
+        self.calls += 1
+        await self.respond(tb, pn)
+        threads = []
+        # 第k个帖子（k=0最新）按回复时间倒序排列
+        for k in range((pn - 1) * rn, min(pn * rn, self.total)):
+            tid = self.total - k
+            post_time = self.now - k * 60
+            user = SimpleNamespace(user_name=f'user{tid % 997}', nick_name_new=f'nick{tid % 997}',
+                                   level=tid % 18, glevel=tid % 10, gender=tid % 3, is_vip=tid % 7 == 0)
+            threads.append(SimpleNamespace(
+                tid=tid, user=user, title=f'{tb}帖子{tid}', text=f'{tb}正文{tid}'.ljust(self.text_len, '礼'),
+                view_num=tid * 3, reply_num=tid % 50, share_num=tid % 5, agree=tid % 11, disagree=tid % 2,
+                create_time=post_time - 30, last_time=post_time))
+        return threads
+
+    # 模拟aiotieba.Client.get_posts：帖子tid共有tid % 50条回复，每页rn条
+    async def get_posts(self, tid, pn=1, rn=30):
+        self.calls += 1
+        await self.respond(tid, pn)
+        reply_num = tid % 50
+        posts = FakePosts()
+        for floor in range((pn - 1) * rn + 2, min(pn * rn, reply_num) + 2):
+            user = SimpleNamespace(user_name=f'user{(tid + floor) % 997}', nick_name_new=f'nick{(tid + floor) % 997}',
+                                   level=floor % 18, glevel=floor % 10, gender=floor % 3)
+            posts.append(SimpleNamespace(
+                pid=tid * 1000 + floor, tid=tid, floor=floor, user=user, text=f'回复{tid}-{floor}',
+                agree=floor % 7, disagree=floor % 2, create_time=1700000000 + tid + floor * 60))
+        posts.has_more = pn * rn < reply_num
+        return posts
+
+
+class FakePosts(list):
+    has_more = False
+
+
+# 模拟不稳定的服务器：随机报错、偶尔很慢，同时在途请求超过capacity时变慢并更容易出错
+class FlakyClient(FakeClient):
+    def __init__(self, error_rate=0.05, slow_rate=0.02, slow_latency=3.0, capacity=12, **kwargs):
+        super().__init__(**kwargs)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.errors = 0
+
+    async def respond(self, tb, pn):
+        self.in_flight += 1
+        try:
+            overload = max(0, self.in_flight - self.capacity) / self.capacity
+            if self.random.random() < self.slow_rate:
+                await asyncio.sleep(self.slow_latency)
+            else:
+                await asyncio.sleep(self.latency * (1 + 4 * overload))
+            if self.random.random() < self.error_rate + overload:
+                self.errors += 1
+                raise ConnectionError(f"模拟请求失败：{tb} 第{pn}页")
+        finally:
+            self.in_flight -= 1
+
+
+async def benchmark_flaky(pages=100, latency=0.05, concurrency=4, rate=None, seed=42):
+    async with FakeClient(latency=0) as client:
+        expected = await crawl_forum(client, '彩礼', pages=pages, progress=False)
+
+    async with FlakyClient(latency=latency, seed=seed) as client:
+        scheduler = Scheduler(rate=rate, concurrency=concurrency, max_concurrency=64, retries=8,
+                              base_delay=0.05, max_delay=1.0, slow_latency=1.0, seed=seed)
+        start = time.perf_counter()
+        records = await crawl_forum(client, '彩礼', pages=pages, concurrency=concurrency, scheduler=scheduler,
+                                    progress=False)
+        elapsed = time.perf_counter() - start
+    assert records == expected, "重试后的爬取结果与无故障时不一致"
+    print(f"不稳定服务器：{pages}页用时{elapsed:.2f}s，服务器报错{client.errors}次，"
+          f"结束时并发上限{scheduler.limiter.limit:.1f}")
+    print(scheduler.stats.summary())
+    return scheduler.stats
+
+
+async def benchmark(pages=100, latency=0.05, jitter=0.02, concurrency=8, forums=('彩礼',)):
+    results = {}
+    outputs = {}
+    for mode, conc in (('sequential', 1), ('concurrent', concurrency)):
+        async with FakeClient(latency=latency, jitter=jitter) as client:
+            start = time.perf_counter()
+            outputs[mode] = [await crawl_forum(client, tb, pages=pages, concurrency=conc, progress=False)
+                             for tb in forums]
+            elapsed = time.perf_counter() - start
+        results[mode] = pages * len(forums) / elapsed
+        print(f"{mode:<10} 并发数={conc:<3} 用时={elapsed:.2f}s  {results[mode]:.1f} 页/秒")
+    assert outputs['sequential'] == outputs['concurrent'], "并发爬取的输出顺序与顺序爬取不一致"
+    print(f"加速比：{results['concurrent'] / results['sequential']:.1f}x（输出完全一致）")
+    return results
+
+
+# 在子进程里爬取一个threads帖的假贴吧，返回峰值RSS（MB）
+def _memory_worker(mode, threads, text_len):
+    import resource
+    import tempfile
+
+    async def run():
+        pages = (threads + 99) // 100
+        async with FakeClient(latency=0, total=threads, text_len=text_len) as client:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                csv_path = os.path.join(tmp_dir, 'bench.csv')
+                if mode == 'list':
+                    records = await crawl_forum(client, 'bench', pages=pages, progress=False)
+                    csv_frame(records.to_frame()).to_csv(csv_path, index=False, encoding='utf-8-sig')
+                else:
+                    with ThreadWriter(csv_path, COLUMNS, schema=THREAD_SCHEMA) as writer:
+                        await crawl_forum(client, 'bench', pages=pages, writer=writer, progress=False)
+
+    asyncio.run(run())
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下单位是KB，macOS下是字节
+    print(peak / 1024 / (1024 if sys.platform == 'darwin' else 1))
+
+
+def benchmark_memory(threads=10000, text_len=2000):
+    for mode in ('list', 'stream'):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--memory-worker', mode,
+                              '--threads', str(threads), '--text-len', str(text_len)],
+                             capture_output=True, text=True, check=True)
+        print(f"{mode:<6} {threads}帖 峰值RSS={float(out.stdout.strip().splitlines()[-1]):.1f}MB")
+
+
+# 把假贴吧的threads个帖子逐页收进buffer，返回buffer本身占用的内存（tracemalloc统计，每页的帖子对象用完即释放）
+def _buffer_memory(buffer, convert, threads, text_len):
+    import gc
+    import tracemalloc
+
+    async def fill():
+        client = FakeClient(latency=0, total=threads, text_len=text_len)
+        for pn in range(1, (threads + 99) // 100 + 1):
+            buffer.extend([convert(thread) for thread in await client.get_threads('彩礼', pn=pn)])
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    asyncio.run(fill())
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used
+
+
+# 对比原来的元组列表/字符串时间与紧凑schema：爬取缓冲、DataFrame、Parquet三处的内存和大小
+def benchmark_schema(threads=1000000, text_len=100):
+    import tempfile
+    scale = 1000000 / threads
+    mb = lambda n: f"{n / 1024 / 1024:.1f}MB（每100万帖{n * scale / 1024 / 1024:.0f}MB）"
+
+    rows = []
+    tuple_bytes = _buffer_memory(rows, thread_to_tuple, threads, text_len)
+    records = RecordBuffer(THREAD_SCHEMA)
+    record_bytes = _buffer_memory(records, thread_to_record, threads, text_len)
+    print(f"{threads}帖，正文{text_len}字")
+    print(f"爬取缓冲  元组列表：{mb(tuple_bytes)}  RecordBuffer：{mb(record_bytes)}  "
+          f"缩小{tuple_bytes / record_bytes:.1f}倍")
+
+    legacy = pd.DataFrame(rows, columns=COLUMNS)
+    del rows
+    compact = records.to_frame()
+    legacy_bytes = legacy.memory_usage(deep=True).sum()
+    compact_bytes = compact.memory_usage(deep=True).sum()
+    print(f"DataFrame 原来的类型：{mb(legacy_bytes)}  紧凑类型：{mb(compact_bytes)}  "
+          f"缩小{legacy_bytes / compact_bytes:.1f}倍")
+    columns = legacy.memory_usage(deep=True, index=False), compact.memory_usage(deep=True, index=False)
+    for col in COLUMNS:
+        if columns[0][col] != columns[1][col]:
+            print(f"  {col:<12}{legacy[col].dtype!s:>10} {columns[0][col] / threads:6.1f}字节/帖 -> "
+                  f"{compact[col].dtype!s:<9}{columns[1][col] / threads:6.1f}字节/帖")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sizes = {}
+        for name, df in (('legacy', legacy), ('compact', compact)):
+            path = os.path.join(tmp_dir, f'{name}_parquet')
+            rewrite_parquet_dataset(df, path, schema=THREAD_SCHEMA if name == 'compact' else None)
+            sizes[name] = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"Parquet   原来的类型：{mb(sizes['legacy'])}  紧凑类型：{mb(sizes['compact'])}")
+    assert csv_frame(compact).to_csv(index=False) == legacy.to_csv(index=False), "紧凑类型写出的CSV与原来不一致"
+    print("两种方式写出的CSV完全一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='贴吧帖子爬取')
+    parser.add_argument('--concurrency', type=int, default=1, help='同时在途的页面请求数（1为原来的顺序爬取）')
+    parser.add_argument('--pages', type=int, default=100, help='每个吧爬取的页数')
+    parser.add_argument('--full', action='store_true', help='忽略断点记录，重新完整爬取')
+    parser.add_argument('--bench', action='store_true', help='用本地假客户端对比顺序/并发爬取速度')
+    parser.add_argument('--latency', type=float, default=0.05, help='测速时假客户端的单次请求延迟（秒）')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每攒够多少行写一次盘')
+    parser.add_argument('--rate', type=float, default=None, help='每秒最多发出的请求数（默认不限速）')
+    parser.add_argument('--max-concurrency', type=int, default=32, help='自适应并发的上限')
+    parser.add_argument('--retries', type=int, default=5, help='单个请求失败后的最多重试次数')
+    parser.add_argument('--bench-flaky', action='store_true', help='在模拟的不稳定服务器上测试限速和重试')
+    parser.add_argument('--bench-memory', action='store_true', help='对比一次性收集/分批写盘两种方式的峰值内存')
+    parser.add_argument('--bench-schema', action='store_true', help='对比原来的元组/字符串时间与紧凑schema的内存')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='测内存时假贴吧的帖子数（默认--bench-memory为1万，--bench-schema为100万）')
+    parser.add_argument('--text-len', type=int, default=None,
+                        help='测内存时每个帖子正文的长度（默认--bench-memory为2000，--bench-schema为100）')
+    parser.add_argument('--memory-worker', choices=['list', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_worker:
+        _memory_worker(args.memory_worker, args.threads, args.text_len)
+    elif args.bench_memory:
+        benchmark_memory(threads=args.threads or 10000, text_len=args.text_len or 2000)
+    elif args.bench_schema:
+        benchmark_schema(threads=args.threads or 1000000, text_len=args.text_len or 100)
+    elif args.bench_flaky:
+        asyncio.run(benchmark_flaky(pages=args.pages, latency=args.latency, concurrency=args.concurrency,
+                                    rate=args.rate))
+    elif args.bench:
+        asyncio.run(benchmark(pages=args.pages, latency=args.latency, concurrency=max(args.concurrency, 8)))
+    else:
+        asyncio.run(main(concurrency=args.concurrency, pages=args.pages, full=args.full, batch_size=args.batch_size,
+                         rate=args.rate, max_concurrency=args.max_concurrency, retries=args.retries))
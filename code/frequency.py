@@ -1,8 +1,9 @@
 import pandas as pd
-import jieba
+from wordindex import WordIndex, post_keys
 from collections import Counter
 import re
 import os
+from instrument import phase
 
 
 # 加载停用词（带调试）
@@ -33,6 +34,7 @@ def preprocess_text(text):
 
 # 主流程
 if __name__ == "__main__":
+    phase('frequency:读取数据')
     # 读取数据
     df = pd.read_csv('./result/热度100_彩礼.csv')
     df['text'] = df['text'].fillna('')
@@ -43,24 +45,17 @@ if __name__ == "__main__":
     # 预处理文本
     df['processed_text'] = df['text'].apply(preprocess_text)
 
-    # 合并所有文本
-    all_text = ''.join(df['processed_text'].tolist())
-
-    # 分词
-    jieba.initialize()
-    words = jieba.lcut(all_text)
-
-
-
-    # 过滤
-    filtered_words = []
-    for word in words:
-        if word not in stop_words and len(word) > 1:
-            filtered_words.append(word)
-
-
-    # 统计
-    word_freq = Counter(filtered_words)
+    phase('frequency:分词和词频')
+    # 词频索引：只对新帖子分词，已经索引过的帖子直接读取各自的词频
+    index = WordIndex('text_zh')
+    index.update(df, '彩礼', texts=df['processed_text'])
+    index.save()
+    counts = index.counts(['彩礼'], posts=post_keys(df))
+
+    phase('frequency:统计')
+    # 过滤 + 统计
+    word_freq = Counter({word: count for word, count in counts.items()
+                         if word not in stop_words and len(word) > 1})
     top15 = word_freq.most_common(15)
 
     print("\n高频词TOP15：")
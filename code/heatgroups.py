@@ -0,0 +1,181 @@
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+from instrument import traced
+
+# 热度分组：名称=区间，区间端点是分位数，方括号含端点、圆括号不含；按顺序匹配，先匹配到的组优先
+# 默认分组与原来hotreason.py一致：前10%（含90%分位数）、40%-60%（左闭右开）、后20%（含20%分位数）
+DEFAULT_BANDS = '高热度（前10%）=[0.9,1],中等热度（40%-60%）=[0.4,0.6),低热度（后20%）=[0,0.2]'
+OTHER_GROUP = '其他'
+
+question_re = re.compile(r'[？?]')
+exclamation_re = re.compile(r'[！!]')
+
+band_re = re.compile(r'\s*([^=,]+?)\s*=\s*([\[(])\s*([\d.]+)\s*,\s*([\d.]+)\s*([\])])\s*(?:,|$)')
+
+
+# 解析分组字符串，返回[(名称, 下分位, 上分位, 含下端点, 含上端点), ...]
+def parse_bands(text=DEFAULT_BANDS):
+    bands = []
+    pos = 0
+    while pos < len(text):
+        match = band_re.match(text, pos)
+        if not match:
+            raise ValueError(f"无法解析的热度分组：{text[pos:]}（格式如 高热度=[0.9,1],低热度=[0,0.2)）")
+        name, left, lo, hi, right = match.groups()
+        lo, hi = float(lo), float(hi)
+        if not 0 <= lo <= hi <= 1:
+            raise ValueError(f"分位数必须满足0 <= 下限 <= 上限 <= 1：{match.group().strip(', ')}")
+        bands.append((name, lo, hi, left == '[', right == ']'))
+        pos = match.end()
+    return bands
+
+
+def _bands(bands):
+    return parse_bands(bands or DEFAULT_BANDS) if isinstance(bands, (str, type(None))) else bands
+
+
+# 按分位数区间给每行热度分组（np.select整列比较，不逐行调用函数），返回组序号，不在任何组里的为-1
+def heat_group_codes(heat, bands=None):
+    bands = _bands(bands)
+    values = heat.to_numpy()
+    quantiles = heat.quantile(sorted({q for band in bands for q in band[1:3]}))
+    conditions = []
+    for _, lo, hi, left_closed, right_closed in bands:
+        q_lo, q_hi = quantiles[lo], quantiles[hi]
+        lower = values >= q_lo if left_closed else values > q_lo
+        upper = values <= q_hi if right_closed else values < q_hi
+        conditions.append(lower & upper)
+    return np.select(conditions, np.arange(len(bands), dtype='int8'), default=-1).astype('int8')
+
+
+def assign_heat_groups(heat, bands=None, other=OTHER_GROUP):
+    bands = _bands(bands)
+    names = np.array([band[0] for band in bands] + [other], dtype=object)
+    return pd.Series(names[heat_group_codes(heat, bands)], index=heat.index)
+
+
+# 帖子长度和语气特征，整列字符串操作
+# 语气词是单个字符，分别查标题和正文再取或，与查标题+正文的拼接结果相同（语料的空标题/正文已填成''）
+def add_text_features(df):
+    title = df['title'].astype(str)
+    text = df['text'].astype(str)
+    df['帖子长度'] = text.str.len()
+    df['含疑问语气'] = (title.str.contains(question_re) | text.str.contains(question_re)).astype(int)
+    df['含感叹语气'] = (title.str.contains(exclamation_re) | text.str.contains(exclamation_re)).astype(int)
+    return df
+
+
+interaction_cols = ['view', 'reply', 'share', 'agree', 'disagree', '热度']
+
+
+# 各组的互动、长度、语气、用户指标，返回四张表
+def group_stats(df_grouped):
+    grouped = df_grouped.groupby('热度分组')
+    group_interaction = grouped[interaction_cols].mean().round(2)
+    group_length = grouped['帖子长度'].agg(['mean', 'median']).round(2)
+    group_tone = grouped[['含疑问语气', '含感叹语气']].mean().round(3) * 100
+    group_user = (df_grouped.assign(is_vip=df_grouped['is_vip'].eq(1).astype(float) * 100)
+                  .groupby('热度分组')[['level', 'glevel', 'is_vip']].mean().round(2))
+    group_user.rename(columns={'is_vip': 'VIP占比（%）'}, inplace=True)
+    return group_interaction, group_length, group_tone, group_user
+
+
+# ====================== 原来的逐行实现（用于核对结果和测速） ======================
+def group_stats_naive(df):
+    q10 = df['热度'].quantile(0.9)
+    q40 = df['热度'].quantile(0.4)
+    q60 = df['热度'].quantile(0.6)
+    q20 = df['热度'].quantile(0.2)
+
+    def heat_group(heat):
+        if heat >= q10:
+            return '高热度（前10%）'
+        elif q40 <= heat < q60:
+            return '中等热度（40%-60%）'
+        elif heat <= q20:
+            return '低热度（后20%）'
+        else:
+            return '其他'
+
+    def has_question(text):
+        return 1 if re.search(r'[？?]', str(text)) else 0
+
+    def has_exclamation(text):
+        return 1 if re.search(r'[！!]', str(text)) else 0
+
+    df['热度分组'] = df['热度'].apply(heat_group)
+    df_grouped = df[df['热度分组'].isin(['高热度（前10%）', '中等热度（40%-60%）', '低热度（后20%）'])].copy()
+    group_interaction = df_grouped.groupby('热度分组')[interaction_cols].mean().round(2)
+    df_grouped['帖子长度'] = df_grouped['text'].astype(str).apply(len)
+    group_length = df_grouped.groupby('热度分组')['帖子长度'].agg(['mean', 'median']).round(2)
+    df_grouped['含疑问语气'] = (df_grouped['title'] + df_grouped['text']).astype(str).apply(has_question)
+    df_grouped['含感叹语气'] = (df_grouped['title'] + df_grouped['text']).astype(str).apply(has_exclamation)
+    group_tone = df_grouped.groupby('热度分组')[['含疑问语气', '含感叹语气']].mean().round(3) * 100
+    group_user = df_grouped.groupby('热度分组')[['level', 'glevel', 'is_vip']].agg({
+        'level': 'mean',
+        'glevel': 'mean',
+        'is_vip': lambda x: (x == 1).mean() * 100
+    }).round(2)
+    group_user.rename(columns={'is_vip': 'VIP占比（%）'}, inplace=True)
+    return group_interaction, group_length, group_tone, group_user
+
+
+# 只保留分到组里的行，返回(各组统计四张表, 分组后的表)
+@traced()
+def group_stats_vectorized(df, bands=None):
+    bands = _bands(bands)
+    codes = heat_group_codes(df['热度'], bands)
+    keep = codes >= 0
+    df_grouped = df[keep].copy()
+    df_grouped['热度分组'] = np.array([band[0] for band in bands], dtype=object)[codes[keep]]
+    df_grouped = add_text_features(df_grouped)
+    return group_stats(df_grouped), df_grouped
+
+
+# 合成帖子表：热度长尾分布，标题和正文从一组短句里随机取
+def synthetic_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    phrases = np.array(['彩礼到底该不该给？', '我们这边都是十八万八', '真的离谱！', '两家商量着来吧',
+                        '有没有同城的？', '结婚不是买卖', '太高了!!', '父母的意见很重要', 'what?', ''])
+    df = pd.DataFrame({
+        'view': rng.zipf(1.6, rows).clip(max=10 ** 7),
+        'reply': rng.zipf(1.8, rows).clip(max=10 ** 5),
+        'share': rng.poisson(0.3, rows),
+        'agree': rng.zipf(2.0, rows).clip(max=10 ** 5),
+        'disagree': rng.poisson(0.2, rows),
+        'level': rng.integers(0, 19, rows).astype('int8'),
+        'glevel': rng.integers(0, 19, rows).astype('int8'),
+        'is_vip': rng.random(rows) < 0.1,
+        'title': phrases[rng.integers(0, len(phrases), rows)],
+        'text': np.char.add(phrases[rng.integers(0, len(phrases), rows)],
+                            phrases[rng.integers(0, len(phrases), rows)]),
+    })
+    df['title'] = df['title'].astype(object)
+    df['text'] = df['text'].astype(object)
+    df['热度'] = df['view'] * 3 + df['reply'] * 5 + df['share'] * 3 + df['agree'] + df['disagree']
+    return df
+
+
+def benchmark(rows=10000000):
+    start = time.perf_counter()
+    df = synthetic_frame(rows)
+    print(f"生成{rows}行合成数据：{time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    expected = group_stats_naive(df.copy())
+    naive_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result, _ = group_stats_vectorized(df.copy())
+    fast_time = time.perf_counter() - start
+    for name, a, b in zip(('互动', '长度', '语气', '用户'), result, expected):
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, obj=f'{name}指标')
+    print(f"逐行apply {naive_time:.2f}s  向量化{fast_time:.2f}s  加速{naive_time / fast_time:.1f}x（各组统计一致）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='热度分组：逐行apply与向量化实现对比')
+    parser.add_argument('--rows', type=int, default=10000000, help='合成数据的行数')
+    args = parser.parse_args()
+    benchmark(args.rows)
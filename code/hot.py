@@ -1,15 +1,36 @@
+import argparse
 import pandas as pd
+from corpus import load_corpus, clean_columns, heat, DERIVED_COLUMNS
+from topk import parse_weights, stream_top_k, top_k_sorted
+from instrument import phase
 
-# 读取数据
-df = pd.read_csv('./result/彩礼.csv')
+parser = argparse.ArgumentParser(description='取热度最高的前K个帖子')
+parser.add_argument('csv', nargs='*', default=['./result/彩礼.csv'], help='一个或多个贴吧的帖子CSV，多个时合并排名')
+parser.add_argument('--k', type=int, default=100, help='保留的帖子数')
+parser.add_argument('--weights', default=None, help='热度权重，如 view=3,reply=5,share=3,agree=1,disagree=1')
+parser.add_argument('--stream', action='store_true', help='分块读取CSV，只保留前K条（内存不随数据量增长）')
+parser.add_argument('--chunksize', type=int, default=500000, help='流式读取时每块的行数')
+parser.add_argument('--output', default=None, help='输出路径，默认./result/热度{K}_彩礼.csv')
+args = parser.parse_args()
+if args.k < 1:
+    parser.error('--k 至少为1')
+weights = parse_weights(args.weights)
+output = args.output or f'./result/热度{args.k}_彩礼.csv'
 
-# 计算热度值
-df['热度'] = df['view'] * 3 + df['reply'] * 5 + df['share'] * 3 + df['agree'] * 1 + df['disagree'] * 1
-
-# 按热度降序排序，取前100条
-top_100 = df.sort_values('热度', ascending=False).head(100)
+phase('hot:取前K条')
+if args.stream:
+    # 流式：只有最终的K行会被整理类型，热度按整理后的计数重新计算
+    top = clean_columns(stream_top_k(args.csv, k=args.k, weights=weights, chunksize=args.chunksize))
+    top['热度'] = heat(top, weights)
+else:
+    # 读取数据（热度 = view*3 + reply*5 + share*3 + agree + disagree，由corpus缓存提供）
+    df = pd.concat([load_corpus(path) for path in args.csv], ignore_index=True)
+    # 按热度降序排序，取前K条；输出保留原始列加热度列
+    top = top_k_sorted(df.drop(columns='热度'), k=args.k, weights=weights)
+    top = top[[col for col in top.columns if col not in DERIVED_COLUMNS] + ['热度']]
 
+phase('hot:保存结果')
 # 保存为csv文件
-top_100.to_csv('./result/热度100_彩礼.csv', index=False, encoding='utf-8-sig')
+top.to_csv(output, index=False, encoding='utf-8-sig')
 
-print("已生成热度最高的100个帖子文件，路径：./result/热度100_彩礼.csv")
\ No newline at end of file
+print(f"已生成热度最高的{args.k}个帖子文件，路径：{output}")
@@ -0,0 +1,317 @@
+import argparse
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不记录峰值RSS
+    resource = None
+
+# 轻量的计时埋点：各脚本和公共函数用span()/@traced/phase()标出阶段，记录墙钟/CPU时间、峰值内存、输入输出行数
+# 默认关闭，关闭时每个埋点只多一层函数调用和一次判断（约0.2微秒），所以只埋在整批处理的函数上；打开方式：
+#   环境变量 INSTRUMENT=1（或 INSTRUMENT=cprofile,tracemalloc 同时打开cProfile/逐阶段内存统计），
+#   INSTRUMENT_TRACE=路径 指定trace文件；或者调用enable()（pipeline.py --trace）
+# 结束时写出Chrome Trace格式的JSON（可以拖进 https://ui.perfetto.dev 或 https://www.speedscope.app 看火焰图），
+# 打开cProfile时另存同名的.prof（snakeviz、gprof2dot、flameprof都能读）
+DEFAULT_TRACE = './result/profile/trace.json'
+
+_enabled = False
+_options = {'trace': DEFAULT_TRACE, 'cprofile': False, 'memory': False}
+_events = []     # 已结束的阶段（Chrome Trace的X事件）
+_stack = []      # 正在进行的阶段
+_phase = None    # phase()打开的脚本阶段
+_profiler = None
+_start = time.perf_counter()
+
+
+def enabled():
+    return _enabled
+
+
+def _rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下单位是KB，macOS下是字节
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+# 数据的行数：DataFrame/Series/数组取第一维，列表取长度，其他（字符串、元组、数字）不算
+def _rows(obj):
+    shape = getattr(obj, 'shape', None)
+    if shape:
+        return int(shape[0])
+    if isinstance(obj, list):
+        return len(obj)
+    return None
+
+
+class Span:
+    __slots__ = ('name', 'args', 'wall', 'cpu', 'peak')
+
+    def __init__(self, name, rows_in=None, **args):
+        self.name = name
+        self.args = args
+        if rows_in is not None:
+            args['rows_in'] = rows_in
+
+    # 阶段结束前可以补上输出行数等信息
+    def set(self, **args):
+        self.args.update(args)
+
+    @property
+    def rows_out(self):
+        return self.args.get('rows_out')
+
+    @rows_out.setter
+    def rows_out(self, value):
+        self.args['rows_out'] = value
+
+    def __enter__(self):
+        if _options['memory']:
+            # 嵌套时外层的峰值先记下来，内层结束后再合并回外层
+            if _stack:
+                _stack[-1].peak = max(_stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.peak = 0
+        _stack.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        _stack.pop()
+        args = {'cpu_s': round(cpu, 6), **self.args}
+        if _options['memory']:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            args['peak_traced_mb'] = round(peak / 1024 / 1024, 2)
+            if _stack:
+                _stack[-1].peak = max(_stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        rss = _rss_mb()
+        if rss is not None:
+            args['peak_rss_mb'] = round(rss, 1)
+        if exc[0] is not None:
+            args['error'] = exc[0].__name__
+        _events.append({'name': self.name, 'ph': 'X', 'ts': round((self.wall - _start) * 1e6),
+                        'dur': round(wall * 1e6), 'pid': os.getpid(), 'tid': 0, 'args': args})
+        return False
+
+
+# 关闭时用的空上下文，不做任何记录
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+    @property
+    def rows_out(self):
+        return None
+
+    @rows_out.setter
+    def rows_out(self, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+# with span('地域金额提取', rows_in=len(df)) as s: ...; s.rows_out = len(result)
+def span(name, rows_in=None, **args):
+    if not _enabled:
+        return _NULL
+    return Span(name, rows_in, **args)
+
+
+# 装饰器：整个函数算一个阶段，第一个参数和返回值是表格/列表时自动记下输入输出行数
+def traced(name=None):
+    def decorate(func):
+        module = func.__module__
+        if module == '__main__':  # 直接运行或pipeline.py用runpy运行的脚本，用文件名代替__main__
+            module = os.path.splitext(os.path.basename(func.__globals__.get('__file__', module)))[0]
+        label = name or f'{module}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(label, _rows(args[0]) if args else None) as s:
+                result = func(*args, **kwargs)
+                rows = _rows(result)
+                if rows is not None:
+                    s.rows_out = rows
+                return result
+        return wrapper
+    return decorate
+
+
+# 脚本里按顺序排列的阶段：phase('读取数据') ... phase('画图')，调用时结束上一个阶段、开始下一个
+# phase(None)只结束当前阶段（脚本结束时也会自动结束）
+def phase(name, **args):
+    global _phase
+    if not _enabled:
+        return
+    if _phase is not None:
+        _phase.__exit__(None, None, None)
+        _phase = None
+    if name is not None:
+        _phase = Span(name, **args)
+        _phase.__enter__()
+
+
+# ====================== 开关和导出 ======================
+def enable(trace=DEFAULT_TRACE, cprofile=False, memory=False):
+    global _enabled, _profiler
+    if _enabled:
+        return
+    _enabled = True
+    _options.update(trace=trace, cprofile=cprofile, memory=memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if cprofile:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(finish)
+
+
+# 当前已记录的事件数，配合events_since()取出一段时间内（如pipeline的一个阶段）记录的事件
+def checkpoint():
+    return len(_events)
+
+
+def events_since(mark=0):
+    return _events[mark:]
+
+
+# 合并子进程（pipeline.py并行运行的阶段）带回来的事件
+def add_events(events):
+    pid = os.getpid()
+    _events.extend(event for event in events if event['pid'] != pid)
+
+
+# 按阶段名汇总：次数、总墙钟/CPU时间、最大峰值内存、输入输出行数
+def summary(events=None):
+    totals = {}
+    for event in events if events is not None else _events:
+        args = event['args']
+        row = totals.setdefault(event['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows_in': 0, 'rows_out': 0,
+                                                'peak_mb': None})
+        row['calls'] += 1
+        row['wall_s'] += event['dur'] / 1e6
+        row['cpu_s'] += args.get('cpu_s', 0.0)
+        row['rows_in'] += args.get('rows_in') or 0
+        row['rows_out'] += args.get('rows_out') or 0
+        peak = args.get('peak_traced_mb', args.get('peak_rss_mb'))
+        if peak is not None:
+            row['peak_mb'] = max(row['peak_mb'] or 0, peak)
+    return totals
+
+
+def print_summary(events=None):
+    totals = summary(events)
+    if not totals:
+        return
+    print("\n" + "=" * 96)
+    print(f"{'阶段':<36}{'次数':>6}{'墙钟(s)':>10}{'CPU(s)':>10}{'输入行':>10}{'输出行':>10}{'峰值内存(MB)':>12}")
+    print("=" * 96)
+    for name, row in sorted(totals.items(), key=lambda item: -item[1]['wall_s']):
+        peak = f"{row['peak_mb']:.1f}" if row['peak_mb'] is not None else '-'
+        print(f"{name:<36}{row['calls']:>6}{row['wall_s']:>10.3f}{row['cpu_s']:>10.3f}"
+              f"{row['rows_in'] or '-':>10}{row['rows_out'] or '-':>10}{peak:>12}")
+
+
+# 写出Chrome Trace格式的JSON（打开cProfile时另存.prof），返回写出的路径
+def save_trace(path=None):
+    path = path or _options['trace']
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    names = {event['pid']: 'main' if event['pid'] == os.getpid() else f'worker {event["pid"]}' for event in _events}
+    metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}} for pid, name in names.items()]
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + sorted(_events, key=lambda e: (e['pid'], e['ts'])),
+                   'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    paths = [path]
+    if _profiler is not None:
+        _profiler.disable()
+        prof_path = os.path.splitext(path)[0] + '.prof'
+        _profiler.dump_stats(prof_path)
+        paths.append(prof_path)
+    return paths
+
+
+# 结束还开着的阶段，打印汇总并写出trace（打开时注册在atexit里，也可以手动调用）
+def finish():
+    global _enabled
+    if not _enabled:
+        return
+    phase(None)
+    while _stack:
+        _stack[-1].__exit__(None, None, None)
+    print_summary()
+    paths = save_trace()
+    print(f"trace已保存：{', '.join(paths)}")
+    _enabled = False
+
+
+# 用环境变量打开（对单独运行的脚本也有效）
+def _enable_from_env():
+    value = os.environ.get('INSTRUMENT', '').lower()
+    if value and value not in ('0', 'false', 'no'):
+        modes = set(value.split(','))
+        enable(trace=os.environ.get('INSTRUMENT_TRACE', DEFAULT_TRACE), cprofile='cprofile' in modes,
+               memory='tracemalloc' in modes or 'memory' in modes)
+
+
+_enable_from_env()
+
+
+# 关闭状态下埋点的额外开销：装饰过的空函数、空span与直接调用比较
+def benchmark(n=1000000):
+    def plain(x):
+        return x
+
+    wrapped = traced('bench')(plain)
+    timings = {}
+    for name, call in (('直接调用', plain), ('@traced（关闭）', wrapped)):
+        start = time.perf_counter()
+        for i in range(n):
+            call(i)
+        timings[name] = (time.perf_counter() - start) / n * 1e9
+
+    start = time.perf_counter()
+    for i in range(n):
+        with span('bench'):
+            pass
+    timings['with span()（关闭）'] = (time.perf_counter() - start) / n * 1e9
+    for name, ns in timings.items():
+        print(f"{name:<20}{ns:8.0f} ns/次")
+    print(f"关闭时每个埋点约多{timings['@traced（关闭）'] - timings['直接调用']:.0f} ns；"
+          f"一次完整运行里埋点只有几十到几百次")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='埋点工具：查看trace汇总，或测关闭时的开销')
+    parser.add_argument('trace', nargs='?', default=None, help='要汇总的trace JSON')
+    parser.add_argument('--bench', action='store_true', help='测关闭状态下埋点的开销')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark()
+    else:
+        with open(args.trace or DEFAULT_TRACE, 'r', encoding='utf-8') as f:
+            print_summary([event for event in json.load(f)['traceEvents'] if event['ph'] == 'X'])
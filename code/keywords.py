@@ -0,0 +1,299 @@
+import argparse
+import random
+import time
+from collections import defaultdict
+
+try:
+    import ahocorasick  # pyahocorasick，C实现的Aho-Corasick自动机
+except ImportError:
+    ahocorasick = None
+
+# ====================== 关键词词典 ======================
+# 彩礼形式关键词（分大类，category.py）
+betrothal_forms = {
+    '现金类': ['万', '元', '块', 'RMB', '红包', '改口费', '见面礼', '订婚礼', '结婚礼', '彩礼金额'],
+    '五金三金': ['金', '五金', '三金', '戒指', '项链', '耳环', '手镯', '吊坠', '首饰'],
+    '房产相关': ['房', '婚房', '首付', '加名字', '房产证', '购房', '房产'],
+    '车辆相关': ['车', '汽车', '购车', '陪嫁车', '车子'],
+    '家电家具': ['家电', '冰箱', '彩电', '沙发', '家具', '装修', '家电家具'],
+    '仪式服务': ['婚礼', '酒席', '桌数', '婚纱照', '蜜月', '旅行', '婚庆']
+}
+
+# 地域关键词（category.py，每个帖子只归到第一个命中的地区）
+region_keywords = {
+    '江浙沪': ['江浙沪', '江苏', '浙江', '上海'],
+    '北京': ['北京', '京'],
+    '广东': ['广东', '粤', '珠三角'],
+    '东三省': ['东三省', '东北', '黑龙江', '吉林', '辽宁'],
+    '河南': ['河南', '豫'],
+    '山东': ['山东', '鲁'],
+    '四川': ['四川', '川', '蜀'],
+    '湖北': ['湖北', '鄂'],
+    '湖南': ['湖南', '湘'],
+    '江西': ['江西', '赣'],
+    '福建': ['福建', '闽'],
+    '西北': ['西北', '陕西', '甘肃', '宁夏'],
+    '西南': ['西南', '重庆', '贵州', '云南'],
+    '华北': ['华北', '河北', '山西'],
+    '华南': ['华南', '广西', '海南'],
+    '安徽': ['安徽', '皖'],
+    '天津': ['天津', '津']
+}
+
+# 地域关键词（shengfentongji.py，统计各地区金额，一个帖子可以命中多个地区）
+region_amount_keywords = {
+    '江浙沪': ['江浙沪', '江苏', '浙江', '上海', '苏南', '浙北'],
+    '北京': ['北京', '京'],
+    '上海': ['上海', '沪'],
+    '广东': ['广东', '粤', '珠三角', '深圳', '广州'],
+    '东三省': ['东三省', '东北', '黑龙江', '吉林', '辽宁', '沈阳', '哈尔滨'],
+    '河南': ['河南', '豫', '中原'],
+    '山东': ['山东', '鲁'],
+    '四川': ['四川', '川', '蜀', '成都'],
+    '湖北': ['湖北', '鄂'],
+    '湖南': ['湖南', '湘'],
+    '江西': ['江西', '赣'],
+    '福建': ['福建', '闽'],
+    '西北': ['西北', '陕西', '陕', '甘肃', '甘', '宁夏', '青海', '新疆'],
+    '西南': ['西南', '重庆', '渝', '贵州', '黔', '云南', '滇'],
+    '华北': ['华北', '河北', '冀', '山西', '晋', '内蒙古'],
+    '华南': ['华南', '广西', '桂', '海南'],
+    '安徽': ['安徽', '皖'],
+    '天津': ['天津', '津']
+}
+
+# 彩礼态度关键词（perspective.py）
+attitude_keywords = {
+    '支持': [
+        '彩礼应该给', '支持彩礼', '彩礼是传统', '彩礼合理', '彩礼体现诚意',
+        '适量彩礼', '彩礼有必要', '彩礼是仪式', '彩礼量力而行'
+    ],
+    '一般': [
+        '无所谓', '看情况', '都行', '随便', '中立', '看双方协商',
+        '都可以', '没意见', '视情况而定'
+    ],
+    '不支持': [
+        '反对彩礼', '彩礼没必要', '取消彩礼', '彩礼是陋习', '抵制彩礼',
+        '彩礼太高', '减少彩礼', '彩礼害人', '零彩礼'
+    ]
+}
+
+# 态度兜底规则用的情感词
+attitude_fallback_words = {
+    '支持': ['支持', '应该', '合理', '传统', '必要'],
+    '不支持': ['反对', '取消', '陋习', '没必要', '抵制'],
+}
+
+
+# ====================== 多模式匹配器 ======================
+# 从{类别: [关键词...]}构建一次，对每篇文本只扫描一遍，找出所有关键词的命中位置
+# lower=True时关键词先转小写（对应原来的keyword.lower() in text）
+class KeywordMatcher:
+    def __init__(self, groups, lower=False):
+        self.groups = list(groups)
+        self.keywords = []
+        # 关键词 -> 它所属的类别列表（同一个词可能出现在多个类别里，如'上海'）
+        self.keyword_groups = defaultdict(list)
+        # 类别 -> 关键词在该类别列表里的顺序，用于还原"第一个命中的关键词"
+        self.keyword_rank = {}
+        for group, words in groups.items():
+            ranks = {}
+            for word in words:
+                word = word.lower() if lower else word
+                if not word:
+                    continue
+                if word not in self.keyword_groups:
+                    self.keywords.append(word)
+                if group not in self.keyword_groups[word]:
+                    self.keyword_groups[word].append(group)
+                ranks.setdefault(word, len(ranks))
+            self.keyword_rank[group] = ranks
+
+        # 每个关键词对应一个类别位掩码，扫描时把命中关键词的掩码或起来即可得到命中的类别
+        self.group_bit = {group: 1 << i for i, group in enumerate(self.groups)}
+        self.keyword_mask = {word: sum(self.group_bit[group] for group in self.keyword_groups[word])
+                             for word in self.keywords}
+        self._mask_groups = {}
+
+        if ahocorasick is not None and self.keywords:
+            self.backend = 'ahocorasick'
+            self.automaton = ahocorasick.Automaton()
+            for word in self.keywords:
+                self.automaton.add_word(word, (word, self.keyword_mask[word]))
+            self.automaton.make_automaton()
+        else:
+            # 没有安装pyahocorasick时逐个关键词用C实现的子串查找，结果相同
+            self.backend = 'substring'
+
+    # 逐个产出(起始位置, 关键词)，包含重叠的命中
+    def iter_matches(self, text):
+        if self.backend == 'ahocorasick':
+            for end, (word, _) in self.automaton.iter(text):
+                yield end - len(word) + 1, word
+        else:
+            for word in self.keywords:
+                start = text.find(word)
+                while start != -1:
+                    yield start, word
+                    start = text.find(word, start + 1)
+
+    def matched_keywords(self, text):
+        if self.backend == 'ahocorasick':
+            return {word for _, (word, _) in self.automaton.iter(text)}
+        return {word for word in self.keywords if word in text}
+
+    def _groups_of(self, mask):
+        groups = self._mask_groups.get(mask)
+        if groups is None:
+            groups = [group for group in self.groups if mask & self.group_bit[group]]
+            self._mask_groups[mask] = groups
+        return list(groups)
+
+    # 命中的类别，按词典里的类别顺序
+    def matched_groups(self, text):
+        mask = 0
+        if self.backend == 'ahocorasick':
+            for _, (_, word_mask) in self.automaton.iter(text):
+                mask |= word_mask
+        else:
+            for word in self.keywords:
+                if word in text:
+                    mask |= self.keyword_mask[word]
+        return self._groups_of(mask)
+
+    # 每个类别命中了多少个不同的关键词
+    def group_counts(self, text):
+        counts = dict.fromkeys(self.groups, 0)
+        for word in self.matched_keywords(text):
+            for group in self.keyword_groups[word]:
+                counts[group] += 1
+        return counts
+
+    # 每个命中类别里，按词典顺序排在最前的那个关键词
+    def first_keywords(self, text):
+        first = {}
+        for word in self.matched_keywords(text):
+            for group in self.keyword_groups[word]:
+                if group not in first or self.keyword_rank[group][word] < self.keyword_rank[group][first[group]]:
+                    first[group] = word
+        return {group: first[group] for group in self.groups if group in first}
+
+
+# 模块加载时构建一次
+form_matcher = KeywordMatcher(betrothal_forms)
+region_matcher = KeywordMatcher(region_keywords, lower=True)
+region_amount_matcher = KeywordMatcher(region_amount_keywords, lower=True)
+attitude_matcher = KeywordMatcher(attitude_keywords, lower=True)
+attitude_fallback_matcher = KeywordMatcher(attitude_fallback_words)
+
+
+# ====================== 分类函数 ======================
+# 提取文本中的彩礼形式（返回所有匹配的形式）
+def extract_betrothal_forms(text):
+    forms = form_matcher.matched_groups(text.lower())
+    return forms if forms else ['未提及具体形式']
+
+
+# 提取文本中的地域（只返回第一个命中的地区）
+def extract_region(text):
+    groups = region_matcher.matched_groups(text.lower())
+    return groups[0] if groups else '其他'
+
+
+# 彩礼态度分类
+def classify_c彩礼_attitude(text):
+    text = str(text).lower()
+    counts = attitude_matcher.group_counts(text)
+    attitude_scores = {attitude: count for attitude, count in counts.items() if count}
+
+    # 返回得分最高的态度（无匹配则用情感词兜底）
+    if attitude_scores:
+        return max(attitude_scores, key=attitude_scores.get)
+    fallback = attitude_fallback_matcher.group_counts(text)
+    if fallback['支持'] > fallback['不支持']:
+        return '支持'
+    elif fallback['不支持'] > fallback['支持']:
+        return '不支持'
+    else:
+        return '一般'
+
+
+# ====================== 原来的逐关键词实现（用于核对结果和测速） ======================
+def extract_betrothal_forms_naive(text):
+    forms = []
+    text = text.lower()
+    for form_type, keywords in betrothal_forms.items():
+        for keyword in keywords:
+            if keyword in text:
+                forms.append(form_type)
+                break
+    return forms if forms else ['未提及具体形式']
+
+
+def extract_region_naive(text):
+    text = text.lower()
+    for region, keywords in region_keywords.items():
+        for keyword in keywords:
+            if keyword.lower() in text:
+                return region
+    return '其他'
+
+
+def classify_c彩礼_attitude_naive(text):
+    text = str(text).lower()
+    attitude_scores = defaultdict(int)
+    for attitude, keywords in attitude_keywords.items():
+        for keyword in keywords:
+            if keyword.lower() in text:
+                attitude_scores[attitude] += 1
+    if attitude_scores:
+        return max(attitude_scores, key=attitude_scores.get)
+    support_count = sum(1 for word in attitude_fallback_words['支持'] if word in text)
+    oppose_count = sum(1 for word in attitude_fallback_words['不支持'] if word in text)
+    if support_count > oppose_count:
+        return '支持'
+    elif oppose_count > support_count:
+        return '不支持'
+    else:
+        return '一般'
+
+
+# 生成合成帖子：随机填充字中混入各词典的关键词
+def synthetic_posts(n, seed=42, min_len=20, max_len=300):
+    rng = random.Random(seed)
+    vocab = [word for words in (betrothal_forms, region_keywords, region_amount_keywords, attitude_keywords,
+                                attitude_fallback_words) for group in words.values() for word in group]
+    filler = '的了是我你他她在有这个彩礼结婚男女方家里父母觉得说问题钱多少年RMBrmb，。！？ '
+    posts = []
+    for _ in range(n):
+        chars = rng.choices(filler, k=rng.randint(min_len, max_len))
+        for _ in range(rng.randint(0, 4)):
+            chars.insert(rng.randint(0, len(chars)), rng.choice(vocab))
+        posts.append(''.join(chars))
+    return posts
+
+
+def benchmark(n=1000000, seed=42):
+    print(f"匹配后端：{form_matcher.backend}")
+    start = time.perf_counter()
+    posts = synthetic_posts(n, seed=seed)
+    print(f"生成{n}条合成帖子：{time.perf_counter() - start:.1f}s")
+    for name, naive, fast in (('彩礼形式', extract_betrothal_forms_naive, extract_betrothal_forms),
+                              ('地域', extract_region_naive, extract_region),
+                              ('态度', classify_c彩礼_attitude_naive, classify_c彩礼_attitude)):
+        start = time.perf_counter()
+        expected = [naive(post) for post in posts]
+        naive_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = [fast(post) for post in posts]
+        fast_time = time.perf_counter() - start
+        assert result == expected, f"{name}：新旧实现结果不一致"
+        print(f"{name:<6} 逐关键词{naive_time:.2f}s  多模式匹配{fast_time:.2f}s  "
+              f"加速{naive_time / fast_time:.1f}x（结果一致）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='关键词多模式匹配：核对结果并测速')
+    parser.add_argument('--posts', type=int, default=1000000, help='合成帖子数')
+    args = parser.parse_args()
+    benchmark(args.posts)
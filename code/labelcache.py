@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import keywords
+import tonefeatures
+from instrument import span
+from tokens import text_key
+
+# 帖子标签的缓存：态度、彩礼形式、地域、语气计数都只由帖子文本决定，按文本指纹记下结果，
+# 转帖、模板帖和重复运行时不再重新分类。两层：进程内的LRU（pipeline.py里各阶段共用），
+# 后面是每种标签一个的磁盘文件。每种标签的版本由它用到的词典内容算出，改了哪个词典只作废那一种标签
+DEFAULT_LABEL_DIR = './result/.cache/labels'
+LRU_SIZE = 500000  # 进程内每种标签最多记住的文本数
+
+
+# 逐篇调用分类函数
+def _each(func):
+    return lambda texts: [func(text) for text in texts]
+
+
+# 语气只缓存5个计数（得分和倾向由计数整列算出），文本多时仍用多进程计数
+def _tone_counts(texts):
+    return [tuple(row) for row in tonefeatures.tone_counts(texts).tolist()]
+
+
+# 标签名 -> (批量计算函数, 用到的词典, 逻辑版本)
+# 词典用函数取，运行中改了词典也能算出新版本；分类逻辑有变化时把对应的逻辑版本加1
+LABELERS = {
+    'attitude': (_each(keywords.classify_c彩礼_attitude),
+                 lambda: (keywords.attitude_keywords, keywords.attitude_fallback_words), 1),
+    'forms': (_each(keywords.extract_betrothal_forms), lambda: keywords.betrothal_forms, 1),
+    'region': (_each(keywords.extract_region), lambda: keywords.region_keywords, 1),
+    'tone': (_tone_counts, lambda: (tonefeatures.emotional_punctuations, tonefeatures.emotional_words,
+                                    tonefeatures.rational_punctuations, tonefeatures.rational_words), 1),
+}
+
+
+# 标签的版本：词典内容（保留顺序，地域按第一个命中的地区归类）加逻辑版本的指纹
+def labeler_version(name):
+    _, sources, logic = LABELERS[name]
+    payload = json.dumps([logic, sources()], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+# ====================== 磁盘上的标签文件 ======================
+# {文本指纹: 标签}，版本不同（词典改过）时整份作废；每种标签一个文件，互不影响
+class LabelStore:
+    def __init__(self, name, version, cache_dir=DEFAULT_LABEL_DIR):
+        self.path = os.path.join(cache_dir, f'{name}.pkl')
+        self.version = version
+        self.dirty = False
+        self.mtime = None
+        self.labels = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb') as f:
+            data = pickle.load(f)
+        self.mtime = os.path.getmtime(self.path)
+        return data['labels'] if data.get('version') == self.version else {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def update(self, keys, labels):
+        self.labels.update(zip(keys, labels))
+        self.dirty = True
+
+    # 读入之后文件被别的进程（并行运行的阶段）改过时，先合并它写入的标签再写，不会互相覆盖
+    def save(self):
+        if not self.dirty:
+            return
+        if os.path.exists(self.path) and os.path.getmtime(self.path) != self.mtime:
+            self.labels = {**self._read(), **self.labels}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': self.version, 'labels': self.labels}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self.mtime = os.path.getmtime(self.path)
+        self.dirty = False
+
+
+# ====================== 进程内的LRU ======================
+_front = {}  # (标签名, 版本) -> OrderedDict{文本指纹: 标签}
+
+
+def _front_for(name, version):
+    front = _front.get((name, version))
+    if front is None:
+        # 词典改过后旧版本的标签不会再用到
+        for old in [key for key in _front if key[0] == name]:
+            del _front[old]
+        front = _front[(name, version)] = OrderedDict()
+    return front
+
+
+def _remember(front, labels, maxsize=LRU_SIZE):
+    for key, label in labels.items():
+        front[key] = label
+        front.move_to_end(key)
+    while len(front) > maxsize:
+        front.popitem(last=False)
+
+
+def clear_memory():
+    _front.clear()
+
+
+# 按文本指纹取一种标签：missing是{文本指纹: 文本}（已去重），先查进程内LRU，再查磁盘文件，都没有的才调用分类函数，
+# 新算出的写回两层缓存；返回{文本指纹: 标签}，counts里填入各层命中数
+def _lookup(name, missing, cache, counts):
+    missing = dict(missing)
+    counts.update(unique=len(missing), memory=0, disk=0, computed=0)
+    labels = {}
+    if cache is not None:
+        version = labeler_version(name)
+        front = _front_for(name, version)
+        for key in list(missing):
+            label = front.get(key, missing)
+            if label is not missing:
+                labels[key] = label
+                del missing[key]
+        counts['memory'] = len(labels)
+        store = None
+        if missing:
+            store = LabelStore(name, version, cache)
+            for key in list(missing):
+                label = store.labels.get(key, missing)
+                if label is not missing:
+                    labels[key] = label
+                    del missing[key]
+            counts['disk'] = counts['unique'] - counts['memory'] - len(missing)
+
+    if missing:
+        computed = LABELERS[name][0](list(missing.values()))
+        labels.update(zip(missing, computed))
+        counts['computed'] = len(missing)
+        if cache is not None:
+            store.update(missing, computed)
+            store.save()
+    if cache is not None:
+        _remember(front, labels)
+    return labels
+
+
+def _unique_texts(texts):
+    texts = ['' if text is None or text != text else str(text) for text in texts]
+    keys = [text_key(text) for text in texts]
+    unique = {}
+    for key, text in zip(keys, texts):
+        unique.setdefault(key, text)
+    return keys, unique
+
+
+# 批量取标签：同样内容的文本只算一次，结果按输入顺序返回；cache=None时不读写缓存（同样内容仍只算一次）
+# stats给一个dict时填入各层命中数
+def label_texts(name, texts, cache=DEFAULT_LABEL_DIR, stats=None):
+    with span(f'labels:{name}', rows_in=len(texts)) as s:
+        keys, unique = _unique_texts(texts)
+        counts = {'texts': len(keys)}
+        labels = _lookup(name, unique, cache, counts)
+        s.set(**{key: value for key, value in counts.items() if key != 'texts'})
+        if stats is not None:
+            stats.update(counts)
+        return [labels[key] for key in keys]
+
+
+# 一次算好一批文本的多种标签（文本指纹只算一次），放进进程内LRU和磁盘缓存；
+# pipeline.py在运行各阶段之前调用，之后各阶段（包括fork出的子进程）取标签时直接命中LRU，不再扫描文本
+# 返回{标签名: 各层命中数}
+def prefetch(texts, names=None, cache=DEFAULT_LABEL_DIR):
+    _, unique = _unique_texts(texts)
+    stats = {}
+    for name in names or LABELERS:
+        with span(f'labels:{name}', rows_in=len(unique)) as s:
+            stats[name] = {'texts': len(unique)}
+            _lookup(name, unique, cache, stats[name])
+            s.set(**{key: value for key, value in stats[name].items() if key != 'texts'})
+    return stats
+
+
+# 语气特征表（与tonefeatures.extract_tone_features的结果相同），计数走标签缓存
+def tone_features(texts, cache=DEFAULT_LABEL_DIR):
+    index = texts.index if isinstance(texts, pd.Series) else None
+    counts = np.array(label_texts('tone', texts, cache=cache), dtype=np.int64).reshape(-1, 5)
+    return tonefeatures.scores_from_counts(counts, index=index)
+
+
+# ====================== 测速 ======================
+# 合成语料里按dup_rate混入转帖（与已有帖子内容完全相同），比较逐篇分类、冷缓存、磁盘缓存、进程内缓存，
+# 再模拟改动一个词典，检查只有对应的标签重新计算
+def benchmark(csv_path, posts=200000, dup_rate=0.3, seed=42):
+    import random
+    rng = random.Random(seed)
+    if os.path.exists(csv_path):
+        from corpus import load_corpus
+        base = load_corpus(csv_path)['分析文本'].tolist()
+        base = [f'{i} {text}' for i, text in enumerate(base * (int(posts * (1 - dup_rate)) // len(base) + 1))]
+    else:
+        base = keywords.synthetic_posts(int(posts * (1 - dup_rate)), seed=seed)
+    base = base[:int(posts * (1 - dup_rate))]
+    texts = base + [rng.choice(base) for _ in range(posts - len(base))]
+    rng.shuffle(texts)
+    print(f"测试文本：{len(texts)}篇，其中重复内容{posts - len(base)}篇")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in LABELERS:
+            start = time.perf_counter()
+            expected = LABELERS[name][0](texts)
+            direct = time.perf_counter() - start
+            timings = []
+            for layer in ('冷启动', '磁盘', '进程内'):
+                if layer == '磁盘':
+                    clear_memory()
+                stats = {}
+                start = time.perf_counter()
+                result = label_texts(name, texts, cache=cache_dir, stats=stats)
+                timings.append(f"{layer}{time.perf_counter() - start:.2f}s（新算{stats['computed']}）")
+                assert result == expected, f"{name}：缓存的标签与直接计算的不一致"
+            print(f"{name:<9}逐篇计算{direct:.2f}s  " + '  '.join(timings))
+
+        # 改动地域词典：只有地域标签作废
+        clear_memory()
+        keywords.region_keywords['江浙沪'].append('苏州')
+        keywords.region_matcher = keywords.KeywordMatcher(keywords.region_keywords, lower=True)
+        try:
+            recomputed = {}
+            for name in LABELERS:
+                stats = {}
+                label_texts(name, texts, cache=cache_dir, stats=stats)
+                recomputed[name] = stats['computed']
+            print(f"改动地域词典后重新计算的文本数：{recomputed}")
+        finally:
+            keywords.region_keywords['江浙沪'].remove('苏州')
+            keywords.region_matcher = keywords.KeywordMatcher(keywords.region_keywords, lower=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='帖子标签（态度/彩礼形式/地域/语气）的内容指纹缓存')
+    parser.add_argument('csv', nargs='?', default='./result/彩礼.csv')
+    parser.add_argument('--cache', default=DEFAULT_LABEL_DIR, help='标签缓存目录')
+    parser.add_argument('--bench', action='store_true', help='测各层缓存的效果')
+    parser.add_argument('--posts', type=int, default=200000, help='测速时的文本数')
+    parser.add_argument('--dup-rate', type=float, default=0.3, help='测速时重复内容的比例')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.csv, posts=args.posts, dup_rate=args.dup_rate)
+    else:
+        # 预先给语料算好所有标签
+        from corpus import load_corpus
+        texts = load_corpus(args.csv)['分析文本']
+        for name in LABELERS:
+            stats = {}
+            start = time.perf_counter()
+            label_texts(name, texts, cache=args.cache, stats=stats)
+            print(f"{name:<9}{stats['texts']}篇（不同内容{stats['unique']}篇），磁盘命中{stats['disk']}，"
+                  f"新算{stats['computed']}，用时{time.perf_counter() - start:.2f}s")
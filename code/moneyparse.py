@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+import numpy as np
+import pandas as pd
+from instrument import traced
+
+# 金额表达式解析：阿拉伯数字和中文数字（二十万、十几万、三万五、二三十万）、单位（万/w/千/k/元/块/亿）、
+# 范围（10-15万、10万到15万）、约数（20w+、20多万、大概20万、20万左右），整批文本一次扫描，
+# 结果是每个金额一行的表：所在文本、位置、金额（元）、下限、上限、单位、是否约数
+DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+CN_UNITS = {'十': 10, '百': 100, '千': 1000}
+UNIT_VALUE = {'万': 10000.0, '万元': 10000.0, '万块': 10000.0, 'w': 10000.0, '千': 1000.0, '千元': 1000.0,
+              '千块': 1000.0, 'k': 1000.0, '元': 1.0, '块': 1.0, '块钱': 1.0, 'rmb': 1.0, '亿': 100000000.0}
+UNIT_NAME = {'万元': '万', '万块': '万', 'w': '万', '千元': '千', '千块': '千', 'k': '千', '块': '元', '块钱': '元',
+             'rmb': '元'}
+MORE_WORDS = ('多', '几', '来', '+')  # 20多万、20w+：下限20万，上限进一位（30万）
+YEARS = (1900, 2100)                   # 不带单位的四位数在这个范围内当作年份
+
+_dig = ''.join(DIGITS)
+# 中文数字至少含一个数字或"十"/"几"，"千万不要"的"千万"不算金额
+_cn = f'[{_dig}十百千几]*[{_dig}十几][{_dig}十百千几]*'
+_ar = r'(?<![\d.a-z])(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?'
+_units = '|'.join(sorted((re.escape(u) + ('(?![a-z])' if u.isascii() else '') for u in UNIT_VALUE),
+                         key=len, reverse=True))
+
+
+def _number(p):
+    return f'(?:(?P<{p}ar>{_ar})|(?P<{p}cn>{_cn}))(?P<{p}more>多|几|来|\\+)?[ \\t]*(?P<{p}unit>{_units})?'
+
+
+# 整个语法编译成一个正则：[约数前缀] 数 [单位] [万后的零头] [到 数 [单位]] [约数后缀] [后面紧跟的非金额量词]
+money_pattern = (
+    # 先看第一个字能不能开头（数字或约数前缀的首字），不能的位置直接跳过，整段扫描快约4倍
+    f'(?=[\\d{_dig}十百千几大约差将接估])'
+    r'(?P<pre>大概|大约|约|差不多|将近|接近|估计)?'
+    + _number('a')
+    # 三万五、1w5、十万八千：紧跟在万后面的一位数是千位
+    + f'(?P<tail>(?<=[万w])(?:[{_dig}]|\\d)千?(?![\\d{_dig}十百千万.]))?'
+    + r'(?:[ \t]*(?:-|－|~|～|—|到|至)[ \t]*' + _number('b') + ')?'
+    + r'(?P<post>左右|上下|出头|多|以上|以内|以下|\+)?'
+    # 28岁、2023年、3-5个：后面是这些量词时不是金额（只对没有金额单位的数字起作用）
+    + r'(?:(?=[ \t]*(?P<after>岁|年|月|日|天|号|个|位|人|桌|次|家|斤|米|平|层|楼|%|％|点|度|分|周|小时|cm|kg|g(?![a-z])))|)'
+)
+# 不区分大小写（W、RMB、K），不把文本转成小写：有的字符转小写后变长（'İ'），位置会对不上
+money_re = re.compile(money_pattern, re.IGNORECASE)
+GROUPS = list(money_re.groupindex)
+GRAMMAR_LOGIC = 1  # 正则以外的解析逻辑（中文数字、约数、不带单位的数字）有变化时加1
+
+
+# 金额语法的版本：正则、单位表和解析逻辑版本的指纹，用过金额的结果表（aggregates.py）靠它判断是否过期
+def grammar_version():
+    payload = json.dumps([GRAMMAR_LOGIC, money_pattern, UNIT_VALUE, YEARS], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+# 解析结果的列
+MONEY_COLUMNS = ['row', 'start', 'end', 'value', 'low', 'high', 'unit', 'approx', 'text']
+
+
+# ====================== 中文数字 ======================
+# 一节中文数字（不含万/亿）的值："两千五"这种千/百后面直接跟一位数的，按口语理解为2500
+def _cn_section(text):
+    total, num, last_unit, after_unit = 0, 0, 1, False
+    for ch in text:
+        if ch in DIGITS:
+            num = DIGITS[ch]
+            after_unit = after_unit and ch not in '零〇'
+        else:
+            unit = CN_UNITS[ch]
+            total += (num or 1) * unit
+            num, last_unit, after_unit = 0, unit, True
+    if num and after_unit and last_unit >= 100:
+        return total + num * last_unit // 10
+    return total + num
+
+
+_range_pair = re.compile(f'([{_dig}])([{_dig}])(?=[十百千]|$)')
+_cn_cache = {}
+
+
+# 中文数字 -> (下限, 上限)：几 取1~9，二三十、七八万这种相邻两个数字是范围
+def cn_number(text):
+    bounds = _cn_cache.get(text)
+    if bounds is None:
+        low = _range_pair.sub(lambda m: m.group(1), text).replace('几', '一')
+        high = _range_pair.sub(lambda m: m.group(2), text).replace('几', '九')
+        bounds = _cn_cache[text] = (float(_cn_section(low)), float(_cn_section(high)))
+    return bounds
+
+
+# ====================== 批量解析 ======================
+# 一位数（阿拉伯或中文）-> 数值
+def _digit(text):
+    return DIGITS[text] if text in DIGITS else int(text)
+
+
+# 20多万的"上限进一位"：末尾有几个0就进到那一位（20->30, 15->16, 100->200），小数按1进
+def _step(values):
+    step = np.ones(len(values))
+    whole = (values == np.floor(values)) & (values > 0)
+    for k in range(1, 10):
+        more = whole & (np.mod(values, 10.0 ** k) == 0)
+        if not more.any():
+            break
+        step[more] = 10.0 ** k
+    return step
+
+
+def _bounds(numbers, cn):
+    low = pd.to_numeric(numbers.str.replace(',', '', regex=False), errors='coerce').to_numpy(dtype=float, copy=True)
+    high = low.copy()
+    is_cn = cn.notna().to_numpy()
+    if is_cn.any():
+        pairs = [cn_number(text) for text in cn[is_cn]]
+        low[is_cn] = [pair[0] for pair in pairs]
+        high[is_cn] = [pair[1] for pair in pairs]
+    return low, high
+
+
+# 对一批文本解析所有金额表达式，返回每个金额一行的表（列见MONEY_COLUMNS，row是文本在texts里的序号）
+# 不带单位的数字：后面跟着岁/年/个等量词的、像年份的、范围的不算；不小于100的按元计；
+# 小于100的按万元计（"彩礼18"），但同一段文本里已经有带单位的金额时不算
+@traced()
+def parse_money(texts):
+    texts = ['' if text is None or text != text else str(text) for text in texts]
+    # 所有文本用换行连成一段一次扫描（语法里的空白不含换行，匹配不会跨文本），再按起点换算回各文本
+    offsets = np.cumsum([0] + [len(text) + 1 for text in texts])
+    matches = [(m.start(), m.end(), *m.groups()) for m in money_re.finditer('\n'.join(texts))
+               if m.group('aar') or m.group('acn')]
+    df = pd.DataFrame(matches, columns=['start', 'end'] + GROUPS)
+    for col in ('aunit', 'bunit'):
+        df[col] = df[col].str.lower()
+    if df.empty:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in zip(
+            MONEY_COLUMNS, ['int64', 'int64', 'int64', 'float64', 'float64', 'float64', object, bool, object])})
+    starts = df['start'].to_numpy()
+    row = np.searchsorted(offsets, starts, side='right') - 1
+    base = offsets[row]
+
+    a_low, a_high = _bounds(df['aar'], df['acn'])
+    b_low, b_high = _bounds(df['bar'], df['bcn'])
+    has_b = ~np.isnan(b_low)
+    a_unit = df['aunit'].map(UNIT_VALUE).to_numpy(dtype=float)
+    b_unit = df['bunit'].map(UNIT_VALUE).to_numpy(dtype=float)
+    # 10-15万：前一个数没写单位时沿用后一个的单位
+    a_unit = np.where(np.isnan(a_unit) & has_b, b_unit, a_unit)
+    unit_text = df['aunit'].where(df['aunit'].notna() & ~has_b, df['bunit']).fillna(df['aunit'])
+    has_unit = ~np.isnan(a_unit)
+
+    # 万后面的零头：三万五=35000，十万八千=108000
+    tail = np.zeros(len(df))
+    for i, text in df['tail'].dropna().items():
+        tail[i] = _digit(text[0]) * (1000.0 if text.endswith('千') else a_unit[i] / 10)
+
+    post = df['post'].to_numpy(dtype=object)
+    a_more = df['amore'].notna().to_numpy() | (~has_b & np.isin(post, ['多', '+']))
+    b_more = df['bmore'].notna().to_numpy() | (has_b & np.isin(post, ['多', '+']))
+    mult = np.where(has_unit, a_unit, 1.0)
+    low = a_low * mult + tail
+    high = np.where(a_more, (a_low + _step(a_low)) * mult, a_high * mult + tail)
+    b_mult = np.where(np.isnan(b_unit), mult, b_unit)
+    high = np.where(has_b, np.where(b_more, (b_low + _step(b_low)) * b_mult, b_high * b_mult), high)
+
+    # 不带单位的数字
+    bare = ~has_unit
+    is_cn = df['acn'].notna().to_numpy()
+    rejected = bare & (is_cn | has_b | df['after'].notna().to_numpy()
+                       | ((a_low >= YEARS[0]) & (a_low <= YEARS[1]) & (a_low == np.floor(a_low))))
+    small = bare & ~rejected & (a_low < 100)
+    has_explicit = pd.Series(has_unit).groupby(row).transform('any').to_numpy()
+    rejected |= small & has_explicit
+    low = np.where(small, low * 10000, low)
+    high = np.where(small, high * 10000, high)
+    unit_text = unit_text.where(~small, '万').fillna('元')
+
+    approx = (df['pre'].notna() | df['post'].notna() | df['amore'].notna() | df['bmore'].notna()
+              | df['acn'].fillna('').str.contains('几', regex=False)).to_numpy() | (a_low != a_high) | (low != high)
+
+    ends = df['end'].to_numpy()
+    joined_rows = np.asarray(texts, dtype=object)[row]
+    result = pd.DataFrame({
+        'row': row, 'start': starts - base, 'end': ends - base,
+        'value': (low + high) / 2, 'low': low, 'high': high,
+        'unit': unit_text.map(lambda unit: UNIT_NAME.get(unit, unit)).to_numpy(dtype=object),
+        'approx': approx,
+        'text': [text[s:e] for text, s, e in zip(joined_rows, starts - base, ends - base)],
+    })
+    return result[~rejected].reset_index(drop=True)
+
+
+# 每段文本里的金额（元）列表，按出现顺序；没有金额的文本不在结果里
+def amounts_by_text(texts):
+    money = parse_money(texts)
+    return money.groupby('row', sort=False)['value'].agg(list)
+
+
+# ====================== 标注好的样例（核对用） ======================
+# (文本, [(金额, 下限, 上限), ...])，金额单位为元
+LABELED_EXAMPLES = [
+    ('彩礼二十万', [(200000, 200000, 200000)]),
+    ('要了20w+', [(250000, 200000, 300000)]),
+    ('十几万彩礼', [(150000, 110000, 190000)]),
+    ('彩礼18.8万', [(188000, 188000, 188000)]),
+    ('一般10-15万', [(125000, 100000, 150000)]),
+    ('10万到15万都有', [(125000, 100000, 150000)]),
+    ('八万八', [(88000, 88000, 88000)]),
+    ('三万五的彩礼', [(35000, 35000, 35000)]),
+    ('彩礼1w5', [(15000, 15000, 15000)]),
+    ('十万八千', [(108000, 108000, 108000)]),
+    ('二三十万很正常', [(250000, 200000, 300000)]),
+    ('七八万', [(75000, 70000, 80000)]),
+    ('大概20万左右', [(200000, 200000, 200000)]),
+    ('20多万', [(250000, 200000, 300000)]),
+    ('一百二十八万', [(1280000, 1280000, 1280000)]),
+    ('5千块', [(5000, 5000, 5000)]),
+    ('两千五百元', [(2500, 2500, 2500)]),
+    ('两千五块', [(2500, 2500, 2500)]),
+    ('188,000元', [(188000, 188000, 188000)]),
+    ('彩礼18', [(180000, 180000, 180000)]),
+    ('彩礼188000', [(188000, 188000, 188000)]),
+    ('8.8w', [(88000, 88000, 88000)]),
+    ('5k', [(5000, 5000, 5000)]),
+    ('1亿', [(100000000, 100000000, 100000000)]),
+    ('彩礼18，另外三金2万', [(20000, 20000, 20000)]),
+    ('5000块，再加6万8', [(5000, 5000, 5000), (68000, 68000, 68000)]),
+    ('几万块', [(50000, 10000, 90000)]),
+    ('28岁 彩礼', []),
+    ('2023年彩礼', []),
+    ('千万不要给彩礼', []),
+    ('3-5个', []),
+    ('iphone14', []),
+    ('零彩礼', []),
+    ('两千五', []),
+    ('İİİ彩礼20万', [(200000, 200000, 200000)]),  # 转小写会变长的字符，后面的位置不能错开
+    ('彩礼5万', [(50000, 50000, 50000)]),
+    ('彩礼8.8W，另给10000RMB', [(88000, 88000, 88000), (10000, 10000, 10000)]),
+]
+
+
+# 逐条核对样例（金额和位置），返回不一致的条目
+def check_examples(examples=LABELED_EXAMPLES):
+    money = parse_money([text for text, _ in examples])
+    failures = []
+    for i, (text, expected) in enumerate(examples):
+        found = money[money['row'] == i]
+        got = [tuple(row) for row in found[['value', 'low', 'high']].itertuples(index=False)]
+        spans_ok = all(text[start:end] == matched for start, end, matched in
+                       zip(found['start'], found['end'], found['text']))
+        if got != [tuple(float(v) for v in item) for item in expected] or not spans_ok:
+            failures.append((text, expected, got))
+    return failures
+
+
+# ====================== 测速 ======================
+# 由样例拼出的合成上下文（每段约100字，带1~3个金额表达式和干扰数字），比较原来的正则 + 不足100按万元计
+def synthetic_contexts(n, seed=42):
+    rng = random.Random(seed)
+    phrases = [text for text, _ in LABELED_EXAMPLES]
+    filler = '的了是我你他她在有这个结婚男女方家里父母觉得说问题钱多少年，。！？ '
+    contexts = []
+    for _ in range(n):
+        pieces = [''.join(rng.choices(filler, k=rng.randint(10, 40))) for _ in range(3)]
+        for _ in range(rng.randint(1, 3)):
+            pieces.insert(rng.randint(0, len(pieces)), rng.choice(phrases))
+        contexts.append(''.join(pieces))
+    return contexts
+
+
+def benchmark(n=200000):
+    from regionamount import parse_amounts_legacy
+    failures = check_examples()
+    for text, expected, got in failures:
+        print(f"样例不一致：{text}  期望{expected}  得到{got}")
+    print(f"标注样例：{len(LABELED_EXAMPLES) - len(failures)}/{len(LABELED_EXAMPLES)}条正确")
+
+    contexts = synthetic_contexts(n)
+    series = pd.Series(contexts)
+    start = time.perf_counter()
+    legacy = parse_amounts_legacy(series)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    money = parse_money(contexts)
+    new_time = time.perf_counter() - start
+    chars = sum(map(len, contexts))
+    print(f"{n}段上下文（{chars / 1e6:.1f}M字）：原来的正则{legacy_time:.2f}s（{sum(map(len, legacy.values()))}个金额）  "
+          f"金额语法{new_time:.2f}s（{len(money)}个金额，{n / new_time:,.0f}段/秒，{chars / new_time / 1e6:.1f}M字/秒）")
+
+    # 原来的解析在样例上的表现
+    old = parse_amounts_legacy(pd.Series([text for text, _ in LABELED_EXAMPLES]))
+    wrong = [text for i, (text, expected) in enumerate(LABELED_EXAMPLES)
+             if old.get(i, []) != [float(item[0]) for item in expected]]
+    print(f"原来的正则在样例上错{len(wrong)}条：{'、'.join(wrong)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='中文金额表达式解析：核对标注样例并测速')
+    parser.add_argument('text', nargs='*', help='要解析的文本')
+    parser.add_argument('--bench', action='store_true', help='核对样例并测吞吐量')
+    parser.add_argument('--contexts', type=int, default=200000, help='测速时的上下文段数')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.contexts)
+    elif args.text:
+        print(parse_money(args.text).to_string())
+    else:
+        failures = check_examples()
+        for text, expected, got in failures:
+            print(f"样例不一致：{text}  期望{expected}  得到{got}")
+        print(f"标注样例：{len(LABELED_EXAMPLES) - len(failures)}/{len(LABELED_EXAMPLES)}条正确")
+        raise SystemExit(1 if failures else 0)
@@ -0,0 +1,259 @@
+import argparse
+import os
+import random
+import time
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from instrument import traced
+
+# 近似重复（转帖、刷屏）检测：字符k-gram的MinHash签名 + LSH分段分桶，只比较同一个桶里的帖子
+SHINGLE_SIZE = 5     # 每个片段的字数
+NUM_PERM = 64        # 签名长度（哈希函数个数）
+BANDS = 16           # LSH分段数，每段NUM_PERM // BANDS行；两帖相似度s时成为候选的概率为1-(1-s^r)^b
+THRESHOLD = 0.7      # 片段集合的Jaccard相似度达到它才算近似重复
+
+_PRIME = np.uint64(0x100000001B3)
+
+
+def _hash_params(num_perm, seed=1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)  # 乘数取奇数
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _normalize(text):
+    # 空白不影响是否转帖
+    return ''.join(str(text).lower().split()) if text == text and text is not None else ''
+
+
+# 一批文本的所有k-gram哈希：文本拼起来转成码点数组，用滚动多项式哈希整批计算（结果与进程无关）
+# 返回(片段哈希, 每篇第一个片段的位置)；不足k字的文本末尾补\0，整篇算一个片段
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    texts = [text.ljust(k, '\0') for text in texts]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    windows = len(codes) - k + 1
+    h = np.zeros(windows, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(k):
+            h = h * _PRIME + codes[j:j + windows]
+        # splitmix64的末尾混合，让相近的码点组合也分散开
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+    # 只保留完整落在一篇文本里的窗口
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    counts = lengths - k + 1
+    keep = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return h[keep], offsets
+
+
+# MinHash签名：每个哈希函数取 (a*x+b) 的高32位（乘移位哈希），每篇取各函数下的最小值
+# 按哈希函数逐个算一维数组，比一次算(片段数, 几个函数)的二维数组快（reduceat在一维上快得多）
+@traced()
+def minhash_signatures(texts, num_perm=NUM_PERM, k=SHINGLE_SIZE, batch_size=10000, seed=1):
+    a, b = _hash_params(num_perm, seed)
+    texts = [_normalize(text) for text in texts]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), batch_size):
+        shingles, offsets = shingle_hashes(texts[start:start + batch_size], k)
+        block = signatures[start:start + len(offsets)]
+        for p in range(num_perm):
+            with np.errstate(over='ignore'):
+                values = (shingles * a[p] + b[p]) >> np.uint64(32)
+            block[:, p] = np.minimum.reduceat(values, offsets)
+    return signatures
+
+
+# 每篇文本的片段哈希集合（只为候选对里出现的帖子计算）
+def shingle_sets(texts, k=SHINGLE_SIZE):
+    shingles, offsets = shingle_hashes([_normalize(text) for text in texts], k)
+    return [set(part.tolist()) for part in np.split(shingles, offsets[1:])]
+
+
+# 核对候选对：给了原文时算精确的Jaccard，否则用签名相等的比例估计（64个哈希时标准差约0.06）
+def _similarity(edges, signatures, texts, k):
+    if texts is None:
+        similarity = np.empty(len(edges))
+        for start in range(0, len(edges), 1000000):
+            part = edges[start:start + 1000000]
+            similarity[start:start + len(part)] = (signatures[part[:, 0]] == signatures[part[:, 1]]).mean(axis=1)
+        return similarity
+    involved = np.unique(edges)
+    sets = dict(zip(involved.tolist(), shingle_sets([texts[i] for i in involved], k)))
+    return np.array([len(sets[i] & sets[j]) / len(sets[i] | sets[j]) for i, j in edges.tolist()])
+
+
+# LSH：每段签名合成一个桶键，同一段同一个桶里的帖子都与桶里第一篇组成候选对，
+# 相似度达到threshold的连成一组，返回每篇所在组的代表（组里最早的一篇）的位置
+@traced()
+def near_duplicate_groups(signatures, threshold=THRESHOLD, bands=BANDS, skip=None, texts=None, k=SHINGLE_SIZE):
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    multipliers = np.random.default_rng(7).integers(1, 2 ** 63, rows, dtype=np.uint64) | np.uint64(1)
+    ids = np.arange(n) if skip is None else np.flatnonzero(~np.asarray(skip, dtype=bool))
+    # 空表或全是空文本时没有可比较的帖子，每篇自成一组
+    if len(ids) == 0:
+        return np.arange(n)
+    sources, targets = [], []
+    for band in range(bands):
+        block = signatures[ids, band * rows:(band + 1) * rows].astype(np.uint64)
+        with np.errstate(over='ignore'):
+            keys = (block * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        new_bucket = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        first = order[np.maximum.accumulate(np.where(new_bucket, np.arange(len(order)), 0))]
+        pair = ~new_bucket
+        sources.append(ids[first[pair]])
+        targets.append(ids[order[pair]])
+
+    groups = np.arange(n)
+    edges = np.unique(np.stack([np.concatenate(sources), np.concatenate(targets)], axis=1), axis=0)
+    if len(edges) == 0:
+        return groups
+    edges = edges[_similarity(edges, signatures, texts, k) >= threshold]
+    graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    # 每组的代表取组里位置最小的一篇
+    first_of_label = np.full(labels.max() + 1, n, dtype=np.int64)
+    np.minimum.at(first_of_label, labels, np.arange(n))
+    return first_of_label[labels]
+
+
+# 给帖子表加两列：近似重复组（组里最早那篇的索引）、是否转帖（不是组里最早的那篇）；空文本不参与比较
+def flag_near_duplicates(df, column='分析文本', threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS,
+                         k=SHINGLE_SIZE):
+    texts = df[column].tolist()
+    signatures = minhash_signatures(texts, num_perm=num_perm, k=k)
+    empty = np.array([not _normalize(text) for text in texts])
+    groups = near_duplicate_groups(signatures, threshold=threshold, bands=bands, skip=empty, texts=texts, k=k)
+    return df.assign(近似重复组=df.index[groups], 是否转帖=groups != np.arange(len(df)))
+
+
+# 每组近似重复只保留最早的一篇
+def collapse_near_duplicates(df, **options):
+    flagged = flag_near_duplicates(df, **options)
+    return df[~flagged['是否转帖'].values]
+
+
+# ====================== 测速和准确率 ======================
+# 在合成帖子里埋入转帖：每条原帖复制1-8份，每份随机改动约1%的字，并随机加上转载前缀或来源后缀
+def synthetic_reposts(posts=100000, repost_ratio=0.2, edit_rate=0.01, seed=42):
+    from keywords import synthetic_posts
+    rng = random.Random(seed)
+    originals = synthetic_posts(int(posts * (1 - repost_ratio)), seed=seed, min_len=100)
+    prefixes = ['', '转：', '【转载】', '看到一篇文章：']
+    suffixes = ['', '（来源：广州日报）', ' 大家怎么看？', '#彩礼#']
+    texts, truth = list(originals), list(range(len(originals)))
+    while len(texts) < posts:
+        source = rng.randrange(len(originals))
+        for _ in range(min(rng.randint(1, 8), posts - len(texts))):
+            chars = list(originals[source])
+            for _ in range(max(1, int(len(chars) * edit_rate))):
+                i = rng.randrange(len(chars))
+                op = rng.random()
+                if op < 0.4:
+                    chars[i] = rng.choice('的了是我你他她在有')
+                elif op < 0.7:
+                    chars.insert(i, rng.choice('的了是我你他她在有'))
+                elif len(chars) > 1:
+                    del chars[i]
+            texts.append(rng.choice(prefixes) + ''.join(chars) + rng.choice(suffixes))
+            truth.append(source)
+    order = list(range(len(texts)))
+    rng.shuffle(order)
+    return [texts[i] for i in order], np.array([truth[i] for i in order])
+
+
+def _pairs(labels):
+    _, counts = np.unique(labels, return_counts=True)
+    return int((counts * (counts - 1) // 2).sum())
+
+
+# 按"同组帖子对"计算准确率和召回率
+def pair_precision_recall(predicted, truth):
+    both = _pairs(predicted.astype(np.int64) * (int(truth.max()) + 1) + truth)
+    return both / max(_pairs(predicted), 1), both / max(_pairs(truth), 1)
+
+
+# 精确的两两Jaccard（片段集合的稀疏矩阵自乘），只适合小样本，作为对照
+def exact_similar_pairs(texts, threshold=THRESHOLD, k=SHINGLE_SIZE):
+    texts = [_normalize(text) for text in texts]
+    shingles, offsets = shingle_hashes(texts, k)
+    doc = np.repeat(np.arange(len(texts)), np.diff(np.concatenate([offsets, [len(shingles)]])))
+    _, column = np.unique(shingles, return_inverse=True)
+    incidence = csr_matrix((np.ones(len(doc)), (doc, column)))
+    incidence.data[:] = 1  # 同一篇里重复的片段只算一次
+    sizes = np.asarray(incidence.sum(axis=1)).ravel()
+    inter = (incidence @ incidence.T).tocoo()
+    upper = inter.row < inter.col
+    rows, cols, common = inter.row[upper], inter.col[upper], inter.data[upper]
+    jaccard = common / (sizes[rows] + sizes[cols] - common)
+    keep = jaccard >= threshold
+    return set(zip(rows[keep].tolist(), cols[keep].tolist()))
+
+
+def benchmark(posts=200000, sample=5000, threshold=THRESHOLD):
+    # 1. 与精确两两比较对照：召回率/准确率（小样本）
+    texts, truth = synthetic_reposts(sample)
+    start = time.perf_counter()
+    exact = exact_similar_pairs(texts, threshold)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    groups = near_duplicate_groups(minhash_signatures(texts), threshold, texts=texts)
+    lsh_time = time.perf_counter() - start
+    found = {(i, j) for i, j in exact if groups[i] == groups[j]}
+    predicted = _pairs(groups)
+    print(f"{sample}篇：精确两两比较{exact_time:.2f}s，找到{len(exact)}对Jaccard≥{threshold}；MinHash+LSH {lsh_time:.2f}s")
+    print(f"  召回率（精确相似对被分到同组的比例）{len(found) / max(len(exact), 1):.3f}，"
+          f"同组帖子对{predicted}对，其中精确相似的占{len(found) / max(predicted, 1):.3f}")
+    precision, recall = pair_precision_recall(groups, truth)
+    print(f"  对照埋入的转帖：准确率{precision:.3f}，召回率{recall:.3f}")
+
+    # 2. 吞吐量：规模翻倍时耗时接近翻倍（不随帖子数平方增长）
+    for n in (posts // 4, posts // 2, posts):
+        texts, truth = synthetic_reposts(n)
+        start = time.perf_counter()
+        signatures = minhash_signatures(texts)
+        sig_time = time.perf_counter() - start
+        start = time.perf_counter()
+        groups = near_duplicate_groups(signatures, threshold, texts=texts)
+        lsh_time = time.perf_counter() - start
+        precision, recall = pair_precision_recall(groups, truth)
+        print(f"{n}篇：签名{sig_time:.1f}s + 分桶核对{lsh_time:.1f}s，{n / (sig_time + lsh_time):.0f}篇/s；"
+              f"对照埋入的转帖：准确率{precision:.3f}，召回率{recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='近似重复帖子（转帖、刷屏）检测：MinHash + LSH')
+    parser.add_argument('csv', nargs='?', default='./result/彩礼.csv', help='帖子CSV')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='片段集合的Jaccard相似度阈值')
+    parser.add_argument('--collapse', action='store_true', help='另存一份每组只保留最早一篇的CSV（去重_原文件名）')
+    parser.add_argument('--bench', action='store_true', help='在合成语料上测召回率/准确率和吞吐量')
+    parser.add_argument('--posts', type=int, default=200000, help='测速用的合成帖子数')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(posts=args.posts, threshold=args.threshold)
+    else:
+        from corpus import load_corpus
+        df = flag_near_duplicates(load_corpus(args.csv), threshold=args.threshold)
+        reposts = df[df['是否转帖']]
+        print(f"共{len(df)}篇，{reposts['近似重复组'].nunique()}组近似重复，可合并掉{len(reposts)}篇转帖")
+        groups = df[df['近似重复组'].isin(reposts['近似重复组'])]
+        sizes = groups['近似重复组'].value_counts()
+        print(groups.drop_duplicates('近似重复组').set_index('近似重复组')
+              .loc[sizes.index[:10], ['title']].assign(篇数=sizes.iloc[:10].values))
+        out_dir = os.path.dirname(os.path.abspath(args.csv))
+        groups[['近似重复组', '是否转帖', 'title', '分析文本']].to_csv(
+            os.path.join(out_dir, '近似重复帖子.csv'), encoding='utf-8-sig')
+        if args.collapse:
+            raw = pd.read_csv(args.csv)
+            out_path = os.path.join(out_dir, f'去重_{os.path.basename(args.csv)}')
+            raw[~df['是否转帖'].values].to_csv(out_path, index=False, encoding='utf-8-sig')
+            print(f"已保存去掉转帖后的数据：{out_path}")
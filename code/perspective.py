@@ -1,73 +1,27 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import re
-from collections import defaultdict
+from charts import figure, panel, render_charts
+from corpus import load_corpus
+from labelcache import label_texts
+from instrument import phase
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
-
-# 加载数据
+phase('perspective:读取数据')
+# 加载数据（缺失值填充和性别映射gender_mapped由corpus缓存提供）
 file_path = './result/彩礼.csv'
-df = pd.read_csv(file_path)
-df = df.fillna({'text': '', 'title': '', 'gender': 0})
-
-# 性别映射
-gender_mapping = {0: '未知', 1: '男性', 2: '女性'}
-df['gender_mapped'] = df['gender'].map(gender_mapping)
-
-# ====================== 定义彩礼态度关键词 ======================
-attitude_keywords = {
-    '支持': [
-        '彩礼应该给', '支持彩礼', '彩礼是传统', '彩礼合理', '彩礼体现诚意',
-        '适量彩礼', '彩礼有必要', '彩礼是仪式', '彩礼量力而行'
-    ],
-    '一般': [
-        '无所谓', '看情况', '都行', '随便', '中立', '看双方协商',
-        '都可以', '没意见', '视情况而定'
-    ],
-    '不支持': [
-        '反对彩礼', '彩礼没必要', '取消彩礼', '彩礼是陋习', '抵制彩礼',
-        '彩礼太高', '减少彩礼', '彩礼害人', '零彩礼'
-    ]
-}
-
-
-# ====================== 态度分类函数 ======================
-def classify_c彩礼_attitude(text):
-    text = str(text).lower()
-    attitude_scores = defaultdict(int)
-
-    # 匹配各态度关键词
-    for attitude, keywords in attitude_keywords.items():
-        for keyword in keywords:
-            if keyword.lower() in text:
-                attitude_scores[attitude] += 1
-
-    # 返回得分最高的态度（无匹配则为"一般"）
-    if attitude_scores:
-        return max(attitude_scores, key=attitude_scores.get)
-    else:
-        # 兜底规则：通过情感词判断
-        support_words = ['支持', '应该', '合理', '传统', '必要']
-        oppose_words = ['反对', '取消', '陋习', '没必要', '抵制']
+df = load_corpus(file_path)
 
-        support_count = sum(1 for word in support_words if word in text)
-        oppose_count = sum(1 for word in oppose_words if word in text)
-
-        if support_count > oppose_count:
-            return '支持'
-        elif oppose_count > support_count:
-            return '不支持'
-        else:
-            return '一般'
+# ====================== 彩礼态度关键词与分类函数 ======================
+phase('perspective:态度分类')
+# attitude_keywords定义在keywords.py中，classify_c彩礼_attitude用多模式匹配器一次扫描统计各态度的命中数，
+# 返回得分最高的态度；没有命中时用支持/反对情感词兜底。结果按文本缓存（labelcache.py），只有没见过的文本才分类
 
 
 # 合并标题和内容进行态度分析
-df['full_text'] = df['title'].astype(str) + ' ' + df['text'].astype(str)
-df['attitude'] = df['full_text'].apply(classify_c彩礼_attitude)
+df['full_text'] = df['分析文本']
+df['attitude'] = label_texts('attitude', df['full_text'])
 
 # ====================== 分性别统计态度分布 ======================
+phase('perspective:分性别统计')
 # 1. 整体态度分布
 total_attitude = df['attitude'].value_counts()
 total_attitude_ratio = df['attitude'].value_counts(normalize=True) * 100
@@ -104,48 +58,26 @@ print(f"男性样本量：{len(male_df)} 条")
 print(f"女性样本量：{len(female_df)} 条")
 
 # ====================== 可视化分析 ======================
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-fig.suptitle('不同性别对彩礼的态度分布对比', fontsize=16, fontweight='bold')
-
+phase('perspective:画图')
 # 颜色配置
 colors = ['#2ca02c', '#ff7f0e', '#d62728']  # 支持-绿色，一般-橙色，不支持-红色
 
-# 1. 数量对比柱状图
-x = attitude_categories
-width = 0.25
-ax1.bar([i - width for i in range(len(x))], attitude_stats['整体数量'], width, label='整体', color=colors, alpha=0.8)
-ax1.bar(range(len(x)), attitude_stats['男性数量'], width, label='男性', color=colors, alpha=0.6)
-ax1.bar([i + width for i in range(len(x))], attitude_stats['女性数量'], width, label='女性', color=colors, alpha=0.4)
-
-ax1.set_title('态度分布数量对比', fontsize=14)
-ax1.set_xlabel('态度倾向')
-ax1.set_ylabel('帖子数量')
-ax1.set_xticks(range(len(x)))
-ax1.set_xticklabels(x)
-ax1.legend()
-ax1.grid(axis='y', linestyle='--', alpha=0.7)
-
-# 2. 占比对比柱状图
-ax2.bar([i - width for i in range(len(x))], attitude_stats['整体占比(%)'], width, label='整体', color=colors, alpha=0.8)
-ax2.bar(range(len(x)), attitude_stats['男性占比(%)'], width, label='男性', color=colors, alpha=0.6)
-ax2.bar([i + width for i in range(len(x))], attitude_stats['女性占比(%)'], width, label='女性', color=colors, alpha=0.4)
+# 整体/男性/女性三组并排的柱子，透明度依次降低
+def grouped(suffix):
+    return attitude_stats[[f'整体{suffix}', f'男性{suffix}', f'女性{suffix}']].set_axis(['整体', '男性', '女性'], axis=1)
 
-ax2.set_title('态度分布占比对比(%)', fontsize=14)
-ax2.set_xlabel('态度倾向')
-ax2.set_ylabel('占比(%)')
-ax2.set_xticks(range(len(x)))
-ax2.set_xticklabels(x)
-ax2.legend()
-ax2.grid(axis='y', linestyle='--', alpha=0.7)
-
-# 添加百分比标签
-for i, container in enumerate(ax2.containers):
-    ax2.bar_label(container, fmt='%.1f%%', fontsize=8)
-
-plt.tight_layout()
-plt.savefig("./result/性别-彩礼态度对比分析.png", dpi=300, bbox_inches='tight')
+style = {'width': 0.25, 'colors': colors, 'alphas': [0.8, 0.6, 0.4], 'xlabel': '态度倾向', 'legend': True,
+         'grid': {'axis': 'y', 'linestyle': '--', 'alpha': 0.7}}
+render_charts([figure("./result/性别-彩礼态度对比分析.png", [
+    # 1. 数量对比柱状图
+    panel('grouped', grouped('数量'), title='态度分布数量对比', ylabel='帖子数量', **style),
+    # 2. 占比对比柱状图（添加百分比标签）
+    panel('grouped', grouped('占比(%)'), title='态度分布占比对比(%)', ylabel='占比(%)', **style,
+          bar_labels={'fmt': '{:.1f}%', 'fontsize': 8}),
+], title='不同性别对彩礼的态度分布对比', layout=(1, 2), figsize=(14, 6))])
 
 # ====================== 额外分析：未知性别群体对比 ======================
+phase('perspective:未知性别对比')
 unknown_df = df[df['gender_mapped'] == '未知']
 unknown_attitude = unknown_df['attitude'].value_counts()
 unknown_attitude_ratio = unknown_df['attitude'].value_counts(normalize=True) * 100
@@ -155,5 +87,3 @@ print("未知性别群体态度分布")
 print("=" * 80)
 for cat in attitude_categories:
     print(f"{cat}：{unknown_attitude.get(cat, 0)} 条（{unknown_attitude_ratio.get(cat, 0):.2f}%）")
-
-plt.show()
\ No newline at end of file
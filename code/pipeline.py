@@ -0,0 +1,173 @@
+import argparse
+import io
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import redirect_stdout
+
+import matplotlib
+
+# 无人值守运行：使用非交互后端，脚本里的plt.show()不会阻塞
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import instrument
+from corpus import DEFAULT_CSV, load_corpus
+from instrument import checkpoint, events_since, phase, span
+from labelcache import prefetch
+
+code_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 分析阶段：名称 -> (脚本, 依赖的阶段)
+STAGES = {
+    'heat': ('hot.py', []),                   # 热度前100
+    'heat_groups': ('hotreason.py', []),      # 热度分组对比
+    'category': ('category.py', []),          # 彩礼形式 / 地区形式偏好
+    'region_amount': ('shengfentongji.py', []),  # 地域彩礼金额
+    'attitude': ('perspective.py', []),       # 彩礼态度
+    'tone': ('attitude.py', []),              # 理性/感性语气
+    'gender': ('gender.py', []),              # 性别分布
+    'time': ('timequantity.py', []),          # 发帖时间
+    'word_freq': ('frequency.py', ['heat']),  # 高频词（读取热度100_彩礼.csv）
+    'region_chart': ('map.py', ['region_amount']),  # 地区金额柱状图（读取地域彩礼金额统计.csv）
+    'form_share': ('cat.py', ['category']),        # 彩礼类别占比（读取各地区彩礼形式偏好.csv）
+    'near_dup': ('neardup.py', []),           # 近似重复（转帖）检测
+}
+
+# 各阶段用到的帖子标签（labelcache.py）：运行阶段之前在主进程里对预加载的语料一次算好，
+# 各阶段（包括fork出的子进程）取标签时直接命中进程内缓存，不再各自扫描分析文本
+STAGE_LABELS = {
+    'category': ['forms', 'region'],
+    'form_share': ['forms', 'region'],  # 语料变了时cat.py会重新统计彩礼形式
+    'attitude': ['attitude'],
+    'tone': ['tone'],
+}
+
+
+# 在当前进程里运行一个阶段，返回计时和输出
+def run_stage(name, quiet=False):
+    script = os.path.join(code_dir, STAGES[name][0])
+    out = io.StringIO()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    # 阶段脚本按无参数运行，不要读到pipeline.py自己的命令行参数
+    argv = sys.argv
+    sys.argv = [script]
+    # 打开埋点时整个阶段记为一段，阶段里的函数/脚本阶段记在它下面；子进程里记录的事件随结果带回
+    mark = checkpoint()
+    with span(f'stage:{name}'):
+        try:
+            if quiet:
+                with redirect_stdout(out):
+                    runpy.run_path(script, run_name='__main__')
+            else:
+                runpy.run_path(script, run_name='__main__')
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            phase(None)  # 结束脚本里最后一个phase()
+            sys.argv = argv
+            plt.close('all')
+    return {
+        'stage': name,
+        'wall': time.perf_counter() - wall_start,
+        'cpu': time.process_time() - cpu_start,
+        'ok': error is None,
+        'error': error,
+        'output': out.getvalue(),
+        'spans': events_since(mark),
+    }
+
+
+def select_stages(only=None, skip=None):
+    names = list(STAGES)
+    if only:
+        unknown = set(only) - set(names)
+        if unknown:
+            raise SystemExit(f"未知的阶段：{', '.join(sorted(unknown))}，可选：{', '.join(names)}")
+        names = [name for name in names if name in only]
+    if skip:
+        names = [name for name in names if name not in skip]
+    return names
+
+
+# 按依赖关系调度：没有未完成依赖的阶段可以并行运行
+def run_pipeline(names, jobs=1):
+    results = {}
+    # 依赖不在本次运行范围内的，视为已经满足（使用上次的结果文件）
+    pending = {name: [dep for dep in STAGES[name][1] if dep in names] for name in names}
+
+    if jobs <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        while pending:
+            name = next(name for name, deps in pending.items() if all(dep in results for dep in deps))
+            del pending[name]
+            print(f"==================== {name} ====================")
+            results[name] = run_stage(name)
+        return results
+
+    # fork出的子进程直接继承父进程里已加载的语料，不用重新读取
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork')) as pool:
+        running = {}
+        while pending or running:
+            for name in [name for name, deps in pending.items() if all(dep in results for dep in deps)]:
+                del pending[name]
+                running[pool.submit(run_stage, name, True)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                instrument.add_events(results[name]['spans'])
+                print(f"==================== {name} ====================")
+                print(results[name]['output'], end='')
+    return results
+
+
+def print_summary(results, total):
+    print("\n" + "=" * 50)
+    print(f"{'阶段':<16}{'墙钟(s)':>10}{'CPU(s)':>10}  状态")
+    print("=" * 50)
+    for name, result in results.items():
+        status = '完成' if result['ok'] else '失败'
+        print(f"{name:<16}{result['wall']:>10.2f}{result['cpu']:>10.2f}  {status}")
+    print(f"{'总计':<16}{total:>10.2f}")
+    for name, result in results.items():
+        if not result['ok']:
+            print(f"\n[{name}] 出错：\n{result['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='在一个进程里运行全部分析，共享同一份语料')
+    parser.add_argument('--only', nargs='+', metavar='STAGE', help=f"只运行这些阶段：{', '.join(STAGES)}")
+    parser.add_argument('--skip', nargs='+', metavar='STAGE', default=[], help='跳过这些阶段')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='并行运行的阶段数（1为依次运行）')
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='预先加载的语料CSV')
+    parser.add_argument('--trace', nargs='?', const=instrument.DEFAULT_TRACE, default=None, metavar='PATH',
+                        help=f'记录各阶段和主要函数的耗时、内存、行数，写出Chrome Trace（默认{instrument.DEFAULT_TRACE}）')
+    parser.add_argument('--cprofile', action='store_true', help='同时用cProfile记录函数级耗时（另存.prof，只能依次运行）')
+    parser.add_argument('--tracemalloc', action='store_true', help='同时用tracemalloc记录每段的峰值内存（较慢）')
+    args = parser.parse_args()
+
+    if args.trace or args.cprofile or args.tracemalloc:
+        instrument.enable(trace=args.trace or instrument.DEFAULT_TRACE, cprofile=args.cprofile, memory=args.tracemalloc)
+        if args.cprofile:
+            args.jobs = 1  # cProfile只能记录当前进程
+
+    names = select_stages(args.only, args.skip)
+    start = time.perf_counter()
+    # 预先加载一次语料，之后各阶段的load_corpus直接复用内存里的这份
+    if os.path.exists(args.csv):
+        with span('preload'):
+            corpus = load_corpus(args.csv)
+        print(f"语料预加载用时{time.perf_counter() - start:.2f}s")
+        labels = list(dict.fromkeys(label for name in names for label in STAGE_LABELS.get(name, [])))
+        if labels:
+            label_start = time.perf_counter()
+            prefetch(corpus['分析文本'], labels)
+            print(f"帖子标签（{'、'.join(labels)}）预先计算用时{time.perf_counter() - label_start:.2f}s")
+    results = run_pipeline(names, jobs=args.jobs)
+    print_summary(results, time.perf_counter() - start)
+    sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import time
+
+
+# 限流/重试相关的计数器
+class RateLimitStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.requests = 0          # 实际发出的请求数（含重试）
+        self.successes = 0
+        self.errors = 0            # 失败的请求数（异常或返回err）
+        self.slow = 0              # 延迟超过阈值的请求数
+        self.retries = 0
+        self.throttle_waits = 0    # 因令牌不足而等待的次数
+        self.throttle_wait_time = 0.0
+        self.latency_total = 0.0
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.successes / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        avg_latency = self.latency_total / self.requests if self.requests else 0.0
+        return (f"请求{self.requests}次，成功{self.successes}次，失败{self.errors}次，慢请求{self.slow}次，"
+                f"重试{self.retries}次，限流等待{self.throttle_waits}次（共{self.throttle_wait_time:.2f}s），"
+                f"平均延迟{avg_latency * 1000:.0f}ms，有效速率{self.rate():.1f}次/秒")
+
+
+# 令牌桶：平均每秒最多rate个请求，允许capacity个的突发
+class TokenBucket:
+    def __init__(self, rate, capacity=None, stats=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.stats = stats
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # 加锁保证排队的请求按先来后到拿令牌
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                if self.stats:
+                    self.stats.throttle_waits += 1
+                    self.stats.throttle_wait_time += wait
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+
+# AIMD并发控制：请求正常时并发上限加性增长，出错或变慢时乘性减小
+class AIMDLimiter:
+    def __init__(self, initial=4, min_limit=1, max_limit=32, increase=1.0, decrease=0.5, slow_latency=2.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency, ok):
+        async with self.condition:
+            self.in_flight -= 1
+            if ok and latency <= self.slow_latency:
+                # 每个成功请求增加increase/limit，相当于每一轮（limit个请求）上限加increase
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            else:
+                # 同一轮内的多个失败只减一次，避免上限被连续砍到底
+                now = time.monotonic()
+                if now - self.last_decrease > max(latency, 0.1):
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self.last_decrease = now
+            self.condition.notify_all()
+
+    # 请求被取消：只归还名额，不算成功也不算失败，上限不变
+    async def cancel(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+
+def default_is_error(result):
+    # aiotieba出错时不抛异常，而是在返回值的err属性里带上异常
+    return getattr(result, 'err', None) is not None
+
+
+# 调度器：令牌桶限速 + AIMD控制并发 + 带抖动的指数退避重试
+class Scheduler:
+    def __init__(self, rate=None, concurrency=4, max_concurrency=32, retries=5, base_delay=0.5, max_delay=30.0,
+                 slow_latency=2.0, is_error=default_is_error, seed=None):
+        self.stats = RateLimitStats()
+        self.bucket = TokenBucket(rate, stats=self.stats) if rate else None
+        self.limiter = AIMDLimiter(initial=concurrency, max_limit=max(max_concurrency, concurrency),
+                                   slow_latency=slow_latency)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.slow_latency = slow_latency
+        self.is_error = is_error
+        self.random = random.Random(seed)
+
+    # 第attempt次重试前的等待时间（full jitter）
+    def backoff(self, attempt):
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, func, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            if self.bucket:
+                await self.bucket.acquire()
+            await self.limiter.acquire()
+            start = time.perf_counter()
+            error = None
+            try:
+                result = await func(*args, **kwargs)
+                if self.is_error(result):
+                    error = result.err
+            except asyncio.CancelledError:
+                await self.limiter.cancel()
+                raise
+            except Exception as e:
+                error = e
+            latency = time.perf_counter() - start
+
+            self.stats.requests += 1
+            self.stats.latency_total += latency
+            if latency > self.slow_latency:
+                self.stats.slow += 1
+            await self.limiter.release(latency, error is None)
+
+            if error is None:
+                self.stats.successes += 1
+                return result
+            self.stats.errors += 1
+            if attempt == self.retries:
+                raise error if isinstance(error, BaseException) else RuntimeError(error)
+            self.stats.retries += 1
+            await asyncio.sleep(self.backoff(attempt))
@@ -0,0 +1,227 @@
+import argparse
+import hashlib
+import json
+import re
+import time
+import numpy as np
+import pandas as pd
+from corpus import load_corpus
+from keywords import region_amount_keywords, region_amount_matcher
+from instrument import traced
+from moneyparse import grammar_version, parse_money
+
+# 金额的解析在moneyparse.py（中文数字、范围、约数）；下面是原来的金额正则（parse_amounts_legacy）和虚量描述词
+amount_pattern = r'(\d+(?:\.\d+)?)\s*(万|w|千|k|块|元|RMB)|(\d+(?:,\d+)*(?:\.\d+)?)'
+virtual_amount_words = ['多', '少', '不多', '不少', '一般', '普遍', '大概', '左右', '上下']
+
+RECORD_COLUMNS = ['地域', '具体金额', '平均金额', '虚量描述', '上下文', '帖子ID']
+
+amount_re = re.compile(amount_pattern)
+CONTEXT_WIDTH = 50  # 地域关键词前后各取的字数（不跨行）
+EXTRACT_LOGIC = 1  # 提取逻辑有变化时加1
+region_order = {region: i for i, region in enumerate(region_amount_keywords)}
+unit_multiplier = {'万': 10000.0, 'w': 10000.0, '千': 1000.0, 'k': 1000.0}
+
+
+# 对一整列文本提取地域彩礼记录，返回的列与原来逐行提取的结果相同，帖子ID取自texts的索引
+# legacy=True时金额用原来的正则解析（与extract_region_amounts_naive逐格一致）
+@traced()
+def extract_region_amounts(texts, legacy=False):
+    texts = pd.Series(texts).fillna('').astype(str)
+    lower = texts.str.lower().tolist()
+
+    # 1. 多模式匹配找出每个帖子命中的地区及其第一个关键词；内部按位置编号（索引可能有重复标签），最后才换成帖子ID
+    hits = pd.DataFrame(
+        [(pos, region_order[region], region, keyword)
+         for pos, text in enumerate(lower)
+         for region, keyword in region_amount_matcher.first_keywords(text).items()],
+        columns=['_pos', '_order', '地域', '_keyword'])
+    if hits.empty:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+
+    # 2. 取关键词前后各50字的上下文
+    hits['上下文'] = [keyword_context(lower[pos], keyword)
+                     for pos, keyword in zip(hits['_pos'], hits['_keyword'])]
+
+    # 3. 对所有上下文一次性提取金额
+    amounts = (parse_amounts_legacy if legacy else parse_amounts)(hits['上下文'])
+    hits['具体金额'] = [amounts.get(i, []) for i in hits.index]
+
+    # 4. 虚量描述：按词表顺序取第一个出现的词
+    virtual = pd.Series(np.nan, index=hits.index, dtype=object)
+    for word in virtual_amount_words:
+        virtual = virtual.mask(virtual.isna() & hits['上下文'].str.contains(word, regex=False), word)
+    hits['虚量描述'] = virtual
+
+    # 只保留有有效金额或虚量描述的记录
+    hits = hits[(hits['具体金额'].str.len() > 0) | hits['虚量描述'].notna()]
+    hits['平均金额'] = [np.mean(values) if values else None for values in hits['具体金额']]
+    hits = hits.sort_values(['_pos', '_order'], kind='stable')
+    hits['帖子ID'] = texts.index[hits['_pos'].to_numpy()]
+    return hits[RECORD_COLUMNS].reset_index(drop=True)
+
+
+# 地域金额提取的版本：地域词典、虚量描述词、上下文宽度和金额语法的指纹（同labelcache.labeler_version）
+def extraction_version():
+    payload = json.dumps([EXTRACT_LOGIC, region_amount_keywords, virtual_amount_words, CONTEXT_WIDTH,
+                          grammar_version()], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+# 与原来的正则 .{0,50}关键词.{0,50} 取到的相同：第一次出现的关键词往前最多50字（不跨行）开始，
+# 贪婪匹配到50字以内最后一次出现的关键词，再往后最多50字。用字符串查找代替每个关键词一条正则
+def keyword_context(text, keyword, width=CONTEXT_WIDTH):
+    pos = text.find(keyword)
+    line_start = text.rfind('\n', 0, pos) + 1
+    line_end = text.find('\n', pos)
+    if line_end < 0:
+        line_end = len(text)
+    start = max(line_start, pos - width)
+    last = text.rfind(keyword, start, min(start + width + len(keyword), line_end))
+    return text[start:min(last + len(keyword) + width, line_end)]
+
+
+# 从一列上下文里提取金额（moneyparse.parse_money，范围和约数取中值），返回{行索引: [金额, ...]}
+def parse_amounts(contexts):
+    values = parse_money(contexts.tolist()).groupby('row', sort=False)['value'].agg(list)
+    return {contexts.index[row]: amounts for row, amounts in values.items()}
+
+
+# 原来的解析：金额正则 + 不足100的纯数字在上下文没有"万"/"w"时按万元计，返回{行索引: [金额, ...]}
+def parse_amounts_legacy(contexts):
+    matches = contexts.str.extractall(amount_re)
+    if matches.empty:
+        return {}
+    with_unit = matches[0].notna()
+    value = pd.to_numeric(matches[0].where(with_unit, matches[2].str.replace(',', '', regex=False)))
+    value = value * matches[1].map(unit_multiplier).fillna(1.0)
+
+    # 纯数字小于100且上下文没有"万"/"w"时按万元计
+    owner = matches.index.get_level_values(0)
+    no_wan = ~(contexts.str.contains('万', regex=False) | contexts.str.contains('w', regex=False))
+    bare_small = ~with_unit & (value < 100) & no_wan.reindex(owner).values
+    value = value.where(~bare_small, value * 10000)
+    return value.groupby(level=0).agg(list).to_dict()
+
+
+# ====================== 原来的逐行实现（用于核对结果和测速） ======================
+def extract_region_c彩礼(text):
+    results = []
+    text = text.lower()
+
+    for region, keyword in region_amount_matcher.first_keywords(text).items():
+        region_text = re.search(f'.{{0,50}}{re.escape(keyword)}.{{0,50}}', text)
+        if region_text:
+            region_context = region_text.group()
+            amounts = []
+
+            # 提取具体金额
+            amount_matches = re.findall(amount_pattern, region_context)
+            for match in amount_matches:
+                try:
+                    if match[0]:  # 带单位的金额
+                        num = float(match[0])
+                        unit = match[1]
+                        if unit in ['万', 'w']:
+                            amounts.append(num * 10000)
+                        elif unit in ['千', 'k']:
+                            amounts.append(num * 1000)
+                        else:
+                            amounts.append(num)
+                    elif match[2]:  # 纯数字
+                        num = float(match[2].replace(',', ''))
+                        if num < 100 and '万' not in region_context and 'w' not in region_context:
+                            amounts.append(num * 10000)
+                        else:
+                            amounts.append(num)
+                except (ValueError, TypeError):
+                    continue
+
+            # 提取虚量描述
+            virtual_desc = None
+            for word in virtual_amount_words:
+                if word in region_context:
+                    virtual_desc = word
+                    break
+
+            # 只添加有有效金额或虚量描述的记录
+            if amounts or virtual_desc:
+                avg_amount = np.mean(amounts) if amounts else None
+                results.append({
+                    '地域': region,
+                    '具体金额': amounts if amounts else [],
+                    '平均金额': avg_amount,
+                    '虚量描述': virtual_desc,
+                    '上下文': region_context
+                })
+    return results
+
+
+def extract_region_amounts_naive(df, text_col='分析文本'):
+    all_region_data = []
+    for idx, row in df.iterrows():
+        for info in extract_region_c彩礼(row[text_col]):
+            info['帖子ID'] = idx
+            all_region_data.append(info)
+    return pd.DataFrame(all_region_data, columns=RECORD_COLUMNS)
+
+
+# 把记录表转成与保存的CSV相同的文本形式，便于逐格比较
+def _as_csv_text(df):
+    out = df[RECORD_COLUMNS].copy()
+    out['具体金额'] = out['具体金额'].map(str)
+    out = out.astype(object).where(out.notna(), '')
+    return out.apply(lambda col: col.map(str)).reset_index(drop=True)
+
+
+# 与之前保存的地域彩礼原始数据.csv逐格比较
+def compare_with_reference(region_df, reference_csv):
+    reference = pd.read_csv(reference_csv, index_col=0, keep_default_na=False, dtype=str)
+    new = _as_csv_text(region_df)
+    if len(new) != len(reference):
+        print(f"行数不同：新{len(new)}行，参考{len(reference)}行")
+        return False
+    reference['平均金额'] = reference['平均金额'].map(lambda v: str(float(v)) if v else '')
+    new['平均金额'] = new['平均金额'].map(lambda v: str(float(v)) if v else '')
+    diff = (new != reference[RECORD_COLUMNS].reset_index(drop=True)).any(axis=1)
+    if diff.any():
+        print(f"{int(diff.sum())}行不同，前5行：")
+        print(pd.concat([new[diff].head(), reference[diff.values].head()]))
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='地域彩礼金额提取：核对结果并测速')
+    parser.add_argument('--csv', default='./result/彩礼.csv', help='语料CSV')
+    parser.add_argument('--reference', default=None, help='之前保存的地域彩礼原始数据.csv，用于回归比对')
+    parser.add_argument('--scale', type=int, default=1, help='把语料放大的倍数')
+    args = parser.parse_args()
+
+    df = load_corpus(args.csv)
+    if args.scale > 1:
+        df = pd.concat([df] * args.scale, ignore_index=True)
+
+    start = time.perf_counter()
+    expected = extract_region_amounts_naive(df)
+    naive_time = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy = extract_region_amounts(df['分析文本'], legacy=True)
+    legacy_time = time.perf_counter() - start
+    assert _as_csv_text(legacy).equals(_as_csv_text(expected)), "新旧实现结果不一致"
+    print(f"{len(df)}帖 {len(legacy)}条记录：iterrows逐行{naive_time:.2f}s  整列提取{legacy_time:.2f}s  "
+          f"加速{naive_time / legacy_time:.1f}x（结果一致）")
+
+    # 换成金额语法后具体金额有变化的记录
+    start = time.perf_counter()
+    result = extract_region_amounts(df['分析文本'])
+    fast_time = time.perf_counter() - start
+    merged = legacy.merge(result, on=['帖子ID', '地域'], how='outer', suffixes=('_旧', '_新'), indicator=True)
+    changed = merged[(merged['_merge'] != 'both')
+                     | (merged['具体金额_旧'].map(str) != merged['具体金额_新'].map(str))]
+    print(f"金额语法：{len(result)}条记录，用时{fast_time:.2f}s，与原来的正则相比{len(changed)}条记录的金额不同")
+    changed = changed.assign(上下文=changed['上下文_新'].fillna(changed['上下文_旧']))
+    for _, row in changed.drop_duplicates(['地域', '上下文']).head(10).iterrows():
+        print(f"  {row['地域']}：{row['具体金额_旧']} -> {row['具体金额_新']}  {row['上下文'][:60]!r}")
+    if args.reference:
+        print("与参考CSV一致" if compare_with_reference(result, args.reference) else "与参考CSV不一致")
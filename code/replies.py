@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+import aiotieba
+import pandas as pd
+from tqdm import tqdm
+from instrument import span
+from ratelimit import Scheduler
+from streamwriter import ThreadWriter
+
+# 回复表的列，tid与帖子表（dataHelper.COLUMNS）的tid对应
+REPLY_COLUMNS = ['tid', 'pid', 'floor', 'user_name', 'nick_name', 'level', 'gender', 'text',
+                 'agree', 'disagree', 'create_time']
+
+
+def post_to_tuple(post):
+    return (post.tid, post.pid, post.floor, post.user.user_name, post.user.nick_name_new,
+            post.user.level, post.user.gender, post.text, post.agree, post.disagree,
+            datetime.fromtimestamp(post.create_time).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+# 已爬完的帖子ID，一行一个，只追加不重写，中途退出后可以接着爬
+class DoneLog:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+    def __contains__(self, tid):
+        return tid in self.done
+
+    def mark(self, tids):
+        if not tids:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(f'{tid}\n' for tid in tids)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(tids)
+
+
+# 爬取一个帖子的全部回复（最多max_pages页）
+async def fetch_thread_posts(client, tid, max_pages=10, rn=30, scheduler=None):
+    rows = []
+    for pn in range(1, max_pages + 1):
+        if scheduler:
+            posts = await scheduler.call(client.get_posts, tid, pn=pn, rn=rn)
+        else:
+            posts = await client.get_posts(tid, pn=pn, rn=rn)
+        rows += [post_to_tuple(post) for post in posts]
+        if not posts or not getattr(posts, 'has_more', len(posts) >= rn):
+            break
+    return rows
+
+
+# 从帖子列表出发爬取回复：workers个协程组成固定大小的工作池，回复数多的帖子优先
+async def crawl_replies(client, threads, writer, done=None, workers=8, max_pages=10, min_reply=1,
+                        scheduler=None, progress=True):
+    queue = asyncio.PriorityQueue()
+    for tid, reply in threads:
+        if reply >= min_reply and (done is None or tid not in done):
+            queue.put_nowait((-reply, tid))
+    bar = tqdm(total=queue.qsize(), disable=not progress)
+    # 已写入writer但还没落盘的帖子，等writer落盘后再记为已完成
+    pending = []
+
+    async def worker():
+        while True:
+            try:
+                _, tid = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            rows = await fetch_thread_posts(client, tid, max_pages=max_pages, scheduler=scheduler)
+            pending.append(tid)
+            writer.write_rows(rows)
+            bar.update(1)
+
+    def on_flush(_):
+        if done is not None:
+            done.mark(pending)
+        pending.clear()
+
+    writer.on_flush = on_flush
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        writer.close()
+        # 缓冲区为空时close()不会落盘、也不会回调on_flush：最后一次落盘之后才爬完的帖子
+        # （没有回复、已删除的）到这里也都已完整写出，一并记为已完成
+        on_flush(writer.flushed_page)
+        bar.close()
+    return writer.rows_written
+
+
+def load_threads(tb):
+    df = pd.read_csv(f'./result/{tb}.csv', encoding='utf-8-sig')
+    if 'tid' not in df.columns:
+        raise ValueError(f"./result/{tb}.csv 没有tid列，请先用新版dataHelper.py重新爬取")
+    df = df.dropna(subset=['tid']).fillna({'reply': 0})
+    return list(zip(df['tid'].astype(int), df['reply'].astype(int)))
+
+
+async def main(tb_list, workers=8, max_pages=10, min_reply=1, rate=None, batch_size=1000):
+    scheduler = Scheduler(rate=rate, concurrency=workers, max_concurrency=workers)
+    async with aiotieba.Client() as client:
+        for tb in tb_list:
+            print(f"--------------------{tb} 回复 Begin!--------------------")
+            done = DoneLog(f'./result/{tb}_replies_done.txt')
+            writer = ThreadWriter(f'./result/{tb}_replies.csv', REPLY_COLUMNS, batch_size=batch_size, append=True)
+            with span(f'replies:{tb}'):
+                rows = await crawl_replies(client, load_threads(tb), writer, done=done, workers=workers,
+                                           max_pages=max_pages, min_reply=min_reply, scheduler=scheduler)
+            print(f"新写入回复{rows}条，{scheduler.stats.summary()}")
+    print("回复爬取完成！")
+
+
+# 用dataHelper里的假客户端测速，并检查中途中断后续爬的结果与一次爬完一致
+async def benchmark(threads=2000, latency=0.02, workers=16, batch_size=300):
+    import tempfile
+    from dataHelper import FakeClient
+
+    thread_list = [(tid, tid % 50) for tid in range(1, threads + 1)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for mode, n in (('sequential', 1), ('pool', workers)):
+            async with FakeClient(latency=latency) as client:
+                csv_path = os.path.join(tmp_dir, f'{mode}.csv')
+                start = time.perf_counter()
+                rows = await crawl_replies(client, thread_list, ThreadWriter(csv_path, REPLY_COLUMNS, parquet=False),
+                                           workers=n, progress=False)
+                elapsed = time.perf_counter() - start
+            results[mode] = pd.read_csv(csv_path).sort_values('pid').reset_index(drop=True)
+            print(f"{mode:<10} 工作协程={n:<3} {rows}条回复 用时{elapsed:.2f}s  {client.calls / elapsed:.1f} 页/秒")
+
+        # 先爬一半就中断，再续爬
+        csv_path = os.path.join(tmp_dir, 'resume.csv')
+        done = DoneLog(os.path.join(tmp_dir, 'done.txt'))
+        async with FakeClient(latency=latency) as client:
+            task = asyncio.ensure_future(crawl_replies(
+                client, thread_list, ThreadWriter(csv_path, REPLY_COLUMNS, batch_size=batch_size, parquet=False),
+                done=done, workers=workers, progress=False))
+            await asyncio.sleep(latency * threads / workers / 4)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            print(f"中断时已完成{len(done.done)}个帖子")
+            await crawl_replies(client, thread_list,
+                                ThreadWriter(csv_path, REPLY_COLUMNS, batch_size=batch_size, parquet=False,
+                                             append=True),
+                                done=DoneLog(done.path), workers=workers, progress=False)
+        resumed = pd.read_csv(csv_path).drop_duplicates('pid').sort_values('pid').reset_index(drop=True)
+        assert results['pool'].equals(results['sequential']), "工作池与顺序爬取的回复不一致"
+        assert resumed.equals(results['sequential']), "续爬结果与一次爬完不一致"
+        print("顺序/工作池/中断续爬三种方式得到的回复表一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='爬取帖子的回复（需先用dataHelper.py爬取帖子列表）')
+    parser.add_argument('tb', nargs='*', help='贴吧名，读取./result/{吧名}.csv')
+    parser.add_argument('--workers', type=int, default=8, help='同时爬取的帖子数')
+    parser.add_argument('--max-pages', type=int, default=10, help='每个帖子最多爬取的回复页数')
+    parser.add_argument('--min-reply', type=int, default=1, help='回复数少于该值的帖子跳过')
+    parser.add_argument('--rate', type=float, default=None, help='每秒最多发出的请求数（默认不限速）')
+    parser.add_argument('--bench', action='store_true', help='用本地假客户端测试')
+    args = parser.parse_args()
+
+    if args.bench:
+        asyncio.run(benchmark(workers=args.workers))
+    else:
+        asyncio.run(main(args.tb or input().split(), workers=args.workers, max_pages=args.max_pages,
+                         min_reply=args.min_reply, rate=args.rate))
@@ -0,0 +1,209 @@
+import time
+from array import array
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # 没有安装pyarrow时不写Parquet，也用不到Arrow类型
+    pa = None
+
+# 帖子记录的紧凑类型：爬取时的内存缓冲和Parquet数据集都按它存
+# category：重复很多的字符串/取值，只存一份取值和每行的编号；epoch：Unix时间戳（秒），不再存格式化后的字符串
+GENDER_CATEGORIES = [0, 1, 2]  # 0未知 1男 2女
+THREAD_SCHEMA = {
+    'user_name': 'category',
+    'nick_name': 'category',
+    'level': 'int8',
+    'glevel': 'int8',
+    'gender': ('category', GENDER_CATEGORIES),
+    'is_vip': 'bool',
+    'title': 'str',
+    'text': 'str',
+    'view': 'int64',      # 浏览量可能很大
+    'reply': 'int32',
+    'share': 'int32',
+    'agree': 'int32',
+    'disagree': 'int32',
+    'create_time': 'epoch',
+    'last_time': 'epoch',
+    'tid': 'int64',
+}
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # CSV里时间列的格式（与原来的strftime一致）
+
+# 数值列在array.array里的类型码
+_TYPECODES = {'int8': 'b', 'bool': 'b', 'int32': 'i', 'int64': 'q', 'epoch': 'q'}
+
+
+def _kind(spec):
+    return spec[0] if isinstance(spec, tuple) else spec
+
+
+# ====================== 内存里的记录缓冲 ======================
+# 按列存放记录：数值列是array.array（每个值1~8字节），category列存编号，只有标题和正文是Python字符串
+# 代替原来的元组列表（每行一个元组、每个字段一个Python对象）
+class RecordBuffer:
+    def __init__(self, schema=THREAD_SCHEMA):
+        self.schema = schema
+        self.columns = {}
+        self.categories = {}
+        for name, spec in schema.items():
+            kind = _kind(spec)
+            if kind == 'category':
+                self.columns[name] = array('i')
+                # 取值 -> 编号，固定的类别（如性别）预先占好编号
+                self.categories[name] = {value: code for code, value in enumerate(spec[1])} if isinstance(spec, tuple) else {}
+            elif kind == 'str':
+                self.columns[name] = []
+            else:
+                self.columns[name] = array(_TYPECODES[kind])
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    # 追加一行，字段顺序与schema一致（thread_to_record的返回值）
+    def append(self, row):
+        for (name, column), value in zip(self.columns.items(), row):
+            codes = self.categories.get(name)
+            if codes is not None:
+                if value is None:
+                    value = -1
+                else:
+                    value = codes.setdefault(value, len(codes))
+            column.append(value)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    # 逐行取回（category列还原成原来的取值）
+    def __iter__(self):
+        decoded = []
+        for name, column in self.columns.items():
+            codes = self.categories.get(name)
+            if codes is None:
+                decoded.append(column)
+            else:
+                values = list(codes)
+                decoded.append([values[code] if code >= 0 else None for code in column])
+        return zip(*decoded)
+
+    def __eq__(self, other):
+        if not isinstance(other, RecordBuffer):
+            return NotImplemented
+        return self.schema == other.schema and list(self) == list(other)
+
+    # 转成紧凑类型的DataFrame（数值列和category编号直接从array的内存构造，不逐个转换Python对象）
+    def to_frame(self):
+        data = {}
+        for name, spec in self.schema.items():
+            kind = _kind(spec)
+            column = self.columns[name]
+            if kind == 'category':
+                codes = np.frombuffer(column, dtype=np.int32) if len(column) else np.empty(0, dtype=np.int32)
+                data[name] = pd.Categorical.from_codes(codes, categories=list(self.categories[name]))
+            elif kind == 'str':
+                data[name] = pd.Series(column, dtype=str) if column else pd.Series([], dtype=str)
+            else:
+                dtype = 'int64' if kind == 'epoch' else kind
+                values = np.frombuffer(column, dtype=column.typecode) if len(column) else np.empty(0, dtype=dtype)
+                data[name] = values.astype(dtype)
+        return pd.DataFrame(data)
+
+
+# ====================== 与原来CSV格式之间的转换 ======================
+# 每个时间点所在时区的UTC偏移（秒）：夏令时切换都发生在整15分钟上，每15分钟只查一次
+def _utc_offsets(seconds):
+    buckets = seconds // 900
+    unique, inverse = np.unique(buckets, return_inverse=True)
+    offsets = np.fromiter((time.localtime(int(bucket) * 900).tm_gmtoff for bucket in unique),
+                          dtype=np.int64, count=len(unique))
+    return offsets[inverse]
+
+
+# 时间戳 -> 本地时间字符串（与datetime.fromtimestamp(t).strftime(TIME_FORMAT)相同，整列一起转换），空值仍为空
+def format_local_times(epoch):
+    epoch = pd.Series(epoch)
+    valid = epoch.notna().to_numpy()
+    seconds = epoch[valid].to_numpy(dtype=np.int64)
+    local = pd.Series((seconds + _utc_offsets(seconds)).astype('datetime64[s]'))
+    result = np.full(len(epoch), np.nan, dtype=object)
+    result[valid] = local.dt.strftime(TIME_FORMAT).to_numpy(dtype=object)
+    return result
+
+
+# 本地时间字符串 -> 时间戳；有解析不了的值时用可空整数类型，这些值为空
+def parse_local_times(strings):
+    local = pd.to_datetime(pd.Series(strings), format=TIME_FORMAT, errors='coerce')
+    valid = local.notna().to_numpy()
+    seconds = local.to_numpy(dtype='datetime64[s]')[valid].astype(np.int64)
+    # 先按本地时间当作UTC估一个偏移，再用估出来的时刻查一次（跨夏令时切换时才会不同）
+    epoch = seconds - _utc_offsets(seconds - _utc_offsets(seconds))
+    if valid.all():
+        return epoch
+    result = pd.array(np.zeros(len(valid), dtype=np.int64), dtype='Int64')
+    result[valid] = epoch
+    result[~valid] = pd.NA
+    return result
+
+
+# 原来的DataFrame（时间为字符串、计数为int64/object）-> 紧凑类型；不在schema里的列原样保留
+def compact_frame(df, schema=THREAD_SCHEMA):
+    df = df.copy()
+    for name, spec in schema.items():
+        if name not in df.columns:
+            continue
+        kind = _kind(spec)
+        if kind == 'category':
+            categories = spec[1] if isinstance(spec, tuple) else None
+            df[name] = pd.Categorical(df[name], categories=categories)
+        elif kind == 'epoch':
+            if not pd.api.types.is_integer_dtype(df[name]):
+                df[name] = parse_local_times(df[name])
+        elif kind == 'bool':
+            df[name] = df[name].fillna(False).astype(str).isin(['True', 'true', '1'])
+        elif kind != 'str':
+            df[name] = pd.to_numeric(df[name], errors='coerce').fillna(0).astype(kind)
+    return df
+
+
+# 紧凑类型 -> 原来的CSV格式（时间列转回字符串），写出的CSV与改动前逐字节相同
+def csv_frame(df, schema=THREAD_SCHEMA):
+    df = df.copy()
+    for name, spec in schema.items():
+        if name in df.columns and _kind(spec) == 'epoch' and pd.api.types.is_integer_dtype(df[name]):
+            df[name] = format_local_times(df[name])
+    return df
+
+
+# Parquet数据集的列类型：每个分片都转成同一套类型（category的编号宽度固定），多个分片才能一起读
+# 固定类别的整数列（性别）在Parquet里存成int8：读回时pyarrow只会把字符串字典还原成category
+def arrow_schema(schema=THREAD_SCHEMA):
+    fields = []
+    for name, spec in schema.items():
+        kind = _kind(spec)
+        if kind == 'category':
+            value_type = pa.int8() if isinstance(spec, tuple) else pa.dictionary(pa.int32(), pa.string())
+            fields.append(pa.field(name, value_type))
+        elif kind == 'str':
+            fields.append(pa.field(name, pa.string()))
+        elif kind == 'bool':
+            fields.append(pa.field(name, pa.bool_()))
+        elif kind == 'epoch':
+            fields.append(pa.field(name, pa.int64()))
+        else:
+            fields.append(pa.field(name, pa.from_numpy_dtype(np.dtype(kind))))
+    return pa.schema(fields)
+
+
+def to_arrow(df, schema=THREAD_SCHEMA):
+    df = df.assign(**{name: df[name].astype('int8') for name, spec in schema.items()
+                      if isinstance(spec, tuple) and name in df.columns})
+    return pa.Table.from_pandas(df, schema=arrow_schema(schema), preserve_index=False)
+
+
+# 写Parquet的参数：时间戳、tid、浏览量这类大整数用差分编码（相邻帖子的值接近，比字典编码+zstd小得多）
+def parquet_options(schema=THREAD_SCHEMA):
+    delta = [name for name, spec in schema.items() if spec in ('epoch', 'int64')]
+    return {'use_dictionary': [name for name in schema if name not in delta],
+            'column_encoding': {name: 'DELTA_BINARY_PACKED' for name in delta}}
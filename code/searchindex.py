@@ -0,0 +1,442 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import jieba
+import keywords
+from corpus import DEFAULT_CSV, load_corpus, source_signature
+from instrument import traced
+from labelcache import label_texts
+from tokens import tokenize_texts
+
+# 帖子的倒排索引：jieba分出的词（带词在帖子里的位置，可以查连续短语），加上词典关键词（kw:零彩礼，
+# 与原来的 keyword in text 含义相同）、地区（region:江浙沪，帖子提到的所有地区）、彩礼形式（form:房产相关）。
+# 每个词的帖子列表按帖子序号差分后用变长字节编码压缩，热度、发帖时间、性别存成按帖子序号排列的数组，
+# 查询时只解码用到的几个词，全部是整数数组运算
+SEARCH_INDEX_VERSION = 1  # 索引格式或建索引的规则有变化时加1，旧索引会自动重建
+DEFAULT_SEARCH_DIR = './result/.cache/search'
+MAX_TERM_LEN = 32  # 更长的词（网址、乱码）不进索引
+NO_TIME = np.iinfo(np.int64).min  # 没有发帖时间（与datetime64的NaT相同）
+FIELDS = ('kw', 'region', 'form')
+GENDERS = {'未知': 0, '男性': 1, '女性': 2, '男': 1, '女': 2}
+
+# 所有词典里的关键词，统一转小写（地域、态度的匹配本来就不分大小写）
+dictionary_words = {word.lower(): None for groups in (keywords.betrothal_forms, keywords.region_keywords,
+                                                       keywords.region_amount_keywords, keywords.attitude_keywords)
+                    for words in groups.values() for word in words}
+keyword_matcher = keywords.KeywordMatcher({'kw': list(dictionary_words)}, lower=True)
+
+
+# ====================== 变长字节编码 ======================
+# 每个数占1~10个字节，每字节存7位，最后一个字节的最高位为1；编码和解码都是整列的numpy运算
+# 返回(字节数组, 每个数的起始字节位置)
+def encode_varint(values):
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        more = values >= np.uint64(1 << (7 * k))
+        if not more.any():
+            break
+        sizes += more
+    starts = np.cumsum(sizes) - sizes
+    owner = np.repeat(np.arange(len(values)), sizes)
+    shift = (np.arange(len(owner)) - starts[owner]) * 7
+    out = ((values[owner] >> shift.astype(np.uint64)) & np.uint64(0x7f)).astype(np.uint8)
+    out[starts + sizes - 1] |= 0x80
+    return out, starts
+
+
+def decode_varint(data):
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data & 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    owner = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shift = ((np.arange(len(data)) - starts[owner]) * 7).astype(np.uint64)
+    # 各字节的7位互不重叠，相加就是拼起来
+    return np.add.reduceat((data & 0x7f).astype(np.uint64) << shift, starts)
+
+
+# 编码若干段有序的数：每段内部差分（第一个数原样），返回(字节数组, 每段的起始字节位置, 末尾加上总字节数)
+def encode_runs(values, run_starts):
+    values = np.asarray(values, dtype=np.int64)
+    deltas = np.diff(values, prepend=0)
+    deltas[run_starts] = values[run_starts]
+    data, starts = encode_varint(deltas)
+    return data, np.append(starts[run_starts], len(data))
+
+
+# ====================== 建索引 ======================
+def index_dir_for(csv_path, search_dir=DEFAULT_SEARCH_DIR):
+    return os.path.join(search_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+# 索引的指纹：源文件、索引版本、jieba版本和所有词典的内容，任一变化都会重建
+def index_signature(csv_path):
+    dictionaries = json.dumps([keywords.betrothal_forms, keywords.region_keywords, keywords.region_amount_keywords,
+                               keywords.attitude_keywords], ensure_ascii=False)
+    return {**source_signature(csv_path), 'index_version': SEARCH_INDEX_VERSION, 'jieba': jieba.__version__,
+            'dictionaries': hashlib.blake2b(dictionaries.encode('utf-8'), digest_size=8).hexdigest()}
+
+
+# 每篇帖子的词条：(词, 位置)；jieba的词转小写，空白不进索引但占位置（短语不会跨过空格），
+# 关键词/地区/彩礼形式都记在位置0
+def _doc_terms(tokens, text, forms):
+    terms = [(token.lower(), pos) for pos, token in enumerate(tokens)
+             if len(token) <= MAX_TERM_LEN and not token.isspace()]
+    lower = text.lower()
+    terms += [(f'kw:{word}', 0) for word in keyword_matcher.matched_keywords(lower)]
+    terms += [(f'region:{region}', 0) for region in keywords.region_matcher.matched_groups(lower)]
+    terms += [(f'form:{form}', 0) for form in forms if form != '未提及具体形式']
+    return terms
+
+
+@traced()
+def build_index(csv_path=DEFAULT_CSV, search_dir=DEFAULT_SEARCH_DIR, workers=None):
+    df = load_corpus(csv_path)
+    texts = df['分析文本'].tolist()
+    token_lists = tokenize_texts(texts, workers=workers)  # 走分词缓存
+    form_lists = label_texts('forms', texts)              # 走标签缓存
+
+    # 所有词条按(词编号, 帖子, 位置)展开成三列整数
+    vocab = {}
+    term_ids, docs, positions = [], [], []
+    for doc, (tokens, text, forms) in enumerate(zip(token_lists, texts, form_lists)):
+        terms = _doc_terms(tokens, text, forms)
+        term_ids += [vocab.setdefault(term, len(vocab)) for term, _ in terms]
+        docs += [doc] * len(terms)
+        positions += [pos for _, pos in terms]
+    terms = np.array(list(vocab), dtype=f'<U{max(map(len, vocab), default=1)}')
+    rank = np.argsort(terms, kind='stable')
+    remap = np.empty(len(rank), dtype=np.int64)
+    remap[rank] = np.arange(len(rank))
+    term_ids = remap[np.array(term_ids, dtype=np.int64)]
+    docs = np.array(docs, dtype=np.int64)
+    positions = np.array(positions, dtype=np.int64)
+    # 生成时已按(帖子, 位置)有序，按词稳定排序后就是(词, 帖子, 位置)的顺序
+    order = np.argsort(term_ids, kind='stable')
+    term_ids, docs, positions = term_ids[order], docs[order], positions[order]
+
+    # 每个(词, 帖子)一条记录：帖子序号、出现次数；位置按记录分段差分
+    new_pair = np.ones(len(docs), dtype=bool)
+    new_pair[1:] = (term_ids[1:] != term_ids[:-1]) | (docs[1:] != docs[:-1])
+    pair_starts = np.flatnonzero(new_pair)
+    pair_terms = term_ids[pair_starts]
+    freqs = np.diff(np.append(pair_starts, len(docs)))
+    term_starts = np.flatnonzero(np.diff(pair_terms, prepend=-1))
+    doc_data, doc_offsets = encode_runs(docs[pair_starts], term_starts)
+    freq_data, freq_offsets = encode_varint(freqs)
+    freq_offsets = np.append(freq_offsets[term_starts], len(freq_data))
+    pos_data, pos_offsets = encode_runs(positions, pair_starts)
+    # 位置按词分段：每个词第一条记录的位置数据起点
+    pos_offsets = np.append(pos_offsets[:-1][term_starts], len(pos_data))
+
+    path = index_dir_for(csv_path, search_dir)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    arrays = {
+        'terms': terms[rank],
+        'df': np.diff(np.append(term_starts, len(pair_terms))).astype(np.int32),
+        'doc_offsets': doc_offsets, 'freq_offsets': freq_offsets, 'pos_offsets': pos_offsets,
+        'docs': doc_data, 'freqs': freq_data, 'positions': pos_data,
+        'heat': df['热度'].to_numpy(dtype=np.int64),
+        'time': df['create_dt'].to_numpy(dtype='datetime64[s]').astype(np.int64),  # 秒，NaT即NO_TIME
+        'gender': df['gender'].to_numpy(dtype=np.int8),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'signature': index_signature(csv_path), 'docs': len(df), 'postings': len(pair_terms)}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ====================== 查询 ======================
+# 查询语法：空格分隔的条件都要满足；OR 表示或；前面加 - 表示不含；括号分组；"双引号"里是连续短语；
+# region:江浙沪 / form:房产相关 / kw:零彩礼 指定字段。普通的词是词典关键词时按原文子串匹配，
+# 否则查分词后的词：索引里有这个词就直接查，没有就用jieba切开按连续短语查
+token_re = re.compile(r'\s*(?:(\()|(\))|(-)?"([^"]*)"|(-)?([^\s()"]+))')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class SearchIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        # 全部内存映射，只有查询用到的部分会被读入
+        for name in ('terms', 'df', 'doc_offsets', 'freq_offsets', 'pos_offsets', 'docs', 'freqs', 'positions',
+                     'heat', 'time', 'gender'):
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        self.n_docs = self.meta['docs']
+
+    def _term_index(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    # 一个词的帖子序号（有序）
+    def postings(self, term):
+        i = self._term_index(term)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return np.cumsum(decode_varint(self.docs[self.doc_offsets[i]:self.doc_offsets[i + 1]])).astype(np.int64)
+
+    # 一个词的(帖子, 位置)对
+    def occurrences(self, term):
+        i = self._term_index(term)
+        if i is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        docs = self.postings(term)
+        freqs = decode_varint(self.freqs[self.freq_offsets[i]:self.freq_offsets[i + 1]]).astype(np.int64)
+        deltas = decode_varint(self.positions[self.pos_offsets[i]:self.pos_offsets[i + 1]]).astype(np.int64)
+        # 位置在每个帖子内差分，按帖子分段累加还原
+        starts = np.cumsum(freqs) - freqs
+        totals = np.cumsum(deltas)
+        positions = totals - np.repeat(totals[starts] - deltas[starts], freqs)
+        return np.repeat(docs, freqs), positions
+
+    # 连续短语：第i个词的位置减i后，所有词都出现在同一个(帖子, 位置)上
+    def phrase(self, terms):
+        if len(terms) == 1:
+            return self.postings(terms[0])
+        keys = None
+        for offset, term in enumerate(terms):
+            docs, positions = self.occurrences(term)
+            key = docs * (1 << 32) + (positions - offset)
+            keys = key if keys is None else np.intersect1d(keys, key, assume_unique=True)
+            if not len(keys):
+                break
+        return np.unique(keys >> 32)
+
+    # 一个查询词 -> 帖子序号
+    def _word(self, word, quoted=False):
+        field, sep, value = word.partition(':')
+        if sep and field in FIELDS:
+            return self.postings(f'{field}:{value.lower()}')
+        if not quoted and word.lower() in dictionary_words:
+            return self.postings(f'kw:{word.lower()}')
+        # 本身就是索引里的词时直接查，只有没见过的词才用jieba切开（第一次要加载jieba词典，约1秒）
+        tokens = []
+        for part in word.lower().split():
+            if self._term_index(part) is not None:
+                tokens.append(part)
+            else:
+                tokens += [token for token in tokenize_texts([part], cache=None, workers=1)[0] if not token.isspace()]
+        if not tokens:
+            raise QueryError(f"查询词为空：{word!r}")
+        return self.phrase(tokens)
+
+    def _parse(self, query):
+        items, pos = [], 0
+        while pos < len(query):
+            m = token_re.match(query, pos)
+            if not m or m.end() == pos:
+                if query[pos:].strip():
+                    raise QueryError(f"无法解析：{query[pos:]}")
+                break
+            pos = m.end()
+            open_, close, neg_quote, quoted, neg_word, word = m.groups()
+            if open_ or close:
+                items.append(open_ or close)
+            elif quoted is not None:
+                items.append(('-' if neg_quote else '+', quoted, True))
+            elif word == 'OR':
+                items.append('OR')
+            else:
+                items.append(('-' if neg_word else '+', word, False))
+        return items
+
+    # 递归下降：表达式 = 与项 (OR 与项)*；与项 = 因子+（相邻即"与"，带-的因子从结果里去掉）
+    def _evaluate(self, items, i=0):
+        result, i = self._and_group(items, i)
+        while i < len(items) and items[i] == 'OR':
+            other, i = self._and_group(items, i + 1)
+            result = np.union1d(result, other)
+        return result, i
+
+    def _and_group(self, items, i):
+        include, exclude = [], []
+        while i < len(items) and items[i] not in ('OR', ')'):
+            if items[i] == '(':
+                docs, i = self._evaluate(items, i + 1)
+                if i >= len(items) or items[i] != ')':
+                    raise QueryError("括号不匹配")
+                include.append(docs)
+                i += 1
+                continue
+            sign, word, quoted = items[i]
+            (exclude if sign == '-' else include).append(self._word(word, quoted))
+            i += 1
+        if not include and not exclude:
+            raise QueryError("缺少查询词")
+        # 从最短的列表开始求交集
+        include.sort(key=len)
+        result = include[0] if include else np.arange(self.n_docs, dtype=np.int64)
+        for docs in include[1:]:
+            result = np.intersect1d(result, docs, assume_unique=True)
+        for docs in exclude:
+            result = np.setdiff1d(result, docs, assume_unique=True)
+        return result, i
+
+    # 查询并按条件过滤，返回前k个帖子（sort='heat'按热度降序，'time'按发帖时间降序，None按语料顺序；
+    # 并列时按语料顺序，与top_k_sorted的stable排序一致）。gender：0/1/2或'男性'等；start/end：'YYYY-MM-DD'，含两端
+    # 过滤后的命中总数在结果的attrs['total']里
+    @traced()
+    def search(self, query, k=20, sort='heat', gender=None, start=None, end=None, min_heat=None):
+        items = self._parse(query)
+        docs, i = self._evaluate(items)
+        if i != len(items):
+            raise QueryError("括号不匹配")
+
+        mask = np.ones(len(docs), dtype=bool)
+        if gender is not None:
+            mask &= self.gender[docs] == (GENDERS[gender] if gender in GENDERS else int(gender))
+        if min_heat is not None:
+            mask &= self.heat[docs] >= min_heat
+        if start or end:
+            times = self.time[docs]
+            mask &= times != NO_TIME
+            if start:
+                mask &= times >= pd.Timestamp(start).value // 10 ** 9
+            if end:
+                mask &= times < (pd.Timestamp(end) + pd.Timedelta(days=1)).value // 10 ** 9
+        docs = docs[mask]
+        total = len(docs)
+
+        if sort in ('heat', 'time'):
+            values = np.asarray(getattr(self, sort)[docs])
+            if k is not None and 0 < k < len(docs):
+                # 只对可能进前k的帖子排序：值不低于第k大的值
+                kth = np.partition(values, len(values) - k)[len(values) - k]
+                keep = values >= kth
+                docs, values = docs[keep], values[keep]
+            docs = docs[np.lexsort((docs, -values))]
+        if k is not None:
+            docs = docs[:max(k, 0)]
+        result = pd.DataFrame({'doc': docs, '热度': np.asarray(self.heat[docs]),
+                               'create_time': np.asarray(self.time[docs]).astype('datetime64[s]'),
+                               'gender': np.asarray(self.gender[docs])})
+        result.attrs['total'] = total
+        return result
+
+
+# 打开语料的索引；源文件或词典变了（或还没有索引）时先重建
+def open_index(csv_path=DEFAULT_CSV, search_dir=DEFAULT_SEARCH_DIR, rebuild=False, workers=None):
+    path = index_dir_for(csv_path, search_dir)
+    meta_path = os.path.join(path, 'meta.json')
+    stale = True
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            stale = json.load(f)['signature'] != index_signature(csv_path)
+    if stale:
+        build_index(csv_path, search_dir, workers=workers)
+    return SearchIndex(path)
+
+
+# 查询结果对应的语料行（标题、正文等），按结果的顺序
+def result_rows(result, csv_path=DEFAULT_CSV):
+    df = load_corpus(csv_path)
+    return df.iloc[result['doc'].to_numpy()].reset_index(drop=True)
+
+
+# ====================== 测速 ======================
+# 在语料上比较"整表扫描"与"查索引"：词典关键词和地区的查询结果应与逐行 in 完全相同，
+# 短语的结果是原文子串匹配结果的子集（分词边界不同的不算）
+def benchmark(csv_path, search_dir=DEFAULT_SEARCH_DIR, repeat=20):
+    start = time.perf_counter()
+    index = open_index(csv_path, search_dir, rebuild=True)
+    size = sum(os.path.getsize(os.path.join(index.path, name)) for name in os.listdir(index.path))
+    print(f"建索引：{time.perf_counter() - start:.2f}s，{index.n_docs}篇，{len(index.terms)}个词条，"
+          f"{index.meta['postings']}条帖子记录，索引共{size / 1024 / 1024:.1f}MB")
+
+    df = load_corpus(csv_path)
+    lower = df['分析文本'].str.lower()
+
+    def contains_any(words):
+        mask = np.zeros(len(df), dtype=bool)
+        for word in words:
+            mask |= lower.str.contains(word.lower(), regex=False).to_numpy()
+        return mask
+
+    cases = [
+        ('房产证 region:江浙沪', lambda: contains_any(['房产证']) & contains_any(keywords.region_keywords['江浙沪']), True),
+        ('零彩礼', lambda: contains_any(['零彩礼']), True),
+        ('(彩礼太高 OR 取消彩礼) -region:北京',
+         lambda: (contains_any(['彩礼太高']) | contains_any(['取消彩礼'])) & ~contains_any(keywords.region_keywords['北京']),
+         True),
+        ('"结婚 彩礼"', lambda: contains_any(['结婚彩礼']), False),
+    ]
+    for query, scan, exact in cases:
+        t0 = time.perf_counter()
+        expected = np.flatnonzero(scan())
+        expected_top = df.iloc[expected].sort_values('热度', ascending=False, kind='stable').head(10).index.to_numpy()
+        scan_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            result = index.search(query, k=10)
+            docs = index.search(query, k=None, sort=None)['doc'].to_numpy()
+        query_time = (time.perf_counter() - t0) / repeat / 2
+        if exact:
+            assert np.array_equal(docs, expected), f"{query}：索引结果与整表扫描不一致"
+            assert np.array_equal(result['doc'].to_numpy(), expected_top), f"{query}：热度前10与整表扫描不一致"
+        else:
+            assert np.isin(docs, expected).all(), f"{query}：短语结果不是子串匹配结果的子集"
+        print(f"{query:<28}命中{len(docs):>8}篇（扫描{len(expected)}篇）  整表扫描{scan_time * 1000:8.1f}ms  "
+              f"查索引{query_time * 1000:7.2f}ms  加速{scan_time / query_time:7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='帖子倒排索引：布尔/短语查询，按性别、时间、热度过滤，取热度前K')
+    # 以NOT开头的查询（-region:北京 彩礼）会被当成选项，用 --query 传或放在 -- 之后
+    parser.add_argument('query', nargs='?', default=None,
+                        help='查询，如 房产证 region:江浙沪、"结婚 彩礼" -region:北京、零彩礼 OR 取消彩礼；'
+                             '以-开头的查询写成 -- "-region:北京 彩礼" 或 --query="-region:北京 彩礼"')
+    parser.add_argument('-q', '--query', dest='query_option', default=None, help='查询（可以以-开头）')
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='语料CSV')
+    parser.add_argument('--dir', default=DEFAULT_SEARCH_DIR, help='索引目录')
+    parser.add_argument('--k', type=int, default=20, help='显示前K个帖子')
+    parser.add_argument('--sort', choices=['heat', 'time', 'none'], default='heat', help='排序：热度/发帖时间/语料顺序')
+    parser.add_argument('--gender', default=None, help='性别：男性/女性/未知')
+    parser.add_argument('--start', default=None, help='起始日期 YYYY-MM-DD')
+    parser.add_argument('--end', default=None, help='结束日期 YYYY-MM-DD（含）')
+    parser.add_argument('--min-heat', type=int, default=None, help='最低热度')
+    parser.add_argument('--rebuild', action='store_true', help='重建索引')
+    parser.add_argument('--bench', action='store_true', help='与整表扫描比较耗时并核对结果')
+    args = parser.parse_args()
+    if args.query_option is not None:
+        if args.query is not None:
+            parser.error('查询只能给一次：位置参数和 --query 二选一')
+        args.query = args.query_option
+
+    if args.bench:
+        benchmark(args.csv, args.dir)
+    else:
+        start = time.perf_counter()
+        index = open_index(args.csv, args.dir, rebuild=args.rebuild)
+        print(f"打开索引：{(time.perf_counter() - start) * 1000:.0f}ms（{index.n_docs}篇）")
+        if args.query:
+            start = time.perf_counter()
+            try:
+                result = index.search(args.query, k=args.k, sort=None if args.sort == 'none' else args.sort,
+                                      gender=args.gender, start=args.start, end=args.end, min_heat=args.min_heat)
+            except QueryError as e:
+                parser.error(f"查询有误：{e}")
+            elapsed = time.perf_counter() - start
+            print(f"命中{result.attrs['total']}篇，查询用时{elapsed * 1000:.1f}ms")
+            rows = result_rows(result, args.csv)
+            for i, (row, hit) in enumerate(zip(rows.itertuples(), result.itertuples()), 1):
+                time_text = '' if pd.isna(hit.create_time) else f'{hit.create_time:%Y-%m-%d %H:%M}'
+                print(f"{i:>3}. [热度{hit.热度}] {time_text} {row.gender_mapped} {row.title[:40]}")
@@ -0,0 +1,135 @@
+import glob
+import os
+import pandas as pd
+from schema import RecordBuffer, arrow_schema, compact_frame, csv_frame, parquet_options, to_arrow
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 没有安装pyarrow时只写CSV
+    pa = None
+    pq = None
+
+
+# Parquet数据集目录：每次落盘写一个分片文件，程序中途退出也不会损坏已写入的部分
+def parquet_dir(csv_path):
+    return os.path.splitext(csv_path)[0] + '_parquet'
+
+
+def read_parquet_dataset(path):
+    return pd.read_parquet(path)
+
+
+# 给出schema时按紧凑类型写（见schema.py），否则按DataFrame原来的类型写
+def _write_table(df, path, schema=None):
+    if schema:
+        pq.write_table(to_arrow(df, schema), path, compression='zstd', **parquet_options(schema))
+    else:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, compression='zstd')
+
+
+# 用一个完整的DataFrame重写Parquet数据集（增量合并有旧帖更新时使用）；给出schema时按紧凑类型存
+def rewrite_parquet_dataset(df, path, schema=None):
+    if pq is None:
+        return
+    os.makedirs(path, exist_ok=True)
+    tmp_file = os.path.join(path, 'part-merged.parquet.tmp')
+    if schema:
+        df = compact_frame(df, schema)
+    _write_table(df, tmp_file, schema)
+    for old_file in glob.glob(os.path.join(path, 'part-*.parquet')):
+        os.remove(old_file)
+    os.replace(tmp_file, os.path.join(path, 'part-00000.parquet'))
+
+
+# 把旧格式（时间为字符串等）的分片转成当前的紧凑类型，续写时所有分片的类型才一致
+def upgrade_parquet_parts(paths, schema):
+    target = arrow_schema(schema)
+    for part_file in paths:
+        if pq.read_schema(part_file).remove_metadata().equals(target):
+            continue
+        _write_table(compact_frame(pq.read_table(part_file).to_pandas(), schema), part_file + '.tmp', schema)
+        os.replace(part_file + '.tmp', part_file)
+
+
+# 分批写出爬取结果：内存里最多只保留batch_size行，每批同时追加到CSV和Parquet
+# 给出schema（如schema.THREAD_SCHEMA）时，行按列存进RecordBuffer，Parquet按紧凑类型写，CSV仍是原来的格式
+class ThreadWriter:
+    def __init__(self, csv_path, columns, batch_size=1000, parquet=True, append=False, on_flush=None, schema=None):
+        self.csv_path = csv_path
+        self.columns = columns
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.schema = schema
+        self.buffer = self._new_buffer()
+        self.buffer_page = 0
+        self.flushed_page = 0
+        self.rows_written = 0
+        # 续爬时追加到已有文件，否则覆盖
+        self.header_written = append and os.path.exists(csv_path)
+        if not self.header_written and os.path.exists(csv_path):
+            os.remove(csv_path)
+
+        self.parquet_path = parquet_dir(csv_path) if parquet and pq is not None else None
+        self.part = 0
+        if self.parquet_path:
+            os.makedirs(self.parquet_path, exist_ok=True)
+            old_parts = sorted(glob.glob(os.path.join(self.parquet_path, 'part-*.parquet')))
+            if append:
+                self.part = len(old_parts)
+                if schema:
+                    upgrade_parquet_parts(old_parts, schema)
+            else:
+                for old_file in old_parts:
+                    os.remove(old_file)
+
+    def _new_buffer(self):
+        return RecordBuffer(self.schema) if self.schema else []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # 写入一页的数据，攒够batch_size行就落盘
+    def write_page(self, pn, rows):
+        self.buffer.extend(rows)
+        self.buffer_page = pn
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        self.write_page(self.buffer_page, rows)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.schema:
+            table = self.buffer.to_frame()
+            df = csv_frame(table, self.schema)
+        else:
+            table = df = pd.DataFrame(self.buffer, columns=self.columns)
+        if self.header_written:
+            df.to_csv(self.csv_path, mode='a', header=False, lineterminator="\r\n", index=False, encoding='utf-8')
+        else:
+            df.to_csv(self.csv_path, lineterminator="\r\n", index=False, encoding='utf-8-sig')
+            self.header_written = True
+        if self.parquet_path:
+            part_file = os.path.join(self.parquet_path, f'part-{self.part:05d}.parquet')
+            _write_table(table, part_file, self.schema)
+            self.part += 1
+
+        self.rows_written += len(self.buffer)
+        self.buffer = self._new_buffer()
+        self.flushed_page = self.buffer_page
+        if self.on_flush:
+            self.on_flush(self.flushed_page)
+
+    def close(self):
+        self.flush()
+        # 一行都没有时也写出只有表头的CSV
+        if not self.header_written:
+            pd.DataFrame(columns=self.columns).to_csv(self.csv_path, index=False, encoding='utf-8-sig')
+            self.header_written = True
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from wordindex import POST_KEY_VERSION, post_keys
+from instrument import traced
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # 没有安装pyarrow时汇总表只保存在内存里
+    feather = None
+
+DEFAULT_ROLLUP_DIR = './result/.cache/timeroll'
+NO_TIME = np.iinfo('int64').min  # 发帖时间解析失败的帖子，只记下已处理过，不计入统计
+
+# 时间都存成从1970-01-01起的整数（秒/分钟/小时/天），查询时只做整数运算
+TABLES = {
+    'posts': {'forum': 'int16', 'post': 'int64', 'second': 'int64'},
+    'minutes': {'forum': 'int16', 'minute': 'int64', 'count': 'int64'},
+    'hours': {'forum': 'int16', 'hour': 'int64', 'count': 'int64'},
+    'days': {'forum': 'int16', 'day': 'int64', 'count': 'int64', 'first': 'int64', 'last': 'int64'},
+}
+# 查询粒度 -> 使用的汇总表；前三种返回时间点，其余返回周期内的位置
+GRANULARITIES = {
+    'minute': 'minutes', 'hour': 'hours', 'day': 'days', 'month': 'days',
+    'hour_of_day': 'hours', 'weekday': 'days', 'day_of_month': 'days', 'iso_week': 'days',
+}
+UNIT_SECONDS = {'minutes': 60, 'hours': 3600, 'days': 86400}
+
+
+def _empty(columns):
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
+
+
+def to_seconds(times):
+    times = pd.to_datetime(pd.Series(times), errors='coerce')
+    seconds = times.astype('datetime64[s]').astype('int64')
+    return seconds.where(times.notna(), NO_TIME).to_numpy()
+
+
+# 解析查询的起止时间，返回[起始秒, 结束秒)；只写日期的end包含当天，写到分钟的end包含那一分钟
+def time_range(start=None, end=None):
+    start_s = int(pd.Timestamp(start).timestamp()) if start else None
+    end_s = None
+    if end:
+        end_ts = pd.Timestamp(end)
+        step = pd.Timedelta(days=1) if len(str(end).strip()) <= 10 else pd.Timedelta(minutes=1)
+        end_s = int((end_ts + step).timestamp())
+    return start_s, end_s
+
+
+# 发帖时间汇总：每个吧按分钟/小时/天各存一份发帖量，新帖子到来时只把新帖子加进去
+class TimeRollup:
+    def __init__(self, rollup_dir=DEFAULT_ROLLUP_DIR):
+        self.path = rollup_dir
+        for name, columns in TABLES.items():
+            setattr(self, name, _empty(columns))
+        self.forum_names = []
+        self.signatures = {}
+        meta_path = os.path.join(rollup_dir, 'meta.json') if rollup_dir else None
+        if meta_path and feather is not None and os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 帖子编号的算法变了时旧汇总表不读，重新统计（否则同一帖子会以新编号再算一次）
+            if meta.get('post_keys') == POST_KEY_VERSION:
+                for name in TABLES:
+                    setattr(self, name, feather.read_feather(os.path.join(rollup_dir, f'{name}.feather')))
+                self.forum_names, self.signatures = meta['forums'], meta['signatures']
+
+    def _forum_id(self, forum):
+        if forum not in self.forum_names:
+            self.forum_names.append(forum)
+        return self.forum_names.index(forum)
+
+    # 把df里还没统计过的帖子加进汇总表，返回新帖子数；df有create_dt列时直接用，否则只解析新帖子的create_time
+    def update(self, df, forum):
+        fid = self._forum_id(forum)
+        keys = np.asarray(post_keys(df), dtype='int64')
+        seen = self.posts.loc[self.posts['forum'] == fid, 'post'].to_numpy()
+        new = ~np.isin(keys, seen)
+        new &= ~pd.Series(keys).duplicated(keep='first').to_numpy()
+        if not new.any():
+            return 0
+        times = df['create_dt'] if 'create_dt' in df.columns else df['create_time']
+        seconds = to_seconds(times[new].to_numpy())
+        self.posts = pd.concat([self.posts, pd.DataFrame({'forum': fid, 'post': keys[new], 'second': seconds})],
+                               ignore_index=True).astype(TABLES['posts'])
+
+        seconds = seconds[seconds != NO_TIME]
+        for name, unit in UNIT_SECONDS.items():
+            column = name[:-1]
+            buckets = pd.DataFrame({column: seconds // unit, 'second': seconds})
+            added = buckets.groupby(column).agg(count=('second', 'size'), first=('second', 'min'),
+                                                last=('second', 'max')).reset_index()
+            added['forum'] = fid
+            merged = pd.concat([getattr(self, name), added[list(TABLES[name])]], ignore_index=True)
+            aggregations = {'count': 'sum', 'first': 'min', 'last': 'max'}
+            merged = merged.groupby(['forum', column], as_index=False).agg(
+                {col: aggregations[col] for col in TABLES[name] if col in aggregations})
+            setattr(self, name, merged.astype(TABLES[name]))
+        return int(new.sum())
+
+    # 源文件没变（大小和修改时间相同）时直接跳过，不读文件
+    @traced()
+    def update_csv(self, csv_path, forum=None):
+        from corpus import load_corpus, source_signature
+        forum = forum or os.path.splitext(os.path.basename(csv_path))[0]
+        signature = source_signature(csv_path)
+        if self.signatures.get(forum) == signature:
+            return 0
+        added = self.update(load_corpus(csv_path), forum)
+        self.signatures[forum] = signature
+        return added
+
+    def save(self):
+        if not self.path or feather is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for name in TABLES:
+            path = os.path.join(self.path, f'{name}.feather')
+            getattr(self, name).reset_index(drop=True).to_feather(path + '.tmp')
+            os.replace(path + '.tmp', path)
+        # meta.json最后写，它存在才说明汇总表完整
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'forums': self.forum_names, 'signatures': self.signatures, 'post_keys': POST_KEY_VERSION},
+                      f, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    # 取出覆盖[start, end)的汇总行：起止时间落在整天/整点上时用粗粒度的表，否则用分钟表
+    def _rows(self, table, forums=None, start=None, end=None):
+        start_s, end_s = time_range(start, end)
+        tables = ['days', 'hours', 'minutes']
+        for name in tables[tables.index(table):]:
+            unit = UNIT_SECONDS[name]
+            if all(bound is None or bound % unit == 0 for bound in (start_s, end_s)):
+                break
+        rows = getattr(self, name)
+        if forums:
+            rows = rows[rows['forum'].isin([self.forum_names.index(f) for f in forums if f in self.forum_names])]
+        bucket = rows[name[:-1]]
+        if start_s is not None:
+            rows = rows[bucket >= start_s // unit]
+            bucket = rows[name[:-1]]
+        if end_s is not None:
+            rows = rows[bucket < end_s // unit]
+        return rows, name
+
+    # 按粒度统计发帖量，返回以时间点（minute/hour/day/month）或周期位置（其余）为索引的Series
+    def counts(self, by='day', forums=None, start=None, end=None):
+        rows, name = self._rows(GRANULARITIES[by], forums, start, end)
+        stamps = pd.to_datetime(rows[name[:-1]].to_numpy() * UNIT_SECONDS[name], unit='s')
+        if by in ('minute', 'hour', 'day', 'month'):
+            key = stamps.floor({'minute': 'min', 'hour': 'h', 'day': 'D'}[by]) if by != 'month' \
+                else stamps.to_period('M').to_timestamp()
+        elif by == 'hour_of_day':
+            key = stamps.hour
+        elif by == 'weekday':
+            key = stamps.weekday
+        elif by == 'day_of_month':
+            key = stamps.day
+        else:
+            key = stamps.isocalendar().week.to_numpy()
+        counts = pd.Series(rows['count'].to_numpy(), index=key).groupby(level=0).sum()
+        return counts.rename_axis(by).astype('int64')
+
+    # 区间内的总发帖量、第一条和最后一条帖子的时间
+    def span(self, forums=None, start=None, end=None):
+        rows, name = self._rows('days', forums, start, end)
+        if rows.empty:
+            return 0, None, None
+        if name == 'days':
+            first, last = rows['first'].min(), rows['last'].max()
+        else:  # 分钟表只精确到分钟
+            first, last = rows[name[:-1]].min() * UNIT_SECONDS[name], rows[name[:-1]].max() * UNIT_SECONDS[name]
+        return int(rows['count'].sum()), pd.Timestamp(first, unit='s'), pd.Timestamp(last, unit='s')
+
+
+# 原来的做法：每次都解析全部时间字符串再筛选、分组
+def counts_from_strings(create_time, by, start, end):
+    times = pd.to_datetime(create_time, errors='coerce')
+    start_s, end_s = time_range(start, end)
+    times = times[(times >= pd.Timestamp(start_s, unit='s')) & (times < pd.Timestamp(end_s, unit='s'))]
+    key = {'day': times.dt.floor('D'), 'hour_of_day': times.dt.hour, 'weekday': times.dt.weekday,
+           'iso_week': times.dt.isocalendar().week}[by]
+    return times.groupby(key.to_numpy()).size().rename_axis(by).astype('int64')
+
+
+# 一年的多吧合成数据：比较每次重新解析与查询汇总表的耗时，并核对结果一致
+def benchmark(forums=5, posts=200000, seed=42):
+    import tempfile
+    rng = np.random.default_rng(seed)
+    year_start = pd.Timestamp('2025-01-01').timestamp()
+    frames = {}
+    for i in range(forums):
+        seconds = (year_start + rng.integers(0, 365 * 86400, posts)).astype('int64')
+        frames[f'吧{i}'] = pd.DataFrame({
+            'tid': np.arange(i * posts, (i + 1) * posts),
+            'create_time': pd.to_datetime(seconds, unit='s').strftime('%Y-%m-%d %H:%M:%S'),
+        })
+    print(f"合成数据：{forums}个吧 x {posts}帖，时间分布在2025年全年")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rollup = TimeRollup(tmp_dir)
+        start = time.perf_counter()
+        for forum, df in frames.items():
+            rollup.update(df.iloc[:posts // 2], forum)
+        for forum, df in frames.items():
+            rollup.update(df, forum)
+        rollup.save()
+        print(f"分两批增量建汇总表：{time.perf_counter() - start:.2f}s，"
+              f"分钟表{len(rollup.minutes)}行，小时表{len(rollup.hours)}行，天表{len(rollup.days)}行")
+        rollup = TimeRollup(tmp_dir)
+
+        all_times = pd.concat([df['create_time'] for df in frames.values()], ignore_index=True)
+        for by, start_day, end_day in (('day', '2025-11-01', '2025-11-30'), ('hour_of_day', '2025-01-01', '2025-12-31'),
+                                       ('weekday', '2025-03-01', '2025-08-31'), ('iso_week', '2025-11-01', '2025-11-30')):
+            start = time.perf_counter()
+            expected = counts_from_strings(all_times, by, start_day, end_day)
+            parse_time = time.perf_counter() - start
+            start = time.perf_counter()
+            result = rollup.counts(by, start=start_day, end=end_day)
+            query_time = time.perf_counter() - start
+            pd.testing.assert_series_equal(result, expected, check_index_type=False, check_names=False)
+            print(f"{by:<12}{start_day}~{end_day}  重新解析{parse_time * 1000:8.1f}ms  "
+                  f"查汇总表{query_time * 1000:6.1f}ms（结果一致）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='发帖时间汇总表：增量更新，按任意区间和粒度查询发帖量')
+    parser.add_argument('--add', nargs='+', metavar='CSV', default=[], help='把这些帖子CSV加入汇总表（吧名取文件名）')
+    parser.add_argument('--by', choices=list(GRANULARITIES), default='day', help='统计粒度')
+    parser.add_argument('--forum', nargs='+', default=None, help='只统计这些吧（默认全部）')
+    parser.add_argument('--start', default=None, help='起始时间，如 2025-11-01')
+    parser.add_argument('--end', default=None, help='结束时间（含），如 2025-11-30')
+    parser.add_argument('--bench', action='store_true', help='用一年的多吧合成数据测速')
+    parser.add_argument('--forums', type=int, default=5, help='测速时的吧数')
+    parser.add_argument('--posts', type=int, default=200000, help='测速时每个吧的帖子数')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(forums=args.forums, posts=args.posts)
+    else:
+        rollup = TimeRollup()
+        for path in args.add:
+            print(f"{path}：新增{rollup.update_csv(path)}个帖子")
+        rollup.save()
+        start = time.perf_counter()
+        result = rollup.counts(args.by, forums=args.forum, start=args.start, end=args.end)
+        print(f"查询用时{(time.perf_counter() - start) * 1000:.1f}ms")
+        print(result.to_string())
@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+import jieba
+from instrument import traced
+
+# 缓存格式版本：分词方式有变化时加1，旧缓存会自动作废
+TOKEN_CACHE_VERSION = 1
+DEFAULT_TOKEN_CACHE = './result/.cache/tokens.pkl'
+
+
+# 文本内容的指纹，作为分词缓存的键；内容不变的帖子不会重新分词
+def text_key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def _init_worker():
+    jieba.setLogLevel(60)
+    jieba.initialize()
+
+
+def _cut_batch(texts):
+    return [jieba.lcut(text) for text in texts]
+
+
+# 持久化的分词缓存：{文本指纹: 词列表}，各个词频脚本共用一份
+class TokenCache:
+    def __init__(self, path=DEFAULT_TOKEN_CACHE):
+        self.path = path
+        self.tokens = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == (TOKEN_CACHE_VERSION, jieba.__version__):
+                self.tokens = data['tokens']
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def update(self, keys, token_lists):
+        self.tokens.update(zip(keys, token_lists))
+        self.dirty = True
+
+    # 先写临时文件再替换，中途退出不会留下写了一半的缓存
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': (TOKEN_CACHE_VERSION, jieba.__version__), 'tokens': self.tokens}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+# 逐篇分词：缓存里没有的文本分批交给进程池，结果按输入顺序返回（每篇一个词列表）
+# workers=1时在当前进程里分词；cache=None时不读写缓存
+@traced()
+def tokenize_texts(texts, cache=DEFAULT_TOKEN_CACHE, workers=None, batch_size=200):
+    texts = ['' if text is None or text != text else str(text) for text in texts]
+    if isinstance(cache, str):
+        cache = TokenCache(cache)
+    keys = [text_key(text) for text in texts]
+    known = cache.tokens if cache is not None else {}
+
+    # 同样内容的帖子只分一次
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in known and key not in missing:
+            missing[key] = text
+
+    if missing:
+        new_keys = list(missing)
+        new_texts = list(missing.values())
+        workers = workers or os.cpu_count() or 1
+        # 调用方（wordcloudan.py、fanalysis.py）的代码写在模块顶层，spawn方式的子进程会把整个脚本重新运行一遍，
+        # 所以只在能fork时用进程池（同charts.py）
+        if workers <= 1 or len(new_texts) <= batch_size or 'fork' not in multiprocessing.get_all_start_methods():
+            _init_worker()
+            token_lists = _cut_batch(new_texts)
+        else:
+            batches = [new_texts[i:i + batch_size] for i in range(0, len(new_texts), batch_size)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     mp_context=multiprocessing.get_context('fork')) as pool:
+                token_lists = [tokens for batch in pool.map(_cut_batch, batches) for tokens in batch]
+        if cache is not None:
+            cache.update(new_keys, token_lists)
+            cache.save()
+        else:
+            known = dict(zip(new_keys, token_lists))
+    return [known[key] for key in keys]
+
+
+# 所有帖子的词依次连成一个流，可以直接替代jieba.lcut(全部文本)的结果
+def iter_tokens(texts, cache=DEFAULT_TOKEN_CACHE, workers=None):
+    for tokens in tokenize_texts(texts, cache=cache, workers=workers):
+        yield from tokens
+
+
+# 用语料（或合成帖子）测不同进程数的分词吞吐量，并检查冷/热缓存
+def benchmark(csv_path, scale=1, max_workers=None):
+    import tempfile
+    from corpus import load_corpus
+
+    if os.path.exists(csv_path):
+        texts = load_corpus(csv_path)['分析文本'].tolist()
+    else:
+        from keywords import synthetic_posts
+        texts = synthetic_posts(20000)
+    # 每篇加上编号，避免重复帖子被"相同内容只分一次"合并掉，测的是真实分词量
+    texts = [f'{i}-{j} {text}' for i in range(scale) for j, text in enumerate(texts)]
+    chars = sum(len(text) for text in texts)
+    print(f"测试文本：{len(texts)}篇，{chars / 1e6:.1f}M字")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    _init_worker()  # 词典加载不计入单进程的时间
+    counts = sorted({1, max_workers} | {n for n in (2, 4, 8, 16) if n < max_workers})
+    expected = None
+    base_time = None
+    for n in counts:
+        start = time.perf_counter()
+        result = tokenize_texts(texts, cache=None, workers=n)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected, base_time = result, elapsed
+        assert result == expected, f"{n}个进程的分词结果与单进程不一致"
+        print(f"进程数={n:<3} 用时{elapsed:.2f}s  {len(texts) / elapsed:,.0f}篇/秒  "
+              f"{chars / elapsed / 1e6:.2f}M字/秒  加速{base_time / elapsed:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'tokens.pkl')
+        start = time.perf_counter()
+        tokenize_texts(texts, cache=path, workers=max_workers)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        warm_result = tokenize_texts(texts, cache=path, workers=max_workers)
+        warm = time.perf_counter() - start
+        assert warm_result == expected, "缓存读出的分词结果不一致"
+        # 改动1%的帖子后只重新分这部分
+        changed = [text + '又改了' if i % 100 == 0 else text for i, text in enumerate(texts)]
+        start = time.perf_counter()
+        tokenize_texts(changed, cache=path, workers=max_workers)
+        partial = time.perf_counter() - start
+        print(f"缓存：冷启动{cold:.2f}s  热启动{warm:.2f}s  改动1%后{partial:.2f}s  "
+              f"缓存大小{os.path.getsize(path) / 1024 / 1024:.1f}MB")
+
+    # 与原来整段拼接后一次lcut的结果比较（按空格拼接时分词边界相同）
+    start = time.perf_counter()
+    whole = [word for word in jieba.lcut(' '.join(texts)) if not word.isspace()]
+    whole_time = time.perf_counter() - start
+    per_doc = [word for tokens in expected for word in tokens if not word.isspace()]
+    print(f"整段单核lcut：{whole_time:.2f}s，与逐篇分词结果{'一致' if whole == per_doc else '不一致'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多进程分词 + 按内容指纹持久化的分词缓存')
+    parser.add_argument('csv', nargs='?', default='./result/彩礼.csv')
+    parser.add_argument('--workers', type=int, default=None, help='分词进程数（默认CPU核数）')
+    parser.add_argument('--cache', default=DEFAULT_TOKEN_CACHE, help='分词缓存文件')
+    parser.add_argument('--bench', action='store_true', help='测不同进程数的吞吐量')
+    parser.add_argument('--scale', type=int, default=1, help='测速时把语料放大的倍数')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.csv, scale=args.scale, max_workers=args.workers)
+    else:
+        from corpus import load_corpus
+        corpus = load_corpus(args.csv)
+        start = time.perf_counter()
+        cache = TokenCache(args.cache)
+        before = len(cache)
+        token_lists = tokenize_texts(corpus['分析文本'], cache=cache, workers=args.workers)
+        print(f"{len(token_lists)}篇分词完成，用时{time.perf_counter() - start:.2f}s，"
+              f"新分词{len(cache) - before}篇，缓存共{len(cache)}篇：{args.cache}")
@@ -0,0 +1,172 @@
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from instrument import traced
+
+# ====================== 语气特征词表（attitude.py） ======================
+# 感性特征：感叹号、问号（连续/单个）
+emotional_punctuations = r'!{1,}|！{1,}|\?{1,}|？{1,}'  # 修复重复匹配问题
+emotional_words = ['啊', '呀', '哇', '哦', '呢', '嘛', '吧', '咯', '唉', '哼', '天哪', '卧槽', '气死', '哭', '笑', '烦']
+
+# 理性特征：句号、分号、引号（修复正则语法）
+rational_punctuations = r'\。{1,}|;{1,}|；{1,}|"{1,}|"{2,}|\'{1,}|\'{2,}'  # 修复""+问题
+rational_words = ['数据', '统计', '根据', '研究', '分析', '客观', '理性', '事实', '依据', '具体', '举例']
+
+FEATURE_COLUMNS = ['emotional_punc_count', 'rational_punc_count', 'emotional_word_count', 'rational_word_count',
+                   'text_length', 'emotional_score', 'rational_score', 'tendency']
+COUNT_COLUMNS = FEATURE_COLUMNS[:5]
+
+# 上面两个标点正则都是"同一个字符连续出现算一次"，合并成一个正则：每段连续的同一标点匹配一次
+emotional_punc_chars = '!！?？'
+rational_punc_chars = '。;；"\''
+
+
+# 所有特征合成一个正则，每篇文本只扫描一遍：
+# 标点按连续段计数，词只记是否出现过（与原来的 word in text 一致）
+def _build_pattern(words):
+    # 一个正则扫描时匹配不重叠，只有当词之间互不重叠（一个词的后缀不是另一个词的前缀、也不互相包含）
+    # 且不含标点时，才与逐个 word in text 的结果相同
+    for a in words:
+        if set(a) & set(emotional_punc_chars + rational_punc_chars):
+            raise ValueError(f"语气词不能包含标点：{a}")
+        for b in words:
+            if a != b and (a in b or any(a.endswith(b[:i]) for i in range(1, min(len(a), len(b)) + 1))):
+                raise ValueError(f"语气词有重叠，不能合并扫描：{a} / {b}")
+    chars = emotional_punc_chars + rational_punc_chars
+    punc = '|'.join(f'{re.escape(c)}+' for c in chars)
+    # 开头的前瞻只允许在可能匹配的字符处尝试各个分支，其余位置一次字符集判断就跳过
+    first = re.escape(chars + ''.join(sorted({word[0] for word in words})))
+    return re.compile(f"(?=[{first}])(?:{punc}|{'|'.join(map(re.escape, sorted(words, key=len, reverse=True)))})")
+
+
+tone_pattern = _build_pattern(emotional_words + rational_words)
+# 匹配到的字符串（标点看第一个字符）-> 计数数组的列（0感性标点 1理性标点 2感性词 3理性词）
+punc_column = {**dict.fromkeys(emotional_punc_chars, 0), **dict.fromkeys(rational_punc_chars, 1)}
+word_column = {**dict.fromkeys(emotional_words, 2), **dict.fromkeys(rational_words, 3)}
+
+
+# 一批文本的计数，直接写进预先分配的整数数组：每行[感性标点, 理性标点, 感性词, 理性词, 文本长度]
+def count_features(texts):
+    counts = np.zeros((len(texts), 5), dtype=np.int64)
+    findall = tone_pattern.findall
+    for i, text in enumerate(texts):
+        text = str(text).strip()
+        row = [0, 0, 0, 0, max(len(text), 1)]  # 文本长度至少为1，避免除以0
+        seen = set()
+        for match in findall(text):
+            column = punc_column.get(match[0])
+            if column is not None:
+                row[column] += 1
+            elif match not in seen:
+                seen.add(match)
+                row[word_column[match]] += 1
+        counts[i] = row
+    return counts
+
+
+# 由计数整列算得分和倾向，结果与analyze_emotional_features逐行计算的相同
+def scores_from_counts(counts, index=None):
+    df = pd.DataFrame(counts, columns=COUNT_COLUMNS, index=index)
+    df['emotional_score'] = (df['emotional_punc_count'] * 2 + df['emotional_word_count']) / df['text_length'] * 100
+    df['rational_score'] = (df['rational_punc_count'] * 2 + df['rational_word_count']) / df['text_length'] * 100
+    df['tendency'] = np.select([df['emotional_score'] > df['rational_score'] + 0.5,
+                                df['rational_score'] > df['emotional_score'] + 0.5],
+                               ['感性', '理性'], default='中性').astype(object)
+    return df
+
+
+# 语气计数：文本多时分批交给进程池
+# 调用方（attitude.py）的代码写在模块顶层，spawn方式的子进程会把整个脚本重新运行一遍，所以只在能fork时用进程池
+def tone_counts(texts, workers=None, batch_size=5000):
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(texts) <= batch_size or 'fork' not in multiprocessing.get_all_start_methods():
+        return count_features(texts)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        return np.concatenate(list(pool.map(count_features, batches)))
+
+
+# 语气特征：返回与texts同索引的特征表（按文本缓存计数的版本见labelcache.tone_features）
+@traced()
+def extract_tone_features(texts, workers=None, batch_size=5000):
+    index = texts.index if isinstance(texts, pd.Series) else None
+    return scores_from_counts(tone_counts(texts, workers, batch_size), index=index)
+
+
+# ====================== 原来的逐行实现（用于核对结果和测速） ======================
+def analyze_emotional_features(text):
+    try:
+        text = str(text).strip()
+        features = {
+            'emotional_punc_count': 0,
+            'rational_punc_count': 0,
+            'emotional_word_count': 0,
+            'rational_word_count': 0,
+            'text_length': max(len(text), 1),  # 避免除以0
+            'emotional_score': 0,
+            'rational_score': 0,
+            'tendency': '中性'
+        }
+        if text:
+            features['emotional_punc_count'] = len(re.findall(emotional_punctuations, text))
+        if text:
+            features['rational_punc_count'] = len(re.findall(rational_punctuations, text))
+        features['emotional_word_count'] = sum(1 for word in emotional_words if word in text)
+        features['rational_word_count'] = sum(1 for word in rational_words if word in text)
+        features['emotional_score'] = (features['emotional_punc_count'] * 2 + features['emotional_word_count']) / \
+                                      features['text_length'] * 100
+        features['rational_score'] = (features['rational_punc_count'] * 2 + features['rational_word_count']) / features[
+            'text_length'] * 100
+        if features['emotional_score'] > features['rational_score'] + 0.5:
+            features['tendency'] = '感性'
+        elif features['rational_score'] > features['emotional_score'] + 0.5:
+            features['tendency'] = '理性'
+        return features
+    except Exception as e:
+        print(f"处理文本时出错: {e}")
+        return dict(zip(FEATURE_COLUMNS, [0, 0, 0, 0, 1, 0, 0, '中性']))
+
+
+def extract_tone_features_naive(texts):
+    return pd.DataFrame(pd.Series(texts).apply(analyze_emotional_features).tolist())
+
+
+def benchmark(csv_path, posts=200000, workers=None):
+    from keywords import synthetic_posts
+
+    if os.path.exists(csv_path):
+        from corpus import load_corpus
+        texts = load_corpus(csv_path)['分析文本'].tolist()
+        texts = (texts * (posts // len(texts) + 1))[:posts]
+    else:
+        texts = synthetic_posts(posts)
+    # 混入各种标点和语气词，覆盖连续标点、中英文标点混排等情况
+    extra = ['！！！', '?？', '。。', ';；', '""', "''", '天哪', '数据', '吧吧', '\n']
+    texts = [text + extra[i % len(extra)] + extra[(i * 7) % len(extra)] for i, text in enumerate(texts)]
+    print(f"测试文本：{len(texts)}篇")
+
+    start = time.perf_counter()
+    expected = extract_tone_features_naive(texts)
+    naive_time = time.perf_counter() - start
+    for n in sorted({1, workers or os.cpu_count() or 1}):
+        start = time.perf_counter()
+        result = extract_tone_features(texts, workers=n)
+        fast_time = time.perf_counter() - start
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=True)
+        print(f"逐行dict {naive_time:.2f}s  合并扫描（{n}进程）{fast_time:.2f}s  加速{naive_time / fast_time:.1f}x"
+              f"（得分和倾向完全一致）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='语气特征：一次扫描提取，核对结果并测速')
+    parser.add_argument('csv', nargs='?', default='./result/彩礼.csv')
+    parser.add_argument('--posts', type=int, default=200000, help='测试文本数')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    args = parser.parse_args()
+    benchmark(args.csv, posts=args.posts, workers=args.workers)
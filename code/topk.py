@@ -0,0 +1,125 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from corpus import HEAT_WEIGHTS, heat
+from instrument import traced
+
+
+# 解析"view=3,reply=5"形式的权重，没写到的列沿用默认权重
+def parse_weights(text):
+    weights = dict(HEAT_WEIGHTS)
+    if not text:
+        return weights
+    for item in text.split(','):
+        col, _, value = item.partition('=')
+        value = float(value)
+        weights[col.strip()] = int(value) if value.is_integer() else value
+    return weights
+
+
+# 原来的做法：整表排序后取前k条；stable排序保证热度相同时按原来的行顺序
+@traced()
+def top_k_sorted(df, k=100, weights=None):
+    df = df.assign(热度=heat(df.fillna({col: 0 for col in (weights or HEAT_WEIGHTS)}), weights))
+    return df.sort_values('热度', ascending=False, kind='stable').head(k)
+
+
+# 流式取前k条：逐块读取CSV，整块向量化算热度，只保留不超过k行的当前最优集合
+# 多个文件按顺序接在一起，结果与把所有文件拼起来后top_k_sorted相同（包括并列时的顺序）
+@traced()
+def stream_top_k(csv_paths, k=100, weights=None, chunksize=500000, usecols=None):
+    weights = weights or HEAT_WEIGHTS
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+    if k < 1:
+        return pd.DataFrame(columns=['热度'])
+    best = None
+    seq = 0  # 全局行号，用于并列时保持原顺序
+    for path in csv_paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols):
+            chunk.index = pd.RangeIndex(seq, seq + len(chunk))
+            seq += len(chunk)
+            score = heat(chunk[list(weights)].fillna(0), weights)
+            # 集合已满时，只有严格高于第k名的行才可能进入（并列时先出现的行排在前面）
+            if best is not None and len(best) >= k:
+                score = score[score > best['热度'].iloc[-1]]
+            if score.empty:
+                continue
+            top = score.nlargest(k, keep='first')
+            candidates = chunk.loc[top.index].assign(热度=top)
+            merged = candidates if best is None else pd.concat([best, candidates])
+            best = merged.sort_index().sort_values('热度', ascending=False, kind='stable').head(k)
+    if best is None:
+        return pd.DataFrame(columns=['热度'])
+    return best.reset_index(drop=True)
+
+
+# 生成只有计数列和tid的合成帖子表，分块写出，生成过程本身内存也不随行数增长
+def synthetic_heat_csv(path, rows, chunk=1000000, seed=42):
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(chunk, rows - written)
+        df = pd.DataFrame({
+            'tid': np.arange(written, written + n, dtype=np.int64),
+            'view': rng.zipf(1.6, n).clip(max=10 ** 7),
+            'reply': rng.zipf(1.8, n).clip(max=10 ** 5),
+            'share': rng.poisson(0.3, n),
+            'agree': rng.zipf(2.0, n).clip(max=10 ** 5),
+            'disagree': rng.poisson(0.2, n),
+        })
+        df.to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+        written += n
+
+
+def _memory_worker(mode, path, k, chunksize):
+    import resource
+    start = time.perf_counter()
+    if mode == 'sort':
+        top = top_k_sorted(pd.read_csv(path), k=k).reset_index(drop=True)
+    else:
+        top = stream_top_k(path, k=k, chunksize=chunksize)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下单位是KB，macOS下是字节
+    print(elapsed, peak / 1024 / (1024 if sys.platform == 'darwin' else 1), ','.join(map(str, top['tid'])))
+
+
+# 在合成的大表上比较整表排序与流式top-k的耗时和峰值内存，并核对结果一致
+def benchmark(rows=50000000, k=100, chunksize=500000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'heat.csv')
+        start = time.perf_counter()
+        synthetic_heat_csv(path, rows)
+        print(f"生成{rows}行合成数据：{time.perf_counter() - start:.1f}s，"
+              f"CSV大小{os.path.getsize(path) / 1024 / 1024:.0f}MB")
+        results = {}
+        for mode in ('stream', 'sort'):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--memory-worker', mode, path,
+                                  '--k', str(k), '--chunksize', str(chunksize)],
+                                 capture_output=True, text=True, check=True)
+            elapsed, peak, tids = out.stdout.strip().splitlines()[-1].split(' ')
+            results[mode] = tids
+            print(f"{mode:<6} 用时{float(elapsed):.2f}s  峰值RSS={float(peak):.1f}MB")
+        assert results['stream'] == results['sort'], "流式top-k与整表排序的结果不一致"
+        print(f"两种方式得到的前{k}条一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='流式热度top-k：对比整表排序的耗时和内存')
+    parser.add_argument('csv', nargs='?', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, default=50000000, help='合成数据的行数')
+    parser.add_argument('--k', type=int, default=100)
+    parser.add_argument('--chunksize', type=int, default=500000, help='每块读取的行数')
+    parser.add_argument('--memory-worker', choices=['sort', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_worker:
+        _memory_worker(args.memory_worker, args.csv, args.k, args.chunksize)
+    else:
+        benchmark(rows=args.rows, k=args.k, chunksize=args.chunksize)
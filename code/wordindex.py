@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from tokens import text_key, tokenize_texts
+from instrument import traced
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # 没有安装pyarrow时索引只保存在内存里
+    feather = None
+
+DEFAULT_INDEX_DIR = './result/.cache/wordindex'
+POST_KEY_VERSION = 2  # 帖子编号的算法有变化时加1，用旧编号建的索引和时间汇总（timeroll.py）会重建
+KEY_COLUMNS = ['user_name', 'title', 'create_time']  # 没有tid时的帖子口径（与cleaning.py、dataHelper.row_keys一致）
+# 帖子内位置的位数：first = 帖子序号 * 2**POS_BITS + 词在帖子里第一次出现的位置
+POS_BITS = 20
+
+# 词和吧名都存成整数编号（vocab.feather / forums.json），日期存成YYYYMMDD整数，查询时只做整数运算
+POST_COLUMNS = {'forum': 'int16', 'post': 'int64', 'digest': 'int64', 'day': 'int32', 'seq': 'int64'}
+TERM_COLUMNS = {'forum': 'int16', 'post': 'int64', 'term': 'int32', 'count': 'int32', 'pos': 'int32'}
+DAILY_COLUMNS = {'forum': 'int16', 'day': 'int32', 'term': 'int32', 'count': 'int64', 'first': 'int64'}
+TABLES = ('posts', 'terms', 'daily')
+
+
+def _empty(columns):
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
+
+
+def _digest(text):
+    return int.from_bytes(text_key(text)[:8], 'little', signed=True)
+
+
+# 帖子的编号：有tid列时用tid；否则用发帖人+标题+发帖时间的指纹（热度100等子集文件也能对上），
+# 这几列也没有时用texts（默认text列）的指纹。没有tid时口径相同的第几次出现也算进编号，
+# 同一个文件里的不同帖子不会因为内容相同被合并，统计结果与逐行统计的相同
+def post_keys(df, texts=None):
+    if 'tid' in df.columns:
+        return df['tid'].astype('int64').tolist()
+    if all(col in df.columns for col in KEY_COLUMNS):
+        columns = [df[col].astype(object).fillna('').astype(str) for col in KEY_COLUMNS]
+        keys = columns[0].str.cat(columns[1:], sep='\x1f')
+    else:
+        keys = (df['text'] if texts is None else pd.Series(list(texts))).astype(object).fillna('').astype(str)
+    keys = keys.reset_index(drop=True)
+    nth = keys.groupby(keys, sort=False).cumcount()
+    return [_digest(f'{key}\x00{n}') for key, n in zip(keys, nth)]
+
+
+# 发帖日期，YYYYMMDD整数，没有时间的记为0
+def post_days(df):
+    if 'create_time' not in df.columns:
+        return [0] * len(df)
+    dt = pd.to_datetime(df['create_time'], errors='coerce')
+    return (dt.dt.year * 10000 + dt.dt.month * 100 + dt.dt.day).fillna(0).astype('int32').tolist()
+
+
+def day_number(day):
+    return int(str(day).replace('-', '')[:8].ljust(8, '0'))
+
+
+# 词频索引：每个帖子一份词频（posts/terms），再按天汇总一份（daily），部分计数可以直接相加合并
+# field是被分词的那一列文本的名字（如'text'），不同预处理的文本各用一个索引目录
+class WordIndex:
+    def __init__(self, field='text', index_dir=DEFAULT_INDEX_DIR):
+        self.path = os.path.join(index_dir, field) if index_dir else None
+        self.posts = _empty(POST_COLUMNS)
+        self.terms = _empty(TERM_COLUMNS)
+        self.daily = _empty(DAILY_COLUMNS)
+        self.vocab = []
+        self.forum_names = []
+        meta = self._read_meta()
+        if meta is not None:
+            for name in TABLES:
+                setattr(self, name, feather.read_feather(os.path.join(self.path, f'{name}.feather')))
+            self.vocab = feather.read_table(os.path.join(self.path, 'vocab.feather'))['term'].to_pylist()
+            self.forum_names = meta['forums']
+        self.term_ids = {term: i for i, term in enumerate(self.vocab)}
+
+    # forums.json：吧名和帖子编号的版本；编号算法不同的旧索引不读，重新建
+    def _read_meta(self):
+        path = os.path.join(self.path, 'forums.json') if self.path else None
+        if feather is None or not path or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if not isinstance(meta, dict) or meta.get('post_keys') != POST_KEY_VERSION:
+            return None
+        return meta
+
+    def forums(self):
+        return list(self.forum_names)
+
+    def _forum_id(self, forum):
+        if forum not in self.forum_names:
+            self.forum_names.append(forum)
+        return self.forum_names.index(forum)
+
+    def _term_id(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.term_ids[term] = len(self.vocab)
+            self.vocab.append(term)
+        return term_id
+
+    # 增量更新：只对新帖子和内容变了的帖子分词，只重算涉及到的日期的按天汇总
+    @traced()
+    def update(self, df, forum, texts=None):
+        fid = self._forum_id(forum)
+        texts = (df['text'] if texts is None else pd.Series(texts)).fillna('').astype(str).tolist()
+        new = pd.DataFrame({'forum': fid, 'post': post_keys(df, texts), 'digest': [_digest(t) for t in texts],
+                            'day': post_days(df), 'text': texts})
+        new = new.drop_duplicates('post', keep='last')
+        old = self.posts[self.posts['forum'] == fid]
+        old = old.set_axis(pd.Index(old['post'].to_numpy()))
+        changed = new[new['post'].map(old['digest']).ne(new['digest'])].copy()
+        if changed.empty:
+            return 0
+
+        # 新帖子接在已有帖子后面编号，内容变了的帖子沿用原来的序号
+        start = int(old['seq'].max()) + 1 if len(old) else 0
+        fresh = pd.Series(range(start, start + len(changed)), index=changed.index)
+        changed['seq'] = changed['post'].map(old['seq']).fillna(fresh).astype('int64')
+
+        rows = []
+        for post, tokens in zip(changed['post'], tokenize_texts(changed['text'])):
+            counts = {}
+            for pos, word in enumerate(tokens):
+                if word in counts:
+                    counts[word][0] += 1
+                else:
+                    counts[word] = [1, pos]
+            rows += [(fid, post, self._term_id(word), count, pos) for word, (count, pos) in counts.items()]
+        terms = pd.DataFrame(rows, columns=list(TERM_COLUMNS)).astype(TERM_COLUMNS)
+        self._replace_posts(fid, changed[list(POST_COLUMNS)].astype(POST_COLUMNS), terms)
+        return len(changed)
+
+    # 用新的帖子行和词频行替换同一个吧里的同名帖子，并重算涉及到的日期
+    def _replace_posts(self, fid, posts, terms):
+        is_old = (self.posts['forum'] == fid) & self.posts['post'].isin(posts['post'])
+        days = set(posts['day']) | set(self.posts.loc[is_old, 'day'])
+        self.posts = pd.concat([self.posts[~is_old], posts], ignore_index=True).astype(POST_COLUMNS)
+        keep_terms = ~((self.terms['forum'] == fid) & self.terms['post'].isin(posts['post']))
+        self.terms = pd.concat([self.terms[keep_terms], terms], ignore_index=True).astype(TERM_COLUMNS)
+
+        posts = self.posts[(self.posts['forum'] == fid) & self.posts['day'].isin(days)]
+        terms = self.terms[self.terms['forum'] == fid].merge(posts[['post', 'day', 'seq']], on='post')
+        terms['first'] = terms['seq'] * (1 << POS_BITS) + terms['pos']
+        daily = (terms.groupby(['day', 'term'], sort=False)
+                 .agg(count=('count', 'sum'), first=('first', 'min')).reset_index())
+        daily['forum'] = fid
+        stale = (self.daily['forum'] == fid) & self.daily['day'].isin(days)
+        self.daily = pd.concat([self.daily[~stale], daily[list(DAILY_COLUMNS)]],
+                               ignore_index=True).astype(DAILY_COLUMNS)
+
+    # 合并另一个索引（另一台机器爬的分片、另一个吧）：同一帖子以other为准，词和吧名重新编号
+    def merge(self, other):
+        term_map = np.array([self._term_id(term) for term in other.vocab] or [0], dtype='int32')
+        for their_fid, forum in enumerate(other.forum_names):
+            fid = self._forum_id(forum)
+            ours = self.posts['forum'] == fid
+            start = int(self.posts.loc[ours, 'seq'].max()) + 1 if ours.any() else 0
+            posts = other.posts[other.posts['forum'] == their_fid]
+            posts = posts.assign(forum=fid, seq=posts['seq'] + start)
+            terms = other.terms[other.terms['forum'] == their_fid]
+            terms = terms.assign(forum=fid, term=term_map[terms['term'].to_numpy()])
+            self._replace_posts(fid, posts, terms)
+
+    def save(self):
+        if not self.path or feather is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for name in TABLES:
+            path = os.path.join(self.path, f'{name}.feather')
+            getattr(self, name).reset_index(drop=True).to_feather(path + '.tmp')
+            os.replace(path + '.tmp', path)
+        path = os.path.join(self.path, 'vocab.feather')
+        pd.DataFrame({'term': self.vocab}, dtype=object).to_feather(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        # forums.json最后写，它存在才说明索引完整
+        with open(os.path.join(self.path, 'forums.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump({'forums': self.forum_names, 'post_keys': POST_KEY_VERSION}, f, ensure_ascii=False)
+        os.replace(os.path.join(self.path, 'forums.json.tmp'), os.path.join(self.path, 'forums.json'))
+
+    # 按条件合计词频，返回Counter：次数多的在前，次数相同按第一次出现的先后
+    # （与对这些帖子按顺序拼起来的词流做Counter后most_common的顺序相同）
+    # forums：贴吧列表（按给出的顺序拼接）；start/end：'YYYY-MM-DD'，含两端；posts：只统计这些帖子
+    @traced()
+    def counts(self, forums=None, start=None, end=None, posts=None):
+        fids = [self.forum_names.index(forum) for forum in (forums or self.forum_names)
+                if forum in self.forum_names]
+        if posts is not None:
+            table = self.terms[self.terms['post'].isin(posts)]
+            table = table.merge(self.posts[['forum', 'post', 'day', 'seq']], on=['forum', 'post'])
+            table['first'] = table['seq'] * (1 << POS_BITS) + table['pos']
+        else:
+            table = self.daily
+        if len(fids) < len(self.forum_names):
+            table = table[table['forum'].isin(fids)]
+        if start:
+            table = table[table['day'] >= day_number(start)]
+        if end:
+            table = table[table['day'] <= day_number(end)]
+        if table.empty:
+            return Counter()
+
+        # 多个吧时，排在前面的吧里出现的词算先出现
+        first = table['first'].to_numpy()
+        if len(fids) > 1:
+            rank = np.zeros(max(fids) + 1, dtype='int64')
+            rank[fids] = np.arange(len(fids))
+            first = first + rank[table['forum'].to_numpy()] * (1 << 48)
+        summed = pd.DataFrame({'term': table['term'].to_numpy(), 'count': table['count'].to_numpy(),
+                               'first': first}).groupby('term').agg(count=('count', 'sum'), first=('first', 'min'))
+        order = np.lexsort((summed['first'].to_numpy(), -summed['count'].to_numpy()))
+        vocab = np.asarray(self.vocab, dtype=object)
+        return Counter(dict(zip(vocab[summed.index.to_numpy()[order]].tolist(),
+                                summed['count'].to_numpy()[order].tolist())))
+
+
+def add_csv(index, csv_path, forum=None):
+    df = pd.read_csv(csv_path)
+    forum = forum or os.path.splitext(os.path.basename(csv_path))[0]
+    return index.update(df, forum)
+
+
+# 在语料上比较"每次Counter(全部词)"与"查询索引"的耗时，并核对结果一致
+def benchmark(csv_path, n=50):
+    import tempfile
+    from tokens import iter_tokens
+
+    df = pd.read_csv(csv_path)
+    # 索引里同一个tid只算一次，直接统计时也先去掉重复的tid（没有tid时每行都是不同的帖子）
+    df = df.iloc[pd.Series(post_keys(df)).drop_duplicates(keep='last').sort_index().index]
+    forum = os.path.splitext(os.path.basename(csv_path))[0]
+    texts = df['text'].fillna('').astype(str)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        expected = Counter(iter_tokens(texts, cache=None))
+        print(f"分词+Counter（原来每次运行）：{time.perf_counter() - start:.2f}s")
+
+        index = WordIndex(index_dir=tmp_dir)
+        start = time.perf_counter()
+        index.update(df.iloc[:len(df) // 2], forum)
+        index.update(df, forum)
+        index.save()
+        print(f"分两次增量建索引：{time.perf_counter() - start:.2f}s，{len(index.terms)}行帖子词频，"
+              f"{len(index.daily)}行按天汇总")
+
+        index = WordIndex(index_dir=tmp_dir)
+        start = time.perf_counter()
+        result = index.counts([forum])
+        print(f"整吧查询：{(time.perf_counter() - start) * 1000:.1f}ms")
+        assert result.most_common(n) == expected.most_common(n), "索引查询与直接Counter的结果不一致"
+
+        days = sorted(str(day) for day in index.daily['day'].unique() if day)
+        if days:
+            month = f'{days[len(days) // 2][:4]}-{days[len(days) // 2][4:6]}'
+            start = time.perf_counter()
+            index.counts([forum], start=f'{month}-01', end=f'{month}-31').most_common(n)
+            print(f"按月查询（{month}）：{(time.perf_counter() - start) * 1000:.1f}ms")
+        subset = df.head(100)
+        start = time.perf_counter()
+        result = index.counts([forum], posts=post_keys(subset))
+        print(f"100个帖子的子集查询：{(time.perf_counter() - start) * 1000:.1f}ms")
+        sub_expected = Counter(iter_tokens(subset['text'].fillna('').astype(str), cache=None))
+        assert result.most_common(n) == sub_expected.most_common(n), "子集查询与直接Counter的结果不一致"
+        print(f"前{n}个词与直接统计一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='持久化的词频索引：增量加入帖子，按吧/时间/帖子子集查询高频词')
+    parser.add_argument('--add', nargs='+', metavar='CSV', default=[], help='把这些帖子CSV加入索引（吧名取文件名）')
+    parser.add_argument('--field', default='text', help='索引的文本列')
+    parser.add_argument('--forum', nargs='+', default=None, help='查询这些吧（默认全部）')
+    parser.add_argument('--start', default=None, help='起始日期 YYYY-MM-DD')
+    parser.add_argument('--end', default=None, help='结束日期 YYYY-MM-DD')
+    parser.add_argument('--posts-csv', default=None, help='只统计这个CSV里的帖子，如热度100_彩礼.csv')
+    parser.add_argument('--top', type=int, default=20, help='显示前N个词')
+    parser.add_argument('--bench', default=None, metavar='CSV', help='在这个语料上测速并核对结果')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench)
+    else:
+        index = WordIndex(args.field)
+        for path in args.add:
+            start = time.perf_counter()
+            print(f"{path}：新增或更新{add_csv(index, path)}个帖子，用时{time.perf_counter() - start:.2f}s")
+        if args.add:
+            index.save()
+        posts = post_keys(pd.read_csv(args.posts_csv)) if args.posts_csv else None
+        start = time.perf_counter()
+        counts = index.counts(args.forum, start=args.start, end=args.end, posts=posts)
+        top = [(word, count) for word, count in counts.items() if len(word) > 1 and not word.isspace()][:args.top]
+        print(f"查询用时{(time.perf_counter() - start) * 1000:.1f}ms")
+        for i, (word, count) in enumerate(top, 1):
+            print(f"{i}. {word} - {count}次")